@@ -0,0 +1,186 @@
+"""
+JSON scoring API for other systems, running next to the Streamlit UI.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+    python api.py
+
+GET  /api/score/{ticker}           short / medium-term scores of one ticker
+GET  /api/score?tickers=7203,8035  batch (also POST /api/score with {"tickers": [...]})
+GET  /api/ai/latest                latest finished AI research result ("stale" if it re-served an older one)
+GET  /api/ai/scorecard             per-model / per-strategy track record of past AI picks
+GET  /api/health                   in-flight / merged request counters, HTTP pool usage
+
+Scores come from the same pipeline as the UI (snapshot -> process cache -> live fetch,
+see logic/scoring.py). Blocking fetches run on a thread pool; a batch is fetched
+concurrently, and identical requests already in flight share one fetch.
+Every request has an ACTION_BUDGET deadline; tickers that run out of time come back
+as stale cached data ("stale": true) or a timeout error.
+"""
+import asyncio
+import datetime
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from logic.jobs import load_latest_job
+from logic.track_record import load_scorecard
+from logic.scoring import score_ticker
+from logic.deadline import Deadline, ACTION_BUDGET
+from logic.http_pool import pool_stats
+from logic.ticker_index import get_ticker_index, normalize_code
+
+load_dotenv()
+
+MAX_BATCH = 50 # Tickers per batch request
+API_WORKERS = int(os.getenv("API_WORKERS", "8")) # Threads for blocking yfinance calls
+
+ERROR_STATUS = {"not_found": 404, "no_data": 404, "fetch_failed": 502, "timeout": 504}
+
+
+def to_json(value):
+    """numpy scalars -> Python, NaN -> None, datetimes -> ISO strings (recursively)."""
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+class SingleFlight:
+    """
+    Runs blocking calls on a thread pool and merges identical in-flight calls:
+    a caller whose key is already running awaits the same future instead of starting another.
+    """
+
+    def __init__(self, max_workers=API_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+        self._inflight = {}
+        self.calls = 0
+        self.merged = 0
+
+    async def run(self, key, fn, *args):
+        future = self._inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.merged += 1
+        # shield: a client disconnecting must not cancel the fetch other callers are waiting on
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {"inflight": len(self._inflight), "calls": self.calls, "merged": self.merged}
+
+
+flight = SingleFlight()
+
+
+def score_payload(res):
+    """Public JSON shape of a logic.scoring.score_ticker result."""
+    if "error" in res:
+        return {"ticker": res["ticker"], "error": res["error"], "reason": res["reason"], "suggestions": res["suggestions"]}
+
+    ticker = res["ticker"]
+    return to_json({
+        "ticker": ticker,
+        "name": get_ticker_index().name(ticker) or res["stock"].get_company_name(),
+        "price": res["price"],
+        "source": res["source"],
+        "as_of": res["as_of"],
+        "stale": res["stale"],
+        "stale_reason": res.get("stale_reason"),
+        "short": res["short"],
+        "medium": res["medium"],
+    })
+
+
+async def fetch_score(ticker, deadline):
+    # Key on the normalised code so "7203", "7203.T" and "７２０３" share one fetch
+    res = await flight.run(("score", normalize_code(ticker)), score_ticker, ticker, deadline)
+    return score_payload(res)
+
+
+# --- Handlers ---
+
+async def score_one(request):
+    payload = await fetch_score(request.path_params["ticker"], Deadline(ACTION_BUDGET))
+    return JSONResponse(payload, status_code=ERROR_STATUS.get(payload.get("reason"), 200))
+
+
+async def score_batch(request):
+    if request.method == "POST":
+        try:
+            body = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "invalid JSON body"}, status_code=400)
+        tickers = body.get("tickers") if isinstance(body, dict) else None
+    else:
+        tickers = [t.strip() for t in request.query_params.get("tickers", "").split(",") if t.strip()]
+
+    if not tickers or not isinstance(tickers, list):
+        return JSONResponse({"error": "tickers is required"}, status_code=400)
+    if len(tickers) > MAX_BATCH:
+        return JSONResponse({"error": f"at most {MAX_BATCH} tickers per request"}, status_code=400)
+
+    deadline = Deadline(ACTION_BUDGET)
+    results = await asyncio.gather(*(fetch_score(str(t), deadline) for t in tickers))
+    return JSONResponse({"results": results})
+
+
+async def ai_latest(request):
+    job = await asyncio.get_running_loop().run_in_executor(None, load_latest_job, "ai_research")
+    if not job:
+        return JSONResponse({"error": "no finished AI research yet"}, status_code=404)
+
+    result = job.get("result") or {}
+    # A timed-out research re-serves the last fresh result; say so instead of presenting it as new
+    stale = bool(job.get("stale", result.get("stale", False)))
+    return JSONResponse(to_json({
+        "job_id": job["id"],
+        "finished_at": datetime.datetime.fromtimestamp(job["updated_at"], datetime.timezone.utc),
+        "params": job.get("params", {}),
+        "items": result.get("items", []),
+        "full_report": result.get("full_report", ""),
+        "stale": stale,
+        "stale_reason": job.get("stale_reason", result.get("warning")) if stale else None,
+        "stale_since": result.get("stale_since") if stale else None,
+    }))
+
+
+async def ai_scorecard(request):
+    card = await asyncio.get_running_loop().run_in_executor(None, load_scorecard)
+    if not card:
+        return JSONResponse({"error": "no scorecard yet"}, status_code=404)
+    return JSONResponse(card)
+
+
+async def health(request):
+    return JSONResponse(to_json({"status": "ok", **flight.stats(), "http_pool": pool_stats()}))
+
+
+app = Starlette(routes=[
+    Route("/api/score/{ticker}", score_one),
+    Route("/api/score", score_batch, methods=["GET", "POST"]),
+    Route("/api/ai/latest", ai_latest),
+    Route("/api/ai/scorecard", ai_scorecard),
+    Route("/api/health", health),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")))
@@ -1,10 +1,20 @@
 import streamlit as st
 import os
+import time
 from dotenv import load_dotenv
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import plotly.graph_objects as go
-from logic.stock_data import StockData
-from logic.scorer import Scorer
+from logic.risk import portfolio_risk, benchmark_close
+from logic.jobs import get_job_queue
+from logic.ticker_index import get_ticker_index
+from logic.scoring import score_ticker, score_intraday
+from logic.intraday import intraday_stats, start_intraday_poller
+from logic.http_pool import pool_stats
+from logic.track_record import record_picks, load_scorecard, build_scorecard
+from logic.deadline import Deadline, ACTION_BUDGET, SCAN_BUDGET
+from logic.memory import record_session, cache_stats, session_stats, process_rss
+from logic.snapshot import register_watchlist_tickers, start_scheduler
 
 # Load environment variables from .env file (for local development)
 # In production (e.g., Render), OS-level env vars take precedence
@@ -12,6 +22,15 @@ load_dotenv()
 
 st.set_page_config(page_title="StockOps-YF v2.1", layout="wide")
 
+# Pre-market / after-close score snapshots (once per process)
+start_scheduler()
+
+MAX_WATCHLIST = 200 # Per-session cap on watchlist entries
+BAR_MODES = {"日足": "1d", "5分足": "5m", "1分足": "1m"}
+
+# Intraday bars for the watchlist during market hours (only when INTRADAY_INTERVAL is set)
+start_intraday_poller()
+
 # --- Styles ---
 st.markdown("""
 <style>
@@ -194,44 +213,44 @@ st.markdown("""
 
 # --- Functions ---
 
-def analyze_stock(ticker, context="Scanner"):
+def format_suggestions(matches):
+    return " / ".join(f"{m['code']} {m['name']}" for m in matches)
+
+def analyze_stock(ticker, context="Scanner", deadline=None, interval="1d"):
     if not ticker:
         return
 
-    if not ticker.endswith(".T"):
-        ticker = f"{ticker}.T"
-
-    stock = StockData(ticker)
-    
+    # Snapshot / process cache / live fetch (see logic/scoring.py); the spinner only appears on slow fetches.
+    # Bounded by the caller's deadline (e.g. the whole portfolio scan) or ACTION_BUDGET.
     with st.spinner(f"Fetching data for {ticker}..."):
-        try:
-            stock.fetch_data()
-        except Exception as e:
-            st.error(f"Error fetching data: {e}")
-            return
-
-    current_price = stock.get_current_price()
-    if current_price is None:
-        st.error("No price data found.")
+        res = score_ticker(ticker, deadline=deadline or Deadline(ACTION_BUDGET))
+    if "error" in res:
+        st.error(res["error"])
+        if res["suggestions"]:
+            st.caption(f"候補: {format_suggestions(res['suggestions'])}")
         return
 
-    scorer = Scorer(stock)
-    
+    ticker = res["ticker"]
+    stock, current_price = res["stock"], res["price"]
+    short_res, med_res, as_of = res["short"], res["medium"], res["as_of"]
+
     col1, col2 = st.columns([1, 2])
 
     with col1:
-        company_name = stock.get_company_name()
+        company_name = get_ticker_index().name(ticker) or stock.get_company_name()
         st.subheader(f"{company_name} ({ticker}) 分析")
         st.metric("現在値", f"¥{current_price:,.0f}")
-
-        # Scores
-        short_res = scorer.evaluate_short_term()
-        med_res = scorer.evaluate_medium_term()
+        if res["stale"]:
+            st.warning(f"{res['stale_reason']}のため {as_of:%m/%d %H:%M} 時点の古いデータを表示しています")
+        elif res["source"] == "snapshot":
+            st.caption(f"事前計算データ ({as_of:%m/%d %H:%M} 時点)")
 
         st.markdown("### スコア評価")
         c1, c2 = st.columns(2)
         c1.markdown(f"<div class='metric-card'><div class='metric-value'>{short_res['score']}</div><div class='metric-label'>短期モメンタム</div></div>", unsafe_allow_html=True)
         c2.markdown(f"<div class='metric-card'><div class='metric-value'>{med_res['score']}</div><div class='metric-label'>中期ファンダメンタルズ</div></div>", unsafe_allow_html=True)
+        if med_res.get("sector_score") is not None:
+            st.caption(f"業種内相対スコア ({med_res['sector']}): {med_res['sector_score']} / 100")
 
     with col2:
         # Chart
@@ -246,6 +265,25 @@ def analyze_stock(ticker, context="Scanner"):
             fig.update_layout(title=f"{ticker} 株価チャート", height=400, template="plotly_dark")
             st.plotly_chart(fig, use_container_width=True)
 
+        # Rolling Beta (vs Nikkei 225 / TOPIX)
+        beta_profile = stock.calculate_beta_profile()
+        if beta_profile is not None and not beta_profile.empty:
+            with st.expander("ベータ推移 (ローリング)", expanded=False):
+                beta_fig = go.Figure()
+                for bench, window, metric in beta_profile.columns:
+                    if metric != "beta":
+                        continue
+                    series = beta_profile[(bench, window, metric)]
+                    # Until a full window of data exists the value covers fewer days: draw it dotted
+                    full = beta_profile[(bench, window, "n")] >= window
+                    for part, name, dash in ((series[full], f"{bench} {window}日", None),
+                                             (series[~full], f"{bench} {window}日 (部分窓: {window}日未満)", "dot")):
+                        part = part.dropna()
+                        if not part.empty:
+                            beta_fig.add_trace(go.Scatter(x=part.index, y=part, mode="lines", name=name, line=dict(dash=dash)))
+                beta_fig.update_layout(height=300, template="plotly_dark")
+                st.plotly_chart(beta_fig, use_container_width=True)
+
     # Details
     st.markdown("---")
     d1, d2 = st.columns(2)
@@ -266,7 +304,64 @@ def analyze_stock(ticker, context="Scanner"):
         else:
             st.write("特筆すべきシグナルなし")
 
-    return current_price, short_res, med_res
+    if interval != "1d":
+        show_intraday(ticker, interval, deadline)
+
+    return current_price, short_res, med_res, stock
+
+def show_intraday(ticker, interval, deadline=None):
+    """Short-term signals on 1m / 5m bars from the intraday ring buffers (logic/intraday.py)."""
+    res = score_intraday(ticker, interval, deadline=deadline)
+    st.markdown(f"#### 日中シグナル ({interval}足)")
+    if "error" in res:
+        st.caption(res["error"])
+        return
+
+    short_res = res["short"]
+    i1, i2 = st.columns([1, 2])
+    with i1:
+        st.markdown(f"<div class='metric-card'><div class='metric-value'>{short_res['score']}</div><div class='metric-label'>日中モメンタム</div></div>", unsafe_allow_html=True)
+        st.caption(f"{res['as_of']:%m/%d %H:%M} 時点 ({res['bars']}本)")
+        for d in short_res['details']:
+            st.write(f"- {d}")
+    with i2:
+        # Latest session only; the buffer holds several days
+        hist = res["stock"].hist
+        hist = hist[hist.index.date == hist.index[-1].date()]
+        fig = go.Figure(go.Candlestick(x=hist.index, open=hist['Open'], high=hist['High'],
+                                       low=hist['Low'], close=hist['Close'], name='株価'))
+        fig.update_layout(height=300, template="plotly_dark", xaxis_rangeslider_visible=False)
+        st.plotly_chart(fig, use_container_width=True)
+
+def show_portfolio_risk(stocks):
+    """Correlation / VaR summary for the scanned watchlist (equal weight)."""
+    closes = {s.ticker_symbol: s.hist['Close'] for s in stocks if s.hist is not None and not s.hist.empty}
+    if len(closes) < 2:
+        return
+
+    benchmark = benchmark_close(stocks, "^N225")
+    # Kept per session: a rescan only folds in the bars added since the previous scan
+    risk = portfolio_risk(closes, benchmark_close=benchmark, previous=st.session_state.get("portfolio_risk"))
+    st.session_state["portfolio_risk"] = risk
+    summary = risk.summary()
+    if not summary:
+        return
+
+    st.markdown("### ポートフォリオ・リスク (等金額加重)")
+    r1, r2, r3, r4 = st.columns(4)
+    r1.metric("ポートフォリオβ", f"{summary['beta']:.2f}" if summary['beta'] is not None else "-")
+    if benchmark is None:
+        st.caption("日経平均を取得できなかったため、ポートフォリオβは表示していません。")
+    r2.metric("VaR 95% (ヒストリカル)", f"{summary['var_historical']:.2%}")
+    r3.metric("VaR 95% (パラメトリック)", f"{summary['var_parametric']:.2%}")
+    r4.metric("実効銘柄数", f"{summary['effective_n']:.1f}")
+    if summary['covariance_repaired']:
+        st.warning("銘柄ごとにデータ期間が異なるため、共分散行列を補正して (重複期間のない組は無相関、負の固有値は0として) VaRを計算しています。")
+
+    corr = risk.correlation()
+    fig = go.Figure(go.Heatmap(z=corr.values, x=corr.columns, y=corr.index, zmin=-1, zmax=1, colorscale="RdBu"))
+    fig.update_layout(title="リターン相関行列", height=400, template="plotly_dark")
+    st.plotly_chart(fig, use_container_width=True)
 
 # --- Layout ---
 
@@ -279,15 +374,23 @@ if "portfolio" not in st.session_state:
     st.session_state.portfolio = []
 
 with st.sidebar.form("add_stock"):
-    pf_ticker = st.text_input("銘柄コード (例: 7203)", max_chars=6)
+    pf_query = st.text_input("銘柄コード or 社名 (例: 7203)", max_chars=20)
     pf_price = st.number_input("取得単価 (円)", min_value=0.0, step=100.0)
     add_btn = st.form_submit_button("ウォッチリストに追加")
 
-    if add_btn and pf_ticker:
-        if not pf_ticker.endswith(".T"):
-            pf_ticker += ".T"
-        st.session_state.portfolio.append({"ticker": pf_ticker, "entry": pf_price})
-        st.success(f"{pf_ticker} を追加しました")
+    if add_btn and pf_query:
+        pf_code, pf_suggestions = get_ticker_index().validate(pf_query)
+        if pf_code is None:
+            st.error(f"銘柄が見つかりません: {pf_query}")
+            if pf_suggestions:
+                st.caption(f"候補: {format_suggestions(pf_suggestions)}")
+        elif len(st.session_state.portfolio) >= MAX_WATCHLIST:
+            st.error(f"ウォッチリストは最大{MAX_WATCHLIST}銘柄までです。")
+        else:
+            pf_ticker = f"{pf_code}.T"
+            st.session_state.portfolio.append({"ticker": pf_ticker, "entry": pf_price})
+            register_watchlist_tickers([pf_ticker])
+            st.success(f"{pf_ticker} を追加しました")
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("ウォッチリスト")
@@ -295,20 +398,42 @@ st.sidebar.subheader("ウォッチリスト")
 for item in st.session_state.portfolio:
     t = item['ticker']
     entry = item['entry']
-    st.sidebar.markdown(f"**{t}** (取得: ¥{entry:,.0f})")
+    name = get_ticker_index().name(t)
+    label = f"{t} {name}" if name else t
+    st.sidebar.markdown(f"**{label}** (取得: ¥{entry:,.0f})")
+
+# Bar size for the short-term signals (daily analysis is always shown)
+bar_mode = st.sidebar.radio("短期シグナルの足種", list(BAR_MODES), horizontal=True)
+interval = BAR_MODES[bar_mode]
 
 if st.sidebar.button("ポートフォリオ一括スキャン"):
     st.markdown("## ポートフォリオ診断結果")
+    scanned = []
+    # Keeps this watchlist in the snapshot universe (entries not seen for WATCHLIST_TTL are pruned)
+    register_watchlist_tickers([item['ticker'] for item in st.session_state.portfolio])
+    # One budget for the whole scan: a hung ticker cannot hold up the rest indefinitely
+    scan_deadline = Deadline(SCAN_BUDGET)
     for item in st.session_state.portfolio:
         st.markdown(f"### {item['ticker']}")
-        analyze_stock(item['ticker'], context="Portfolio")
+        res = analyze_stock(item['ticker'], context="Portfolio", deadline=scan_deadline, interval=interval)
+        if res:
+            scanned.append(res[-1])
+    if scan_deadline.expired():
+        st.warning(f"スキャン時間の上限 ({SCAN_BUDGET:.0f}秒) に達したため、一部の銘柄は古いデータまたは未取得です。")
+    show_portfolio_risk(scanned)
 
 # Main Scanner
 st.markdown("## 銘柄スキャナー")
-ticker_input = st.text_input("銘柄コード入力 (例: 8035)", "8035")
+ticker_input = st.text_input("銘柄コード or 社名入力 (例: 8035)", "8035")
+
+# Autocomplete from the local TSE index (no network)
+if ticker_input and ticker_input not in get_ticker_index():
+    matches = get_ticker_index().search(ticker_input, limit=8)
+    if matches:
+        st.caption(f"候補: {format_suggestions(matches)}")
 
 if st.button("詳細分析を実行"):
-    analyze_stock(ticker_input)
+    analyze_stock(ticker_input, interval=interval)
 
 # --- AI Picks Section ---
 st.markdown("---")
@@ -335,32 +460,108 @@ with st.expander("AI設定", expanded=not bool(env_key)):
         "gemini-1.5-flash"
     ]
     selected_model = st.selectbox("使用するAIモデルを選択", options=model_options, index=0)
+    focus_input = st.text_input("注目セクター (任意・カンマ区切り)", help="例: 半導体, 銀行")
+    focus_sectors = [x.strip() for x in focus_input.replace("、", ",").split(",") if x.strip()]
+    from logic.model_health import get_model_health
+    health_rows = get_model_health(api_key).snapshot() if api_key else []
+    if health_rows:
+        st.caption("モデル稼働状況 (このAPIキーでの実績)")
+        st.dataframe(pd.DataFrame(health_rows), hide_index=True, use_container_width=True)
+    structured_mode = st.checkbox("構造化出力モード (JSON)", value=True, help="銘柄・根拠・リスク・信頼度をJSONで受け取り、出力トークンと解析失敗を減らします")
+    decompose_mode = st.checkbox("戦略別に並列リサーチ", value=False, help="短期・中期を別々のクエリで同時に調査し、所要時間を最も遅いクエリ程度に短縮します")
+    per_sector_mode = st.checkbox("注目セクターごとにも分割", value=False, disabled=not (decompose_mode and focus_sectors),
+                                  help="戦略 × 注目セクターごとにクエリを分けて同時に調査します")
+
+job_queue = get_job_queue()
+
+# Pick up a job after reconnect: the job id is kept in the URL as well as in session_state
+if "ai_job_id" not in st.session_state and st.query_params.get("job"):
+    st.session_state["ai_job_id"] = st.query_params.get("job")
 
 if st.button("🚀 AIリサーチ開始"):
     if not api_key:
         st.error("有効なAPIキーを入力してください。")
     else:
         from logic.ai_researcher import AIResearcher
-        
-        researcher = AIResearcher(api_key)
-        
-        with st.status("🤖 AIが調査中...", expanded=True) as status:
-            st.write("🔍 Google検索を実行し、最新の市場ニュースを収集しています...")
-            st.write("🧠 厳格な基準で分析・選定中...")
-            
-            # analyze_with_gemini now reads prompt.txt and takes selected_model
-            ai_results = researcher.analyze_with_gemini(selected_model=selected_model)
-            
-            if "error" in ai_results:
-                status.update(label="❌ エラーが発生しました", state="error", expanded=True)
-                st.error(ai_results["error"])
-            else:
-                status.update(label="✅ リサーチ完了！", state="complete", expanded=False)
-                st.session_state['ai_results'] = ai_results
+
+        def run_research(progress, job_id, api_key=api_key, selected_model=selected_model,
+                         structured_mode=structured_mode, focus_sectors=focus_sectors,
+                         decompose=decompose_mode, per_sector=per_sector_mode):
+            researcher = AIResearcher(api_key)
+            result = researcher.analyze_with_gemini(
+                selected_model=selected_model, structured=structured_mode,
+                focus_sectors=focus_sectors, progress=progress,
+                decompose=decompose, per_sector=per_sector
+            )
+            # Track record: fresh picks with the price at pick time (also warms the cache for the tabs)
+            if "error" not in result and not result.get("stale"):
+                progress("推奨銘柄を記録中...")
+                record_picks(result.get("items", []), model=result.get("model") or selected_model, job_id=job_id,
+                             price_lookup=lambda t: score_ticker(t).get("price"))
+            return result
+
+        job_id = job_queue.submit("ai_research", run_research, params={
+            "model": selected_model, "structured": structured_mode, "focus_sectors": focus_sectors,
+            "decompose": decompose_mode, "per_sector": per_sector_mode
+        })
+        st.session_state["ai_job_id"] = job_id
+        st.session_state.pop("ai_results", None)
+        st.query_params["job"] = job_id
+
+# Track record of past picks (scorecard precomputed after the close, see logic/track_record.py)
+with st.expander("📈 AI推奨の実績 (トラックレコード)", expanded=False):
+    card = load_scorecard()
+    if card and card["picks"]:
+        st.caption(f"{card['picks']}件の推奨 (評価可能 {card['evaluated']}件) / {card['updated_at'][:16].replace('T', ' ')} 時点 / 超過リターンは日経平均比")
+        for title, key in (("モデル別", "by_model"), ("戦略別", "by_strategy")):
+            table = pd.DataFrame(card[key])
+            if table.empty:
+                continue
+            st.markdown(f"**{title}**")
+            percent = {c: st.column_config.NumberColumn(c, format="percent") for c in table.columns if c != "picks" and "_" in c}
+            st.dataframe(table, hide_index=True, use_container_width=True, column_config=percent)
+    else:
+        st.caption("まだ記録された推奨がありません。AIリサーチを実行すると推奨銘柄が自動で記録されます。")
+    if st.button("実績を再計算"):
+        job_queue.submit("track_record", lambda progress, job_id: build_scorecard())
+        st.info("バックグラウンドで再計算しています。完了後に再表示すると反映されます。")
+
+@st.fragment(run_every=2)
+def show_ai_job_status():
+    """Polls the background research job; the rest of the page stays usable meanwhile."""
+    job_id = st.session_state.get("ai_job_id")
+    job = job_queue.get(job_id)
+    if not job:
+        st.session_state.pop("ai_job_id", None)
+        return
+
+    if job["status"] in ("queued", "running"):
+        elapsed = time.time() - job["created_at"]
+        st.info(f"🤖 AIが調査中... {job['progress']} ({elapsed:.0f}秒経過) — 他の機能はそのまま利用できます")
+        return
+
+    # Finished: hand the result to the page once, then stop polling
+    del st.session_state["ai_job_id"]
+    if "job" in st.query_params:
+        del st.query_params["job"]
+    result = job.get("result") or {}
+    if job["status"] == "error":
+        st.session_state["ai_error"] = result.get("error", "不明なエラー")
+    else:
+        st.session_state["ai_results"] = result
+    st.rerun()
+
+if "ai_job_id" in st.session_state:
+    show_ai_job_status()
+
+if "ai_error" in st.session_state:
+    st.error(st.session_state.pop("ai_error"))
 
 # Display Results
 if 'ai_results' in st.session_state:
     results = st.session_state['ai_results']
+    if results.get("stale"):
+        st.warning(results.get("warning", "前回のAIリサーチ結果を表示しています。"))
     
     # 1. Full Report (Toggle)
     with st.expander("📝 AI分析レポート全文を表示", expanded=False):
@@ -390,7 +591,10 @@ if 'ai_results' in st.session_state:
                 strategy = item['strategy']
                 
                 # Header info
-                st.caption(f"推奨区分: **{strategy}** | コード: **{ticker}**")
+                caption = f"推奨区分: **{strategy}** | コード: **{ticker}**"
+                if item.get('confidence') is not None:
+                    caption += f" | 信頼度: **{item['confidence']}%**"
+                st.caption(caption)
 
                 # 1. Show yfinance analysis FIRST (Top)
                 st.markdown("#### 📈 市場データ分析 (yfinance)")
@@ -418,5 +622,21 @@ if 'ai_results' in st.session_state:
     else:
         st.warning("レポートから銘柄コードを抽出できませんでした。「### ■ 銘柄：...（1234）」の形式が含まれているか確認してください。")
 
-
-
+# --- Memory instrumentation ---
+ctx = get_script_run_ctx()
+if ctx:
+    record_session(ctx.session_id, st.session_state)
+
+# Admin view: open with ?admin=<ADMIN_TOKEN>
+admin_token = os.getenv("ADMIN_TOKEN")
+if admin_token and st.query_params.get("admin") == admin_token:
+    with st.sidebar.expander("🛠 メモリ使用状況 (管理者)", expanded=True):
+        rss = process_rss()
+        st.metric("プロセスRSS", f"{rss / 2**20:,.1f} MB" if rss else "-")
+        st.caption("キャッシュ")
+        st.dataframe(pd.DataFrame(cache_stats() + intraday_stats()), hide_index=True, use_container_width=True)
+        st.caption("HTTP接続プール (Yahoo Finance)")
+        st.dataframe(pd.DataFrame(pool_stats()), hide_index=True, use_container_width=True)
+        sessions = session_stats()
+        st.caption(f"セッション ({len(sessions)}件, 推定 {sum(s['bytes'] for s in sessions) / 2**20:,.2f} MB)")
+        st.dataframe(pd.DataFrame(sessions), hide_index=True, use_container_width=True)
@@ -1,22 +1,329 @@
 import os
 import re
+import json
+import time
+import hashlib
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
+from logic.model_health import get_model_health, classify_error
+from logic.deadline import Deadline, AI_BUDGET, MODEL_TIMEOUT
+from logic.jobs import load_latest_job
+
+# Response schema for structured output mode (OpenAPI subset accepted by Gemini)
+RESEARCH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "items": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "ticker": {"type": "STRING", "description": "4桁の証券コード"},
+                    "name": {"type": "STRING"},
+                    "strategy": {"type": "STRING", "enum": ["短期", "中期"]},
+                    "facts": {"type": "ARRAY", "items": {"type": "STRING"}},
+                    "risks": {"type": "ARRAY", "items": {"type": "STRING"}},
+                    "confidence": {"type": "INTEGER", "description": "データ信頼度スコア (0-100)"},
+                },
+                "required": ["ticker", "name", "strategy", "facts", "risks", "confidence"],
+            },
+        },
+    },
+    "required": ["items"],
+}
+
+# Replaces the Markdown "Output Format" section of prompt.txt in structured mode
+STRUCTURED_OUTPUT_INSTRUCTION = """
+
+# Output Format (JSON)
+
+上記の Output Format の代わりに、指定されたJSONスキーマのみで出力してください。
+facts には出典付きの事実、risks には買えない理由を簡潔な箇条書きで記載し、説明文は書かないでください。
+"""
+
+# Context caching for the static part of prompt.txt (Role / Steps / Output Format / Constraints)
+CONTEXT_CACHE_TTL = 3600 # seconds
+DYNAMIC_SECTIONS = ("Task",) # prompt.txt sections sent with every request
+
+# Decomposed research (analyze_with_gemini(decompose=True))
+STRATEGIES = ("短期", "中期")
+PICKS_PER_STRATEGY = 3
+MAX_PARALLEL_QUERIES = 6
+
+_prompt_cache = {} # path -> (mtime, (static_instruction, task))
+_context_caches = {} # (key_digest, model, instruction_digest) -> (cache_name or None, expires_at)
+_cache_lock = threading.Lock()
+_context_create_lock = threading.Lock() # Concurrent sub-queries create each cached context once
+
+
+def load_prompt(prompt_path):
+    """
+    Reads prompt.txt once per process (re-read only when the file changes) and splits it
+    into the static instruction and the dynamic Task section.
+    """
+    mtime = os.path.getmtime(prompt_path)
+    with _cache_lock:
+        cached = _prompt_cache.get(prompt_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    static_parts = []
+    task_parts = []
+    # Split on top-level "# Section" headers, keeping the header with its body
+    for section in re.split(r'(?m)^(?=# )', content):
+        if not section.strip():
+            continue
+        title = section.splitlines()[0].lstrip("# ").strip()
+        if title in DYNAMIC_SECTIONS:
+            task_parts.append(section.strip())
+        else:
+            static_parts.append(section.strip())
+
+    parts = ("\n\n".join(static_parts), "\n\n".join(task_parts))
+    with _cache_lock:
+        _prompt_cache[prompt_path] = (mtime, parts)
+    return parts
+
+
+def build_dynamic_prompt(task, focus_sectors=None, today=None):
+    """Per-request part of the prompt: the task plus date and optional focus sectors."""
+    today = today or datetime.date.today()
+    lines = [task] if task else []
+    lines.append(f"# Context\n\n本日の日付: {today:%Y-%m-%d}")
+    if focus_sectors:
+        lines.append(f"注目セクター: {'、'.join(focus_sectors)}")
+    return "\n\n".join(lines)
+
+
+def build_sub_queries(task, focus_sectors=None, per_sector=False, today=None):
+    """
+    Splits the Task into independent sub-queries: one per strategy, and with per_sector one
+    per (strategy, focus sector) with the picks spread over the sectors.
+    Returns [{"label", "strategy", "sector", "prompt"}].
+    """
+    sectors = list(focus_sectors) if per_sector and focus_sectors else [None]
+    picks = max(1, -(-PICKS_PER_STRATEGY // len(sectors))) # ceil
+    queries = []
+    for strategy in STRATEGIES:
+        other = "、".join(f"【{s}】" for s in STRATEGIES if s != strategy)
+        for sector in sectors:
+            scope = f"今回は上記 Task のうち【{strategy}】の銘柄のみを{picks}つ選定してください ({other}の銘柄は不要です)。"
+            if sector:
+                scope += f"\n対象は「{sector}」セクターの銘柄に限ります。"
+            prompt = build_dynamic_prompt(task, focus_sectors=None if sector else focus_sectors, today=today)
+            queries.append({
+                "label": f"{strategy}/{sector}" if sector else strategy,
+                "strategy": strategy,
+                "sector": sector,
+                "prompt": f"{prompt}\n\n# Scope\n\n{scope}",
+            })
+    return queries
+
+
+def merge_results(results, per_strategy=PICKS_PER_STRATEGY):
+    """
+    Merges sub-query results into one {"full_report", "items", "model"}; a ticker picked twice
+    is kept once (first wins) and each strategy is trimmed to per_strategy picks, since
+    per-sector sub-queries round their share up.
+    """
+    items = []
+    seen_tickers = set()
+    per_strategy_count = {}
+    for result in results:
+        for item in result["items"]:
+            if item["ticker"] in seen_tickers or per_strategy_count.get(item["strategy"], 0) >= per_strategy:
+                continue
+            seen_tickers.add(item["ticker"])
+            per_strategy_count[item["strategy"]] = per_strategy_count.get(item["strategy"], 0) + 1
+            items.append(item)
+    models = list(dict.fromkeys(r["model"] for r in results if r.get("model")))
+    return {
+        "full_report": "\n\n---\n\n".join(r["full_report"] for r in results),
+        "items": items,
+        "model": ", ".join(models),
+    }
+
 
 class AIResearcher:
-    def __init__(self, api_key):
+    def __init__(self, api_key, client=None, health=None):
         self.api_key = api_key
+        # Model health is shared per API key so deprecated / throttled models stay skipped across runs
+        self.health = health or get_model_health(api_key)
+        if client is not None:
+            # Injected client (e.g. a local fake in tests)
+            self.client = client
+            return
         try:
             self.client = genai.Client(api_key=self.api_key)
-            # Default model to try
-            self.model_name = "gemini-3-pro-preview" 
         except Exception as e:
             print(f"Error configuring Gemini: {e}")
             self.client = None
 
-    def analyze_with_gemini(self, prompt_path="prompt.txt", selected_model=None):
+    def _get_cached_context(self, model, instruction, search_tool):
+        """
+        Returns the name of a cached context holding the static instruction (and the search tool)
+        for this model, creating it on first use. Returns None if caching is unavailable for
+        the model (e.g. prompt below the minimum cacheable size); that result is remembered
+        for the TTL so we do not retry on every call.
+        """
+        key = self._context_key(model, instruction)
+        now = time.time()
+
+        with _cache_lock:
+            cached = _context_caches.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        with _context_create_lock:
+            # Another sub-query may have created it while we waited
+            with _cache_lock:
+                cached = _context_caches.get(key)
+            if cached and cached[1] > now:
+                return cached[0]
+            return self._create_cached_context(key, model, instruction, search_tool, now)
+
+    def _context_key(self, model, instruction):
+        key_digest = hashlib.sha256(str(self.api_key).encode()).hexdigest()[:16]
+        instruction_digest = hashlib.sha256(instruction.encode()).hexdigest()[:16]
+        return (key_digest, model, instruction_digest)
+
+    def _create_cached_context(self, key, model, instruction, search_tool, now):
+        try:
+            cache = self.client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=instruction,
+                    tools=[search_tool],
+                    ttl=f"{CONTEXT_CACHE_TTL}s"
+                )
+            )
+            name = cache.name
+        except Exception:
+            name = None
+
+        # Refresh a minute before the server-side TTL runs out
+        with _cache_lock:
+            _context_caches[key] = (name, now + CONTEXT_CACHE_TTL - 60)
+        return name
+
+    def _generate(self, model, instruction, dynamic_prompt, search_tool, structured, timeout=None):
+        """
+        Single generate_content call, using the cached static context when available.
+        timeout (seconds) is also sent as the HTTP timeout so a late response is not waited for.
+        """
+        config_kwargs = {"temperature": 1.0} # Recommended for grounding
+        if timeout:
+            config_kwargs["http_options"] = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+        if structured:
+            config_kwargs["response_mime_type"] = "application/json"
+            config_kwargs["response_schema"] = RESEARCH_SCHEMA
+
+        uncached = types.GenerateContentConfig(
+            system_instruction=instruction,
+            tools=[search_tool],
+            **config_kwargs
+        )
+        cache_name = self._get_cached_context(model, instruction, search_tool)
+        if not cache_name:
+            return self.client.models.generate_content(model=model, contents=dynamic_prompt, config=uncached)
+
+        try:
+            return self.client.models.generate_content(
+                model=model,
+                contents=dynamic_prompt,
+                config=types.GenerateContentConfig(cached_content=cache_name, **config_kwargs)
+            )
+        except Exception as e:
+            if classify_error(e) != "cache_miss":
+                raise
+            # The cached context expired or was deleted server-side: forget it (it is
+            # recreated on the next call) and resend this request with the full instruction
+            with _cache_lock:
+                _context_caches.pop(self._context_key(model, instruction), None)
+            return self.client.models.generate_content(model=model, contents=dynamic_prompt, config=uncached)
+
+    def _run_query(self, query, ranked_candidates, static_instruction, search_tool, structured, deadline, progress):
+        """
+        One grounded generation for one (sub-)query, trying ranked models in order.
+        Returns (result or None, errors, timed_out); the result and its items are tagged with
+        the model that produced them and, for a strategy sub-query, items default to its strategy.
+        Sub-queries run concurrently, so the model is returned rather than stored on self.
+        """
+        prefix = f"[{query['label']}] " if query.get("label") else ""
+        response = None
+        errors = []
+        timed_out = False
+
+        for model in ranked_candidates:
+            if deadline.expired():
+                timed_out = True
+                errors.append(f"{prefix}時間切れ ({AI_BUDGET:.0f}秒) のため残りのモデルをスキップ")
+                break
+            if progress:
+                progress(f"{prefix}{model} で調査・分析中...")
+            started = time.monotonic()
+            step = Deadline.within(deadline, MODEL_TIMEOUT)
+            try:
+                if structured:
+                    try:
+                        response = step.call_model(
+                            self._generate, model, static_instruction + STRUCTURED_OUTPUT_INSTRUCTION,
+                            query["prompt"], search_tool, structured=True, timeout=step.remaining()
+                        )
+                    except Exception as e:
+                        # Some models reject a response schema together with grounding.
+                        # A missing, throttled or timed-out model fails the same way without it, so move on.
+                        if classify_error(e) in ("not_found", "quota", "timeout"):
+                            raise
+                        errors.append(f"{prefix}{model} (structured): {str(e)}")
+                        response = None
+
+                if not response:
+                    response = step.call_model(
+                        self._generate, model, static_instruction, query["prompt"], search_tool,
+                        structured=False, timeout=step.remaining()
+                    )
+                self.health.record_success(model, time.monotonic() - started)
+                break
+            except Exception as e:
+                self.health.record_failure(model, e, time.monotonic() - started)
+                errors.append(f"{prefix}{model}: {str(e)}")
+                continue
+
+        if not response:
+            return None, errors, timed_out
+
+        text = response.text
+        result = self._parse_structured(text) if structured else None
+        result = result or self._parse_response(text)
+        result["model"] = model
+        for item in result["items"]:
+            item["model"] = model
+            if query.get("strategy") and item["strategy"] == "不明":
+                item["strategy"] = query["strategy"]
+        return result, errors, timed_out
+
+    def analyze_with_gemini(self, prompt_path="prompt.txt", selected_model=None, structured=False, focus_sectors=None,
+                            progress=None, deadline=None, decompose=False, per_sector=False):
         """
         Loads prompt from file and executes with Google Search Grounding using google-genai SDK.
+        The static part of the prompt is registered once as cached context per model; each call
+        only sends the Task section plus the date and focus sectors.
+        If structured is True, requests JSON matching RESEARCH_SCHEMA and validates it directly;
+        the Markdown regex parser is used only as a fallback.
+        If decompose is True, the Task is split into one sub-query per strategy (and per focus
+        sector with per_sector) that run concurrently; results are merged with duplicate tickers
+        removed, so the wall-clock time is about that of the slowest sub-query.
+        progress, if given, is called with a short status message before each model attempt.
+        The whole call is bounded by AI_BUDGET (and deadline); each model attempt by MODEL_TIMEOUT.
+        If time runs out before any model answers, the last finished research result is
+        returned with "stale": True.
         """
         if not self.client:
             return {"error": "API Key not configured."}
@@ -28,13 +335,18 @@ class AIResearcher:
             prompt_path = os.path.join(base_dir, "prompt.txt")
 
         try:
-            with open(prompt_path, "r", encoding="utf-8") as f:
-                prompt_content = f.read()
+            static_instruction, task = load_prompt(prompt_path)
         except FileNotFoundError:
             return {"error": f"プロンプトファイル {prompt_path} が見つかりませんでした。"}
         except Exception as e:
             return {"error": f"プロンプト読み込みエラー: {e}"}
 
+        if decompose:
+            queries = build_sub_queries(task, focus_sectors=focus_sectors, per_sector=per_sector)
+        else:
+            queries = [{"label": None, "strategy": None, "prompt": build_dynamic_prompt(task, focus_sectors=focus_sectors)}]
+        deadline = Deadline.within(deadline, AI_BUDGET)
+
         # 2. Generate Content with Search Tool (Grounding)
         try:
             # Code adaptation from user snippet
@@ -62,49 +374,134 @@ class AIResearcher:
             for c in candidates:
                 if c not in unique_candidates:
                     unique_candidates.append(c)
+
+            # Skip models in cool-down and try healthy / fast ones first
+            ranked_candidates = self.health.rank(unique_candidates, pinned=selected_model)
+
+            def run(query):
+                return self._run_query(query, ranked_candidates, static_instruction, search_tool, structured, deadline, progress)
+
+            if len(queries) == 1:
+                outcomes = [run(queries[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(len(queries), MAX_PARALLEL_QUERIES), thread_name_prefix="research") as pool:
+                    outcomes = list(pool.map(run, queries))
+
+            results = [result for result, _, _ in outcomes if result]
+            errors = [e for _, errs, _ in outcomes for e in errs]
+            timed_out = any(t for _, _, t in outcomes)
+
+            skipped = [m for m in unique_candidates if m not in ranked_candidates]
+            if skipped:
+                errors.append(f"クールダウン中のためスキップ: {', '.join(skipped)}")
             
-            response = None
-            errors = []
-
-            for model in unique_candidates:
-                try:
-                    response = self.client.models.generate_content(
-                        model=model,
-                        contents=prompt_content,
-                        config=types.GenerateContentConfig(
-                            tools=[search_tool],
-                            temperature=1.0 # Recommended for grounding
-                        )
-                    )
-                    self.model_name = model
-                    break
-                except Exception as e:
-                    errors.append(f"{model}: {str(e)}")
-                    continue
-            
-            if not response:
+            if not results:
                 error_details = "\n".join(errors)
+                if timed_out or deadline.expired():
+                    # Only a fresh result, so a fallback never re-serves an older fallback
+                    previous = load_latest_job("ai_research", include_stale=False)
+                    if previous and previous.get("result"):
+                        # Partial result: the last finished research, marked as stale
+                        return {
+                            **previous["result"],
+                            "stale": True,
+                            "stale_since": previous["updated_at"],
+                            "warning": f"時間内に応答がなかったため前回の結果を表示しています。\n詳細:\n{error_details}",
+                        }
                 return {"error": f"全てのモデルで生成に失敗しました。\n詳細:\n{error_details}"}
 
-            text = response.text
-            return self._parse_response(text)
+            if len(queries) == 1:
+                return results[0]
+
+            merged = merge_results(results)
+            failed = [q["label"] for q, (result, _, _) in zip(queries, outcomes) if not result]
+            if failed:
+                error_details = "\n".join(errors)
+                merged["warning"] = f"一部のサブクエリ ({', '.join(failed)}) が失敗したため、残りの結果のみ表示しています。\n詳細:\n{error_details}"
+            return merged
             
         except Exception as e:
             error_msg = str(e)
             return {"error": f"AI生成エラー (Grounding/NewSDK): {error_msg}"}
-            
-            text = response.text
-            return self._parse_response(text)
-            
-        except Exception as e:
-            error_msg = str(e)
-            if "404" in error_msg or "not found" in error_msg.lower():
-                 return {"error": f"モデルが見つかりません。APIキーまたはモデル名を確認してください。\nDetails: {error_msg}"}
-            
-            # Fallback: Try without explicit tool arg keywords if syntax was wrong, 
-            # trusting the prompt instructions if the model has default access (unlikely but possible for some keys)
-            # Or return error.
-            return {"error": f"AI生成エラー (Grounding): {error_msg}"}
+
+    def _parse_structured(self, text):
+        """
+        Validates a JSON response following RESEARCH_SCHEMA.
+        Returns the same {"full_report", "items"} shape as _parse_response, or None if the
+        response is not usable JSON (caller then falls back to the regex parser).
+        """
+        if not text:
+            return None
+
+        # Tolerate a ```json fenced block
+        cleaned = text.strip()
+        if cleaned.startswith("```"):
+            cleaned = re.sub(r'^```(?:json)?\s*|\s*```$', '', cleaned)
+
+        try:
+            data = json.loads(cleaned)
+        except ValueError:
+            return None
+
+        raw_items = data.get("items") if isinstance(data, dict) else data
+        if not isinstance(raw_items, list):
+            return None
+
+        unique_items = []
+        seen_tickers = set()
+        for raw in raw_items:
+            if not isinstance(raw, dict):
+                continue
+
+            ticker = str(raw.get("ticker", "")).strip().replace(".T", "")
+            if not re.fullmatch(r'\d{4}', ticker) or ticker in seen_tickers:
+                continue
+
+            strategy = str(raw.get("strategy", ""))
+            if "短期" in strategy or strategy.lower().startswith("short"):
+                strategy = "短期"
+            elif "中期" in strategy or strategy.lower().startswith("medium"):
+                strategy = "中期"
+            else:
+                strategy = "不明"
+
+            facts = [str(f) for f in raw.get("facts") or []]
+            risks = [str(r) for r in raw.get("risks") or []]
+            try:
+                confidence = max(0, min(100, int(raw.get("confidence"))))
+            except (TypeError, ValueError):
+                confidence = None
+
+            item = {
+                "ticker": ticker,
+                "name": str(raw.get("name") or ticker).strip(),
+                "strategy": strategy,
+                "facts": facts,
+                "risks": risks,
+                "confidence": confidence,
+            }
+            item["full_text"] = self._render_item(item)
+
+            seen_tickers.add(ticker)
+            unique_items.append(item)
+
+        if not unique_items:
+            return None
+
+        return {
+            "full_report": "\n\n".join(item["full_text"] for item in unique_items),
+            "items": unique_items
+        }
+
+    def _render_item(self, item):
+        """Renders a structured item in the same Markdown layout as prompt.txt."""
+        lines = [f"### ■ 銘柄：{item['name']}（{item['ticker']}） 【{item['strategy']}】", "", "**【事実ベースの材料】**"]
+        lines += [f"* {f}" for f in item["facts"]] or ["* 情報不足"]
+        lines += ["", "**【反証とリスク（重要）】**"]
+        lines += [f"* {r}" for r in item["risks"]] or ["* 情報不足"]
+        if item["confidence"] is not None:
+            lines += ["", "**【データ信頼度スコア】**", f"{item['confidence']}%"]
+        return "\n".join(lines)
 
     def _parse_response(self, text):
         """
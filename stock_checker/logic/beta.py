@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Rolling windows (trading days) evaluated in one pass
+DEFAULT_WINDOWS = (20, 60, 250)
+
+# Benchmarks used for the beta profile.
+# TOPIX itself is not reliably served by yfinance, so the TOPIX ETF (1306.T) is used as a proxy.
+# Sector indices can be added by passing e.g. {"Electric": "1625.T"} (TOPIX-17 ETFs).
+DEFAULT_BENCHMARKS = {
+    "N225": "^N225",
+    "TOPIX": "1306.T",
+}
+
+
+METRICS = ("beta", "corr", "r2", "n")
+
+
+def _window_sums(cum, window):
+    """Rolling window sums from a cumulative sum array (rows = time)."""
+    out = cum.copy()
+    out[window:] = cum[window:] - cum[:-window]
+    return out
+
+
+def rolling_beta(stock_returns, benchmark_returns, windows=DEFAULT_WINDOWS, min_periods=None):
+    """
+    Rolling beta / correlation / R^2 of one return series against several benchmarks.
+
+    All windows and benchmarks are computed in a single pass: the five cumulative sums
+    (x, y, x^2, y^2, xy) are built once, and every window is an O(T) difference of them.
+    Missing benchmark days are masked out instead of dropping rows, so each window keeps
+    its own count of overlapping observations.
+
+    Args:
+        stock_returns: pd.Series of daily returns (defines the time axis).
+        benchmark_returns: dict {name: pd.Series} of benchmark daily returns.
+        windows: iterable of window lengths in rows.
+        min_periods: minimum overlapping observations per window (default: window // 2).
+
+    Returns:
+        pd.DataFrame indexed like stock_returns with MultiIndex columns
+        (benchmark, window, metric) where metric is "beta", "corr", "r2" or "n", the number of
+        overlapping observations in the window. A row with n < window is a partial window
+        (e.g. the 250-day window during the first year of data) and should be shown as such.
+    """
+    names = list(benchmark_returns.keys())
+    index = stock_returns.index
+    windows = [int(w) for w in windows]
+
+    columns = pd.MultiIndex.from_product(
+        [names, windows, list(METRICS)], names=["benchmark", "window", "metric"]
+    )
+    if not names or len(index) == 0:
+        return pd.DataFrame(index=index, columns=columns, dtype=float)
+
+    x = stock_returns.to_numpy(dtype=float)
+    y = np.column_stack([
+        benchmark_returns[n].reindex(index).to_numpy(dtype=float) for n in names
+    ])
+
+    # Valid where both sides exist; masked entries contribute zero to every sum
+    mask = np.isfinite(y) & np.isfinite(x)[:, None]
+    xm = np.where(mask, x[:, None], 0.0)
+    ym = np.where(mask, y, 0.0)
+
+    # Demean for numerical stability (covariance is shift invariant)
+    counts = mask.sum(axis=0)
+    safe_counts = np.where(counts > 0, counts, 1)
+    xm = np.where(mask, xm - xm.sum(axis=0) / safe_counts, 0.0)
+    ym = np.where(mask, ym - ym.sum(axis=0) / safe_counts, 0.0)
+
+    cum_n = np.cumsum(mask, axis=0, dtype=float)
+    cum_x = np.cumsum(xm, axis=0)
+    cum_y = np.cumsum(ym, axis=0)
+    cum_xx = np.cumsum(xm * xm, axis=0)
+    cum_yy = np.cumsum(ym * ym, axis=0)
+    cum_xy = np.cumsum(xm * ym, axis=0)
+
+    out = np.full((len(index), len(names), len(windows), len(METRICS)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for wi, w in enumerate(windows):
+            n = _window_sums(cum_n, w)
+            sx = _window_sums(cum_x, w)
+            sy = _window_sums(cum_y, w)
+            sxx = _window_sums(cum_xx, w)
+            syy = _window_sums(cum_yy, w)
+            sxy = _window_sums(cum_xy, w)
+
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+
+            beta = cov / var_y
+            corr = cov / np.sqrt(var_x * var_y)
+
+            need = min_periods if min_periods is not None else max(w // 2, 2)
+            invalid = (n < need) | (var_y <= 0)
+            beta[invalid] = np.nan
+            corr[invalid] = np.nan
+
+            out[:, :, wi, 0] = beta
+            out[:, :, wi, 1] = corr
+            out[:, :, wi, 2] = corr * corr
+            out[:, :, wi, 3] = n
+
+    return pd.DataFrame(out.reshape(len(index), -1), index=index, columns=columns)
+
+
+def latest_beta_summary(profile):
+    """
+    Latest value of every (benchmark, window) pair.
+
+    Returns:
+        dict {benchmark: {window: {"beta", "corr", "r2", "n"}}} with None for missing values.
+    """
+    summary = {}
+    if profile is None or profile.empty:
+        return summary
+
+    last = profile.iloc[-1]
+    for (bench, window, metric), value in last.items():
+        summary.setdefault(bench, {}).setdefault(window, {})[metric] = (
+            None if pd.isna(value) else float(value)
+        )
+    return summary
@@ -0,0 +1,66 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Budgets (seconds), overridable by environment variables
+ACTION_BUDGET = float(os.getenv("ACTION_BUDGET", "20")) # One analyze_stock call
+SCAN_BUDGET = float(os.getenv("SCAN_BUDGET", "60")) # Whole portfolio scan
+TICKER_TIMEOUT = float(os.getenv("TICKER_TIMEOUT", "15")) # Fetch + score of one ticker
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10")) # One yfinance call
+AI_BUDGET = float(os.getenv("AI_BUDGET", "300")) # One AI research job
+MODEL_TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "120")) # One Gemini model attempt
+
+# Blocking calls run here so the caller can stop waiting; a timed-out call keeps its
+# thread until the library returns, so the pools are sized well above normal concurrency.
+# Short yfinance fetches and long model calls get separate pools, so slow model calls
+# can never starve the fetches.
+_fetch_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline-fetch")
+_model_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="deadline-model")
+
+
+class Deadline:
+    """
+    Time budget of one user action, passed down through fetch / scoring / model calls.
+    Sub-steps take a child deadline capped at their own timeout, so no step can outlive
+    the action that started it.
+    """
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def within(cls, parent, cap):
+        """Child deadline: at most cap seconds, and never past parent (None = no parent)."""
+        if parent is None:
+            return cls(cap)
+        return cls(min(cap, parent.remaining()), clock=parent.clock)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def call(self, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs) on the fetch pool, raising TimeoutError once the deadline passes.
+        The call itself cannot be interrupted; its result is discarded if it finishes late.
+        """
+        return self._run(_fetch_executor, fn, *args, **kwargs)
+
+    def call_model(self, fn, *args, **kwargs):
+        """Like call(), on the pool reserved for (slow) model calls."""
+        return self._run(_model_executor, fn, *args, **kwargs)
+
+    def _run(self, executor, fn, *args, **kwargs):
+        if self.expired():
+            raise TimeoutError("deadline exceeded")
+        future = executor.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.remaining())
+        except FutureTimeoutError:
+            # Not the builtin TimeoutError before Python 3.11
+            future.cancel()
+            raise TimeoutError("deadline exceeded") from None
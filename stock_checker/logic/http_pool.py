@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Same backend as yfinance: curl_cffi (browser TLS fingerprint) unless disabled or missing
+HAS_CURL_CFFI = False
+if os.environ.get("YF_DISABLE_CURL_CFFI", "").lower() not in ("1", "true", "yes"):
+    try:
+        from curl_cffi import CurlInfo
+        from curl_cffi import requests as _backend
+        HAS_CURL_CFFI = True
+    except ImportError:
+        pass
+if not HAS_CURL_CFFI:
+    import requests as _backend
+    from requests.adapters import HTTPAdapter
+
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "8")) # Concurrent requests per host
+POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "30")) # Seconds to wait for a free slot
+
+
+class PooledSession(_backend.Session):
+    """
+    One keep-alive HTTP session for every yfinance call of the process.
+
+    Connections, cookies and Yahoo's crumb are reused across tickers instead of being
+    renegotiated per yf.Ticker / yf.download, and at most max_per_host requests run against
+    one host at a time (the rest wait for a slot, which shows up as saturation in stats()).
+    With curl_cffi each thread keeps its own keep-alive connection; new_connections counts
+    the TCP/TLS connections actually opened, so 1 - new_connections / requests is the reuse rate.
+    """
+
+    def __init__(self, max_per_host=MAX_CONNECTIONS_PER_HOST, pool_timeout=POOL_TIMEOUT):
+        if HAS_CURL_CFFI:
+            super().__init__(impersonate="chrome", curl_infos=[CurlInfo.NUM_CONNECTS])
+        else:
+            super().__init__()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_per_host)
+            self.mount("https://", adapter)
+            self.mount("http://", adapter)
+        self.max_per_host = max_per_host
+        self.pool_timeout = pool_timeout
+        self._pool_lock = threading.Lock()
+        self._slots = {} # host -> BoundedSemaphore
+        self._stats = {} # host -> counters
+
+    def _host(self, host):
+        with self._pool_lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+                self._stats[host] = {
+                    "in_use": 0, "peak": 0, "requests": 0, "waited": 0, "wait_seconds": 0.0,
+                    "exhausted": 0, "errors": 0, "new_connections": 0,
+                }
+            return self._slots[host], self._stats[host]
+
+    def request(self, method, url, *args, **kwargs):
+        slots, s = self._host(urlsplit(url).hostname or "")
+        started = time.monotonic()
+        if not slots.acquire(blocking=False):
+            with self._pool_lock:
+                s["waited"] += 1
+            if not slots.acquire(timeout=self.pool_timeout):
+                with self._pool_lock:
+                    s["exhausted"] += 1
+                raise TimeoutError(f"HTTP pool for {urlsplit(url).hostname} exhausted")
+        with self._pool_lock:
+            s["requests"] += 1
+            s["wait_seconds"] += time.monotonic() - started
+            s["in_use"] += 1
+            s["peak"] = max(s["peak"], s["in_use"])
+
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception:
+            with self._pool_lock:
+                s["errors"] += 1
+            raise
+        finally:
+            with self._pool_lock:
+                s["in_use"] -= 1
+            slots.release()
+
+        if HAS_CURL_CFFI:
+            with self._pool_lock:
+                s["new_connections"] += response.infos.get(CurlInfo.NUM_CONNECTS) or 0
+        return response
+
+    def stats(self):
+        """Per-host pool usage: peak / limit near 1 and a high waited share mean the pool is saturated."""
+        with self._pool_lock:
+            rows = []
+            for host, s in self._stats.items():
+                n = s["requests"]
+                rows.append({
+                    "host": host,
+                    "limit": self.max_per_host,
+                    "in_use": s["in_use"],
+                    "peak": s["peak"],
+                    "requests": n,
+                    "waited": s["waited"],
+                    "saturation": s["waited"] / n if n else 0.0,
+                    "avg_wait_ms": 1000 * s["wait_seconds"] / n if n else 0.0,
+                    "exhausted": s["exhausted"],
+                    "errors": s["errors"],
+                    "new_connections": s["new_connections"] if HAS_CURL_CFFI else None,
+                    "reuse_rate": 1 - s["new_connections"] / n if n and HAS_CURL_CFFI else None,
+                })
+            return rows
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session; pass it to every yf.Ticker / yf.download."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = PooledSession()
+        return _session
+
+
+def pool_stats():
+    with _session_lock:
+        session = _session
+    return session.stats() if session else []
@@ -0,0 +1,187 @@
+"""
+NumPy indicator kernels.
+
+Every function takes contiguous float arrays with time on the last axis, so the same call
+works for one ticker (shape (T,)) or a ticker x time matrix (shape (N, T)).
+Leading values that do not have a full window yet are NaN in the output. A NaN input (a
+missing bar) only makes the windows that contain it NaN, like pandas rolling(); the
+exponential averages carry their last value over it.
+"""
+import numpy as np
+
+
+def _as_array(x):
+    return np.ascontiguousarray(x, dtype=float)
+
+
+def cumulative(x):
+    """(cumulative sum with NaNs as 0, cumulative count of valid values) for rolling_sum."""
+    x = _as_array(x)
+    valid = np.isfinite(x)
+    return np.cumsum(np.where(valid, x, 0.0), axis=-1), np.cumsum(valid, axis=-1)
+
+
+def _window_diff(cum, window):
+    out = np.full(cum.shape, np.nan)
+    out[..., window - 1] = cum[..., window - 1]
+    out[..., window:] = cum[..., window:] - cum[..., :-window]
+    return out
+
+
+def rolling_sum(x, window, cum=None):
+    """
+    Rolling sum over the last axis from cumulative sums (pass cum=cumulative(x) to reuse them).
+    Windows containing a NaN are NaN; later windows are unaffected.
+    """
+    x = _as_array(x)
+    if window > x.shape[-1]:
+        return np.full(x.shape, np.nan)
+    total, count = cum if cum is not None else cumulative(x)
+    return np.where(_window_diff(count, window) == window, _window_diff(total, window), np.nan)
+
+
+def sma(x, window, cum=None):
+    return rolling_sum(x, window, cum) / window
+
+
+def ema(x, span=None, alpha=None, seed=None):
+    """
+    Exponential moving average (pandas ewm(adjust=False) recursion).
+    seed: number of leading values averaged to start the recursion (Wilder style); values
+    before the seed are NaN.
+    """
+    x = _as_array(x)
+    if alpha is None:
+        alpha = 2.0 / (span + 1)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] == 0:
+        return out
+
+    start = 0
+    if seed:
+        if seed > x.shape[-1]:
+            return out
+        start = seed - 1
+        out[..., start] = x[..., :seed].mean(axis=-1)
+    else:
+        out[..., 0] = x[..., 0]
+
+    prev = out[..., start]
+    for t in range(start + 1, x.shape[-1]):
+        xt = x[..., t]
+        # A NaN bar keeps the previous value; a NaN start restarts at the first valid value
+        prev = np.where(np.isnan(xt), prev, np.where(np.isnan(prev), xt, alpha * xt + (1 - alpha) * prev))
+        out[..., t] = prev
+    return out
+
+
+def wilder(x, window):
+    """Wilder smoothing (alpha = 1/window, seeded with the first window's mean)."""
+    return ema(x, alpha=1.0 / window, seed=window)
+
+
+def _price_delta(close):
+    delta = np.zeros_like(close)
+    delta[..., 1:] = np.diff(close, axis=-1)
+    return delta
+
+
+def rsi(close, window=14, method="sma", delta=None):
+    """
+    Relative Strength Index.
+    method="sma" matches the rolling-mean RSI used so far; method="wilder" is the classic
+    Wilder-smoothed RSI.
+    """
+    close = _as_array(close)
+    if delta is None:
+        delta = _price_delta(close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    if method == "wilder":
+        # First delta has no previous close, so smoothing starts at index 1
+        avg_gain = np.full(close.shape, np.nan)
+        avg_loss = np.full(close.shape, np.nan)
+        avg_gain[..., 1:] = wilder(gain[..., 1:], window)
+        avg_loss[..., 1:] = wilder(loss[..., 1:], window)
+    else:
+        avg_gain = sma(gain, window)
+        avg_loss = sma(loss, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Returns (macd line, signal line, histogram)."""
+    close = _as_array(close)
+    line = ema(close, span=fast) - ema(close, span=slow)
+    sig = ema(line, span=signal)
+    return line, sig, line - sig
+
+
+def bollinger(close, window=20, k=2.0, cum=None, cum_sq=None):
+    """Returns (middle, upper, lower) bands using population standard deviation."""
+    close = _as_array(close)
+    mean = sma(close, window, cum)
+    mean_sq = sma(close * close, window, cum_sq)
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+    return mean, mean + k * std, mean - k * std
+
+
+def true_range(high, low, close):
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    prev_close = np.empty_like(close)
+    prev_close[..., 0] = close[..., 0]
+    prev_close[..., 1:] = close[..., :-1]
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, window=14):
+    """Average True Range (Wilder smoothing)."""
+    return wilder(true_range(high, low, close), window)
+
+
+def volume_ratio(volume, window=5, cum=None):
+    """Volume divided by the average of the previous `window` bars (current bar excluded)."""
+    volume = _as_array(volume)
+    prev_avg = np.full(volume.shape, np.nan)
+    if volume.shape[-1] > window:
+        prev_avg[..., window:] = sma(volume, window, cum)[..., window - 1:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return volume / prev_avg
+
+
+DEFAULT_MA_WINDOWS = (5, 25, 75)
+
+
+def compute_indicators(close, high=None, low=None, volume=None,
+                       rsi_window=14, ma_windows=DEFAULT_MA_WINDOWS, bb_window=20, volume_window=5):
+    """
+    All indicators in one pass over the data: the cumulative sums of close and close^2 and
+    the price delta are computed once and shared by the moving averages, Bollinger bands and
+    both RSI variants.
+
+    Returns a dict of arrays shaped like close.
+    """
+    close = _as_array(close)
+    cum = cumulative(close)
+    cum_sq = cumulative(close * close)
+    delta = _price_delta(close)
+
+    out = {
+        "rsi": rsi(close, rsi_window, "sma", delta=delta),
+        "rsi_wilder": rsi(close, rsi_window, "wilder", delta=delta),
+    }
+    for w in ma_windows:
+        out[f"sma_{w}"] = sma(close, w, cum)
+
+    out["bb_mid"], out["bb_upper"], out["bb_lower"] = bollinger(close, bb_window, cum=cum, cum_sq=cum_sq)
+    out["macd"], out["macd_signal"], out["macd_hist"] = macd(close)
+
+    if high is not None and low is not None:
+        out["atr"] = atr(high, low, close, rsi_window)
+    if volume is not None:
+        out["volume_ratio"] = volume_ratio(volume, volume_window)
+    return out
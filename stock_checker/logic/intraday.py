@@ -0,0 +1,313 @@
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from logic.beta import DEFAULT_BENCHMARKS
+from logic.deadline import Deadline, FETCH_TIMEOUT
+from logic.http_pool import get_session
+from logic.snapshot import MARKET_TZ
+from logic.stock_data import StockData
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+INTERVAL_SECONDS = {"1m": 60, "5m": 300}
+# First download per ticker (yfinance serves 1m bars for the last 7 days only)
+INITIAL_PERIOD = {"1m": "5d", "5m": "1mo"}
+# Bars kept per ticker: about 4.5 trading days of 1m bars / 22 trading days of 5m bars
+DEFAULT_CAPACITY = 1500
+MAX_TICKERS = 250 # Watchlist (MAX_WATCHLIST) plus benchmarks; least recently used buffers are dropped
+VIEW_TTL = float(os.getenv("INTRADAY_VIEW_TTL", "1800")) # Seconds a viewed ticker keeps being polled
+POLL_WORKERS = 8 # Concurrent downloads per poll cycle
+
+MARKET_OPEN = datetime.time(9, 0)
+MARKET_CLOSE = datetime.time(15, 30)
+
+
+class BarRing:
+    """
+    Fixed-size ring buffer of OHLCV bars for one ticker.
+    Arrays are allocated once, so memory stays at capacity * 6 * 8 bytes however long the app runs.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64) # UTC nanoseconds
+        self.values = np.zeros((len(FIELDS), capacity))
+        self.count = 0
+        self.head = 0 # Next write position
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    def last_time(self):
+        return int(self.times[(self.head - 1) % self.capacity]) if self.count else None
+
+    def extend(self, times, values):
+        """
+        Appends bars (times ascending, values shaped (len(FIELDS), n)).
+        Bars older than the newest stored one are ignored; a bar with the same timestamp
+        replaces it (the still-forming last bar of an earlier download).
+        Returns the number of new bars.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        last = self.last_time()
+        if last is not None:
+            keep = times >= last
+            times, values = times[keep], values[:, keep]
+            if len(times) and times[0] == last:
+                self.values[:, (self.head - 1) % self.capacity] = values[:, 0]
+                times, values = times[1:], values[:, 1:]
+
+        n = len(times)
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            times, values = times[-self.capacity:], values[:, -self.capacity:]
+        idx = (self.head + np.arange(len(times))) % self.capacity
+        self.times[idx] = times
+        self.values[:, idx] = values
+        self.head = (self.head + len(times)) % self.capacity
+        self.count = min(self.count + len(times), self.capacity)
+        return n
+
+    def to_frame(self):
+        """Bars in time order as a DataFrame (index in market time), like yfinance history()."""
+        idx = (self.head - self.count + np.arange(self.count)) % self.capacity
+        index = pd.to_datetime(self.times[idx], utc=True).tz_convert(MARKET_TZ)
+        return pd.DataFrame(self.values[:, idx].T, columns=list(FIELDS), index=index)
+
+
+class IntradayStore:
+    """
+    Per-ticker ring buffers of 1m / 5m bars, refreshed incrementally: the first download
+    covers INITIAL_PERIOD, later ones only start at the newest stored bar, and a ticker is
+    downloaded at most once per bar interval however many sessions ask for it.
+    """
+
+    def __init__(self, interval="5m", capacity=DEFAULT_CAPACITY, max_tickers=MAX_TICKERS, clock=time.monotonic):
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"unsupported interval: {interval}")
+        self.interval = interval
+        self.capacity = capacity
+        self.max_tickers = max_tickers
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buffers = OrderedDict() # ticker -> BarRing (LRU order)
+        self._fetched_at = {}
+        self._inflight = {} # ticker -> Event set when its running download has been ingested
+        self._viewed = OrderedDict() # ticker -> last view time (oldest first)
+        self.downloads = 0
+        self.bars_ingested = 0
+
+    def _buffer(self, ticker):
+        """Buffer for ticker (created on first use), marked most recently used. Caller holds the lock."""
+        buf = self._buffers.get(ticker)
+        if buf is None:
+            buf = self._buffers[ticker] = BarRing(self.capacity)
+            while len(self._buffers) > self.max_tickers:
+                old, _ = self._buffers.popitem(last=False)
+                self._fetched_at.pop(old, None)
+        self._buffers.move_to_end(ticker)
+        return buf
+
+    def ingest(self, ticker, hist):
+        """Appends a yfinance history DataFrame; returns the number of new bars."""
+        if hist is not None and "Close" in hist:
+            hist = hist.dropna(subset=["Close"])
+        if hist is None or hist.empty:
+            return 0
+        index = hist.index if hist.index.tz is not None else hist.index.tz_localize(MARKET_TZ)
+        times = index.tz_convert("UTC").as_unit("ns").asi8
+        values = np.vstack([hist[f].to_numpy(dtype=float) if f in hist else np.full(len(hist), np.nan) for f in FIELDS])
+        with self._lock:
+            added = self._buffer(ticker).extend(times, values)
+            self.bars_ingested += added
+        return added
+
+    def refresh(self, ticker, deadline=None, force=False):
+        """
+        Downloads new bars unless the ticker was refreshed within the last bar interval.
+        While another session's download of the ticker is running, waits for it instead
+        (so a first view never sees an empty buffer just because someone else got there first).
+        """
+        step = Deadline.within(deadline, FETCH_TIMEOUT)
+        now = self._clock()
+        with self._lock:
+            pending = self._inflight.get(ticker)
+            if pending is None:
+                fetched = self._fetched_at.get(ticker)
+                if not force and fetched is not None and now - fetched < INTERVAL_SECONDS[self.interval]:
+                    return 0
+                # Claim the refresh so concurrent sessions do not download the same bars
+                self._fetched_at[ticker] = now
+                claim = self._inflight[ticker] = threading.Event()
+                last = self._buffer(ticker).last_time()
+
+        if pending is not None:
+            if not pending.wait(timeout=step.remaining()):
+                raise TimeoutError("deadline exceeded")
+            return 0
+
+        source = yf.Ticker(ticker, session=get_session())
+        try:
+            if last is None:
+                hist = step.call(source.history, period=INITIAL_PERIOD[self.interval],
+                                 interval=self.interval, timeout=step.remaining())
+            else:
+                start = pd.Timestamp(last, tz="UTC").tz_convert(MARKET_TZ).to_pydatetime()
+                hist = step.call(source.history, start=start, interval=self.interval, timeout=step.remaining())
+            with self._lock:
+                self.downloads += 1
+            return self.ingest(ticker, hist)
+        except Exception:
+            with self._lock:
+                if fetched is None:
+                    self._fetched_at.pop(ticker, None)
+                else:
+                    self._fetched_at[ticker] = fetched
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(ticker, None)
+            claim.set()
+
+    def frame(self, ticker):
+        with self._lock:
+            buf = self._buffers.get(ticker)
+            if buf is None or buf.count == 0:
+                return None
+            return buf.to_frame()
+
+    def stock(self, ticker, benchmarks=None, deadline=None):
+        """
+        StockData over the intraday bars of ticker and the benchmarks, so the usual RSI /
+        beta / volume-surge code runs on intraday windows (no daily download).
+        Returns None when there are no bars (e.g. before the first session of a new listing).
+        """
+        benchmarks = benchmarks or DEFAULT_BENCHMARKS
+        self.mark_viewed(ticker)
+        try:
+            self.refresh(ticker, deadline=deadline)
+        except Exception:
+            # Bars already in the buffer are still usable; only a ticker never fetched fails
+            if self.frame(ticker) is None:
+                raise
+        bench_hist = {}
+        for symbol in benchmarks.values():
+            try:
+                self.refresh(symbol, deadline=deadline)
+            except Exception:
+                pass
+            bench_hist[symbol] = self.frame(symbol)
+
+        hist = self.frame(ticker)
+        if hist is None:
+            return None
+        return StockData.from_snapshot(ticker, hist, {}, bench_hist)
+
+    def mark_viewed(self, ticker):
+        with self._lock:
+            self._viewed.pop(ticker, None)
+            self._viewed[ticker] = self._clock()
+
+    def poll_tickers(self, benchmarks=None):
+        """
+        Tickers the poller keeps current: the benchmarks plus tickers viewed within VIEW_TTL,
+        most recent first, capped so they all fit in max_tickers buffers (no buffer is
+        evicted and downloaded again from scratch within one cycle).
+        """
+        benchmarks = list((benchmarks or DEFAULT_BENCHMARKS).values())
+        now = self._clock()
+        with self._lock:
+            while self._viewed and now - next(iter(self._viewed.values())) > VIEW_TTL:
+                self._viewed.popitem(last=False)
+            viewed = [t for t in reversed(self._viewed) if t not in benchmarks]
+        return benchmarks + viewed[:max(self.max_tickers - len(benchmarks), 0)]
+
+    def stats(self):
+        with self._lock:
+            buffers = list(self._buffers.values())
+            return {
+                "cache": f"intraday_{self.interval}",
+                "items": len(buffers),
+                "bars": sum(b.count for b in buffers),
+                "bytes": sum(b.nbytes for b in buffers),
+                "max_bytes": self.max_tickers * self.capacity * (len(FIELDS) + 1) * 8,
+                "downloads": self.downloads,
+            }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_intraday_store(interval="5m"):
+    """Process-wide store per bar interval."""
+    with _stores_lock:
+        if interval not in _stores:
+            _stores[interval] = IntradayStore(interval)
+        return _stores[interval]
+
+
+def intraday_stats():
+    with _stores_lock:
+        stores = list(_stores.values())
+    return [s.stats() for s in stores]
+
+
+# --- Poller ---
+
+def market_open(now=None):
+    now = now or datetime.datetime.now(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+class IntradayPoller(threading.Thread):
+    """
+    Daemon thread refreshing the benchmarks and recently viewed tickers once per bar
+    interval during market hours, POLL_WORKERS downloads at a time.
+    """
+
+    def __init__(self, interval):
+        super().__init__(daemon=True, name=f"intraday-{interval}")
+        self.store = get_intraday_store(interval)
+        self._pool = ThreadPoolExecutor(max_workers=POLL_WORKERS, thread_name_prefix=f"intraday-{interval}")
+
+    def _refresh(self, ticker):
+        try:
+            self.store.refresh(ticker)
+        except Exception as e:
+            print(f"Intraday refresh failed for {ticker}: {e}")
+
+    def run(self):
+        while True:
+            started = time.monotonic()
+            if market_open():
+                list(self._pool.map(self._refresh, self.store.poll_tickers()))
+            elapsed = time.monotonic() - started
+            time.sleep(max(INTERVAL_SECONDS[self.store.interval] - elapsed, 1))
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def start_intraday_poller():
+    """Starts the poller once per process when INTRADAY_INTERVAL is set to 1m or 5m."""
+    global _poller
+    interval = os.getenv("INTRADAY_INTERVAL")
+    if interval not in INTERVAL_SECONDS:
+        return
+    with _poller_lock:
+        if _poller is None:
+            _poller = IntradayPoller(interval)
+            _poller.start()
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job files live next to the app so a restarted session (or process) can find them again
+DEFAULT_JOB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jobs")
+JOB_RETENTION = 24 * 3600 # seconds; older job files are pruned on start-up
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+
+
+class JobQueue:
+    """
+    Runs long tasks (AI research) on a worker pool and persists each job as JSON.
+    A job is {"id", "kind", "status", "progress", "params", "result", "created_at", "updated_at"}.
+    A finished job whose result is marked stale (served from older data) also gets
+    "stale": True and "stale_reason", so readers of the job file can tell it from a fresh one.
+    Secrets such as API keys are passed to the task only and are never written to disk.
+    """
+
+    def __init__(self, job_dir=DEFAULT_JOB_DIR, max_workers=2):
+        self.job_dir = job_dir
+        os.makedirs(self.job_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._recover()
+
+    def _path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        # Write then rename so readers never see a half-written file
+        tmp = self._path(job["id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp, self._path(job["id"]))
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["updated_at"] = time.time()
+            self._save(job)
+            return dict(job)
+
+    def _recover(self):
+        """Prune old job files and mark jobs left running by a previous process as failed."""
+        now = time.time()
+        for name in os.listdir(self.job_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.job_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            if now - job.get("updated_at", 0) > JOB_RETENTION:
+                os.remove(path)
+                continue
+            if job.get("status") in (STATUS_QUEUED, STATUS_RUNNING):
+                job["status"] = STATUS_ERROR
+                job["result"] = {"error": "サーバー再起動によりジョブが中断されました。"}
+                self._save(job)
+
+    def submit(self, kind, fn, params=None):
+        """
+        Queue fn(progress, job_id) on the worker pool and return the job id.
+        fn receives a progress(message) callback and its own job id (e.g. to tag what it
+        records) and returns a JSON-serialisable result.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": STATUS_QUEUED,
+            "progress": "待機中",
+            "params": params or {},
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _run(self, job_id, fn):
+        self._update(job_id, status=STATUS_RUNNING, progress="実行中")
+        try:
+            result = fn(lambda message: self._update(job_id, progress=message), job_id)
+        except Exception as e:
+            self._update(job_id, status=STATUS_ERROR, result={"error": str(e)})
+        else:
+            status = STATUS_ERROR if isinstance(result, dict) and "error" in result else STATUS_DONE
+            stale = {}
+            if isinstance(result, dict) and result.get("stale"):
+                stale = {"stale": True, "stale_reason": result.get("warning", "")}
+            self._update(job_id, status=status, progress="完了", result=result, **stale)
+
+        # Finished jobs are served from their file; only queued / running ones stay in memory
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id):
+        """Current job state (from memory, or from disk for jobs of another process); None if unknown."""
+        if not job_id or not re.fullmatch(r'[0-9a-f]{12}', job_id):
+            return None
+        with self._lock:
+            if job_id in self._jobs:
+                return dict(self._jobs[job_id])
+
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def load_latest_job(kind, status=STATUS_DONE, job_dir=DEFAULT_JOB_DIR, include_stale=True):
+    """
+    Most recently updated job of a kind, read straight from the job files.
+    Does not create a JobQueue, so another process (the HTTP API) can read results without
+    running recovery on jobs that are still running in the Streamlit process.
+    With include_stale=False, jobs that only re-served older data are skipped.
+    """
+    latest = None
+    try:
+        names = os.listdir(job_dir)
+    except OSError:
+        return None
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(job_dir, name), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if job.get("kind") == kind and job.get("status") == status and (include_stale or not job.get("stale")):
+            if latest is None or job.get("updated_at", 0) > latest.get("updated_at", 0):
+                latest = job
+    return latest
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue shared by all sessions."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,168 @@
+import os
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import pandas as pd
+
+
+MAX_DEPTH = 8 # Object graphs (e.g. yf.Ticker internals) are only followed this deep
+
+
+def estimate_size(obj, _seen=None, _depth=0):
+    """
+    Approximate deep size in bytes. DataFrames / Series use pandas' own deep accounting;
+    containers and plain objects are walked once (shared objects are counted once).
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > MAX_DEPTH:
+        return 0
+    if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return 0
+    _seen.add(id(obj))
+    depth = _depth + 1
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen, depth) + estimate_size(v, _seen, depth) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, _seen, depth) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), _seen, depth)
+    return size
+
+
+def process_rss():
+    """Current resident set size in bytes (Linux /proc), or None where unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by total estimated byte size (and optionally by age).
+    Entries larger than the whole budget are not cached.
+    """
+
+    def __init__(self, name, max_bytes, ttl=None, sizeof=estimate_size):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._data = OrderedDict() # key -> (value, size, stored_at)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if self.ttl is not None and time.time() - entry[2] > self.ttl:
+                # Expired entries stay until evicted by size: get_stale() can still serve them
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_stale(self, key):
+        """(value, stored_at) ignoring the TTL (fallback when a fresh fetch timed out), or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            return entry[0], entry[2]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, size, time.time())
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def _pop(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "cache": self.name,
+                "items": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.hits / total if total else None,
+                "evictions": self.evictions,
+            }
+
+
+# --- Registries (process-wide, shown in the admin view) ---
+
+_caches = {}
+_sessions = {} # session_id -> {"bytes", "updated_at"}
+_registry_lock = threading.Lock()
+SESSION_IDLE_TIMEOUT = 3600 # seconds before a session disappears from the report
+
+
+def get_cache(name, max_bytes, ttl=None):
+    """Returns the named process-wide cache, creating it on first use."""
+    with _registry_lock:
+        if name not in _caches:
+            _caches[name] = LRUCache(name, max_bytes, ttl=ttl)
+        return _caches[name]
+
+
+def cache_stats():
+    with _registry_lock:
+        caches = list(_caches.values())
+    return [c.stats() for c in caches]
+
+
+def record_session(session_id, session_state):
+    """Stores the estimated size of one session's state (call once per script run)."""
+    size = estimate_size({k: session_state[k] for k in list(session_state.keys())})
+    now = time.time()
+    with _registry_lock:
+        _sessions[session_id] = {"bytes": size, "updated_at": now}
+        for sid in [s for s, v in _sessions.items() if now - v["updated_at"] > SESSION_IDLE_TIMEOUT]:
+            del _sessions[sid]
+    return size
+
+
+def session_stats():
+    with _registry_lock:
+        return [{"session": sid[:8], **v} for sid, v in _sessions.items()]
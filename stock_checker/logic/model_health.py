@@ -0,0 +1,157 @@
+import hashlib
+import threading
+import time
+
+# Cool-down (seconds) applied per error class
+NOT_FOUND_COOLDOWN = 24 * 3600 # Deprecated / unknown model: effectively skip for the day
+QUOTA_BASE_COOLDOWN = 60 # Doubles for every further quota error after a cool-down has ended
+QUOTA_MAX_COOLDOWN = 30 * 60
+OTHER_COOLDOWN = 5 * 60
+OTHER_FAILURE_THRESHOLD = 3 # Consecutive generic failures before cooling down
+
+EWMA_ALPHA = 0.3 # Weight of the latest call in success rate / latency averages
+
+
+def classify_error(error):
+    """Maps an API exception (or its message) to an error class."""
+    msg = str(error).lower()
+    if "cachedcontent" in msg or "cached content" in msg or "cached_content" in msg:
+        # Expired / deleted context cache: a cache miss, not a problem with the model
+        return "cache_miss"
+    if "404" in msg or "not found" in msg or "not_found" in msg:
+        return "not_found"
+    if "429" in msg or "resource_exhausted" in msg or "quota" in msg or "rate limit" in msg:
+        return "quota"
+    if "401" in msg or "403" in msg or "permission" in msg or "api key" in msg:
+        return "auth"
+    if "timeout" in msg or "deadline" in msg or "504" in msg:
+        return "timeout"
+    return "other"
+
+
+class ModelHealthTracker:
+    """
+    Process-wide record of per-model success rate, last error class and latency.
+    Used by AIResearcher to skip models in cool-down and to try healthy, fast models first.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, model):
+        if model not in self._stats:
+            self._stats[model] = {
+                "calls": 0,
+                "successes": 0,
+                "success_rate": 1.0, # EWMA; unknown models start optimistic
+                "latency": None, # EWMA seconds of successful calls
+                "last_error": None,
+                "consecutive_failures": 0,
+                "quota_strikes": 0, # Quota cool-downs in a row
+                "cooldown_until": 0.0,
+            }
+        return self._stats[model]
+
+    def record_success(self, model, latency):
+        with self._lock:
+            e = self._entry(model)
+            e["calls"] += 1
+            e["successes"] += 1
+            e["success_rate"] = (1 - EWMA_ALPHA) * e["success_rate"] + EWMA_ALPHA
+            e["latency"] = latency if e["latency"] is None else (1 - EWMA_ALPHA) * e["latency"] + EWMA_ALPHA * latency
+            e["consecutive_failures"] = 0
+            e["quota_strikes"] = 0
+            e["cooldown_until"] = 0.0
+
+    def record_failure(self, model, error, latency=None):
+        error_class = classify_error(error)
+        if error_class in ("auth", "cache_miss"):
+            # A bad key or an expired context cache says nothing about the model
+            return error_class
+        now = self._clock()
+        with self._lock:
+            e = self._entry(model)
+            e["calls"] += 1
+            e["success_rate"] = (1 - EWMA_ALPHA) * e["success_rate"]
+            e["last_error"] = error_class
+            e["consecutive_failures"] += 1
+
+            if error_class == "not_found":
+                e["cooldown_until"] = now + NOT_FOUND_COOLDOWN
+            elif error_class == "quota":
+                # Concurrent calls hitting the same quota window back off once, not once each
+                if e["cooldown_until"] <= now:
+                    e["quota_strikes"] += 1
+                    backoff = QUOTA_BASE_COOLDOWN * 2 ** (e["quota_strikes"] - 1)
+                    e["cooldown_until"] = now + min(backoff, QUOTA_MAX_COOLDOWN)
+            elif e["consecutive_failures"] >= OTHER_FAILURE_THRESHOLD:
+                e["cooldown_until"] = now + OTHER_COOLDOWN
+        return error_class
+
+    def is_available(self, model):
+        with self._lock:
+            e = self._stats.get(model)
+            return e is None or e["cooldown_until"] <= self._clock()
+
+    def rank(self, candidates, pinned=None):
+        """
+        Orders candidates by recent health then speed, dropping models in cool-down.
+        A pinned model (the one chosen in the UI) stays first while it is available.
+        If every candidate is cooling down, the one whose cool-down ends first is returned
+        so a call is still attempted.
+        """
+        with self._lock:
+            now = self._clock()
+            available = [m for m in candidates if m not in self._stats or self._stats[m]["cooldown_until"] <= now]
+
+            if not available:
+                if not candidates:
+                    return []
+                return [min(candidates, key=lambda m: self._stats[m]["cooldown_until"])]
+
+            def sort_key(m):
+                e = self._stats.get(m)
+                if e is None:
+                    return (-1.0, float("inf"))
+                # Round so small differences in success rate do not override latency
+                return (-round(e["success_rate"], 1), e["latency"] if e["latency"] is not None else float("inf"))
+
+            ordered = sorted(available, key=sort_key) # Stable: unknown models keep list order
+            if pinned in ordered:
+                ordered.remove(pinned)
+                ordered.insert(0, pinned)
+            return ordered
+
+    def snapshot(self):
+        """Per-model statistics for display."""
+        now = self._clock()
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "calls": e["calls"],
+                    "success_rate": e["success_rate"],
+                    "latency": e["latency"],
+                    "last_error": e["last_error"],
+                    "cooldown_remaining": max(0.0, e["cooldown_until"] - now),
+                }
+                for model, e in self._stats.items()
+            ]
+
+
+_trackers = {} # API key digest -> ModelHealthTracker
+_trackers_lock = threading.Lock()
+
+
+def get_model_health(api_key):
+    """
+    Tracker shared by all AIResearcher instances using the same API key, so one user's
+    model access (404) or quota does not put models in cool-down for other keys.
+    """
+    digest = hashlib.sha256(str(api_key).encode()).hexdigest()[:16]
+    with _trackers_lock:
+        if digest not in _trackers:
+            _trackers[digest] = ModelHealthTracker()
+        return _trackers[digest]
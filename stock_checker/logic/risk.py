@@ -0,0 +1,253 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def benchmark_close(stocks, symbol="^N225"):
+    """
+    Close series of a benchmark already fetched by any of the stocks, or None.
+    A failed or timed-out benchmark fetch is stored as None (see StockData.fetch_benchmark_history).
+    """
+    for s in stocks:
+        hist = s.benchmark_hist.get(symbol)
+        if hist is not None and not hist.empty:
+            return hist['Close']
+    return None
+
+
+FFILL_LIMIT = 3 # Missing bars carried forward (zero return) before a ticker counts as absent
+
+
+def price_frame(closes, benchmark_close=None):
+    """Close prices by date, benchmark first as "__benchmark__"; NaN where a ticker has no bar."""
+    frames = dict(closes)
+    if benchmark_close is not None:
+        frames = {"__benchmark__": benchmark_close, **frames}
+    return pd.DataFrame(frames).sort_index()
+
+
+def portfolio_risk(closes, benchmark_close=None, previous=None, window=250):
+    """
+    PortfolioRisk for closes, reusing previous (e.g. from the last scan) when it covers the same
+    tickers: only bars after its last date are added with update() instead of rebuilding.
+    """
+    if (previous is not None and previous.window == window and previous.last_date is not None
+            and previous.tickers == list(closes) and previous.has_benchmark == (benchmark_close is not None)):
+        new = price_frame(closes, benchmark_close)
+        new = new[new.index > previous.last_date]
+        for date, row in new.iterrows():
+            prices = row.to_dict()
+            previous.update(prices, benchmark_close=prices.pop("__benchmark__", None), date=date)
+        return previous
+    return PortfolioRisk(closes, benchmark_close=benchmark_close, window=window)
+
+
+class PortfolioRisk:
+    """
+    Return covariance matrix and portfolio risk figures for a watchlist.
+
+    Each pair of series is aligned on its own: covariances use the bars both tickers have
+    in the window, so a ticker with a short history (a recent listing, a data gap) shortens
+    only its own pairs instead of the window of every ticker.
+    The window is kept as pairwise observation counts, sums and cross sums over a ring buffer
+    of returns (NaN = no price), so a new bar is an O(N^2) update (plus one removal for the
+    bar leaving the window) instead of an O(T * N^2) recomputation.
+    The benchmark, if given, is stored as column 0 so its covariances update the same way.
+    """
+
+    def __init__(self, closes, benchmark_close=None, window=250):
+        """
+        Args:
+            closes: dict {ticker: pd.Series of close prices}.
+            benchmark_close: optional pd.Series of benchmark close prices (e.g. ^N225).
+            window: number of bars of returns kept in the covariance window.
+        """
+        self.window = window
+        self.has_benchmark = benchmark_close is not None
+
+        raw = price_frame(closes, benchmark_close)
+        self.columns = list(raw.columns)
+        self.tickers = self.columns[1:] if self.has_benchmark else list(self.columns)
+
+        k = len(self.columns)
+        self._buffer = np.full((window, k), np.nan)
+        self._count = 0 # Bars currently in the window
+        self._head = 0 # Next write position in the ring buffer
+        self._n = np.zeros((k, k)) # Bars where both i and j have a return
+        self._sx = np.zeros((k, k)) # Sum of i's returns over those bars
+        self._sxy = np.zeros((k, k)) # Sum of i * j over those bars
+
+        self.last_prices = np.full(k, np.nan)
+        self._filled = np.zeros(k, dtype=int) # Consecutive bars carried forward per column
+        self.last_date = None
+        for date, row in raw.iterrows():
+            self._step(row.to_numpy(dtype=float), date)
+
+    # --- Incremental Updates ---
+
+    def _accumulate(self, r, sign):
+        present = (~np.isnan(r)).astype(float)
+        x = np.nan_to_num(r)
+        self._n += sign * np.outer(present, present)
+        self._sx += sign * np.outer(x, present)
+        self._sxy += sign * np.outer(x, x)
+
+    def _add(self, r):
+        if self._count == self.window:
+            self._accumulate(self._buffer[self._head], -1)
+        else:
+            self._count += 1
+        self._accumulate(r, 1)
+        self._buffer[self._head] = r
+        self._head = (self._head + 1) % self.window
+
+    def _step(self, prices, date):
+        """Folds one bar of prices (NaN = no price) into the window."""
+        missing = np.isnan(prices)
+        # Carry a missing price forward for up to FFILL_LIMIT bars, then treat the ticker as absent
+        carry = missing & (self._filled < FFILL_LIMIT)
+        prices = np.where(carry, self.last_prices, prices)
+        self._filled = np.where(missing, self._filled + 1, 0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = prices / self.last_prices - 1.0
+        if self.last_date is not None and not np.isnan(r).all():
+            self._add(r)
+        self.last_prices = prices
+        self.last_date = date
+
+    def update(self, new_closes, benchmark_close=None, date=None):
+        """
+        Add one new bar.
+
+        Args:
+            new_closes: dict {ticker: close}. A ticker without a new price keeps its last close
+                for up to FFILL_LIMIT bars and then counts as absent (its pairs skip the bar).
+            benchmark_close: new benchmark close.
+            date: optional bar timestamp; a bar not after the last one is ignored.
+        """
+        if date is not None and self.last_date is not None and date <= self.last_date:
+            return
+        prices = np.array([
+            benchmark_close if col == "__benchmark__" else new_closes.get(col)
+            for col in self.columns
+        ], dtype=float)
+        self._step(prices, date if date is not None else self.last_date)
+
+    # --- Statistics ---
+
+    def _returns(self):
+        """Returns in the window, oldest first."""
+        if self._count < self.window:
+            return self._buffer[:self._count]
+        return np.roll(self._buffer, -self._head, axis=0)
+
+    def _asset_slice(self):
+        return slice(1, None) if self.has_benchmark else slice(None)
+
+    def _pairwise_cov(self):
+        """Pairwise-complete covariance; NaN for pairs with fewer than 2 common returns."""
+        n = self._n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (self._sxy - self._sx * self._sx.T / n) / (n - 1)
+        cov[n < 2] = np.nan
+        return cov
+
+    def _psd_cov(self):
+        """
+        Pairwise covariance made usable for portfolio variance: pairs without overlap count
+        as uncorrelated, and since pairwise estimates need not form a positive semi-definite
+        matrix, negative eigenvalues are clipped to zero. Returns (matrix, repaired).
+        """
+        cov = self._pairwise_cov()
+        repaired = bool(np.isnan(cov).any())
+        cov = np.nan_to_num(cov)
+        values, vectors = np.linalg.eigh(cov)
+        if values.min() < -1e-12 * max(1.0, np.abs(values).max()):
+            cov = vectors @ np.diag(np.clip(values, 0.0, None)) @ vectors.T
+            repaired = True
+        return cov, repaired
+
+    def covariance(self):
+        """Covariance matrix of the watchlist tickers as a DataFrame (NaN for pairs without overlap)."""
+        if self._count < 2:
+            return None
+        s = self._asset_slice()
+        return pd.DataFrame(self._pairwise_cov()[s, s], index=self.tickers, columns=self.tickers)
+
+    def correlation(self):
+        cov = self.covariance()
+        if cov is None:
+            return None
+        std = np.sqrt(np.diag(cov.to_numpy()))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov.to_numpy() / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.tickers, columns=self.tickers)
+
+    def _weights(self, weights):
+        if weights is None:
+            w = np.ones(len(self.tickers))
+        else:
+            w = np.array([float(weights.get(t, 0.0)) for t in self.tickers])
+        total = w.sum()
+        return w / total if total > 0 else w
+
+    def summary(self, weights=None, confidence=0.95):
+        """
+        Portfolio beta, concentration and 1-day historical / parametric VaR.
+
+        Args:
+            weights: dict {ticker: weight or position value}; equal weight if None.
+            confidence: VaR confidence level.
+
+        Returns:
+            dict with volatility, beta, hhi, effective_n, max_weight, var_historical,
+            var_parametric (VaR as positive loss fractions) and covariance_repaired (the
+            pairwise matrix needed repair, see _psd_cov), or {} without enough data.
+        """
+        if self._count < 2 or not self.tickers:
+            return {}
+
+        w = self._weights(weights)
+        s = self._asset_slice()
+        # Historical VaR uses each day's return over the tickers that traded that day
+        returns = self._returns()[:, s]
+        held_weight = ~np.isnan(returns) @ w
+        days = held_weight > 0
+        if days.sum() < 2:
+            return {}
+        port_returns = np.nan_to_num(returns[days]) @ w / held_weight[days]
+
+        cov, repaired = self._psd_cov()
+        asset_cov = cov[s, s]
+
+        port_var = float(w @ asset_cov @ w)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.diag(self._sx) / np.diag(self._n)
+        port_mean = float(w @ np.nan_to_num(mean[s]))
+        port_std = np.sqrt(max(port_var, 0.0)) # Only rounding can make a repaired matrix negative
+
+        beta = None
+        if self.has_benchmark and cov[0, 0] > 0:
+            beta = float(w @ cov[1:, 0] / cov[0, 0])
+
+        var_hist = float(-np.quantile(port_returns, 1 - confidence))
+        z = NormalDist().inv_cdf(1 - confidence)
+        var_param = float(-(port_mean + z * port_std))
+
+        hhi = float(np.sum(w * w))
+        max_idx = int(np.argmax(w))
+
+        return {
+            "observations": int(days.sum()),
+            "volatility": port_std,
+            "beta": beta,
+            "hhi": hhi,
+            "effective_n": 1.0 / hhi if hhi > 0 else None,
+            "max_weight": float(w[max_idx]),
+            "max_weight_ticker": self.tickers[max_idx],
+            "var_historical": var_hist,
+            "var_parametric": var_param,
+            "covariance_repaired": repaired,
+        }
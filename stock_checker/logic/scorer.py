@@ -1,12 +1,27 @@
+SECTOR_DETAIL_PREFIX = "業種内評価" # Detail line added by evaluate_sector_relative
+
+
 class Scorer:
-    def __init__(self, stock_data):
+    def __init__(self, stock_data, sector=None, sector_stats=None, bar_unit="日"):
         self.stock = stock_data
         self.results = {}
+        # Unit of one bar in detail labels ("日", or e.g. "本" for intraday bars)
+        self.bar_unit = bar_unit
+        # Optional sector context (logic.sector_stats.SectorStats) for relative scoring
+        self.sector = sector
+        self.sector_stats = sector_stats
 
     def evaluate_short_term(self):
         beta = self.stock.calculate_beta()
+        # 60-day beta is less noisy; shown alongside the 20-day value used for scoring
+        beta_stable = self.stock.calculate_beta(window=60)
         rsi = self.stock.calculate_rsi()
         volume_surge = self.stock.check_volume_surge()
+        # Informational signals from the same indicator pass (not scored)
+        macd_hist = self.stock.latest_indicator("macd_hist")
+        bb_upper = self.stock.latest_indicator("bb_upper")
+        bb_lower = self.stock.latest_indicator("bb_lower")
+        price = self.stock.get_current_price()
 
         score = 0
         details = []
@@ -21,6 +36,9 @@ class Scorer:
         else:
              details.append("ベータ: データなし")
 
+        if beta_stable is not None:
+            details.append(f"60{self.bar_unit}ベータ: {beta_stable:.2f}")
+
         # RSI logic
         if rsi is not None:
             if rsi <= 30:
@@ -38,11 +56,21 @@ class Scorer:
             score += 30
             details.append("出来高急増を検知")
 
+        if macd_hist is not None:
+            details.append(f"MACD: {'上昇' if macd_hist > 0 else '下降'}モメンタム")
+        if price is not None and bb_upper is not None and bb_lower is not None:
+            if price >= bb_upper:
+                details.append("ボリンジャーバンド +2σ 超え")
+            elif price <= bb_lower:
+                details.append("ボリンジャーバンド -2σ 割れ")
+
         return {
             "score": min(score, 100),
             "beta": beta,
+            "beta_stable": beta_stable,
             "rsi": rsi,
             "volume_surge": volume_surge,
+            "macd_hist": macd_hist,
             "details": details
         }
 
@@ -97,7 +125,7 @@ class Scorer:
         else:
             details.append("売上成長率: データなし")
 
-        return {
+        result = {
             "score": min(score, 100),
             "roe": roe,
             "per": per,
@@ -105,3 +133,26 @@ class Scorer:
             "revenue_growth": growth,
             "details": details
         }
+        return self.evaluate_sector_relative(result)
+
+    def evaluate_sector_relative(self, med_res):
+        """
+        Adds sector-relative scores (percentile vs sector peers) to a medium-term result.
+        Idempotent: sector fields and the detail line from an earlier call (e.g. on a cached
+        result) are replaced, not added again.
+        """
+        if self.sector_stats is None or not self.sector:
+            return med_res
+
+        relative = self.sector_stats.relative_scores(self.sector, med_res)
+        details = [d for d in med_res["details"] if not d.startswith(SECTOR_DETAIL_PREFIX)]
+        med_res = dict(med_res, details=details)
+        med_res["sector"] = self.sector
+        med_res["sector_score"] = relative["score"]
+        med_res["sector_scores"] = relative["scores"]
+
+        if relative["score"] is not None:
+            labels = {"roe": "ROE", "per": "PER (低いほど高評価)", "equity_ratio": "自己資本比率", "revenue_growth": "売上成長率"}
+            parts = [f"{labels[m]} {v}" for m, v in relative["scores"].items()]
+            med_res["details"].append(f"{SECTOR_DETAIL_PREFIX} ({self.sector}): {relative['score']}点 [{', '.join(parts)}]")
+        return med_res
@@ -0,0 +1,143 @@
+import datetime
+import os
+
+from logic.stock_data import StockData
+from logic.scorer import Scorer
+from logic.ticker_index import get_ticker_index
+from logic.sector_stats import get_sector_stats
+from logic.memory import get_cache
+from logic.snapshot import get_snapshot_store, MARKET_TZ
+from logic.deadline import Deadline, TICKER_TIMEOUT
+from logic.intraday import get_intraday_store
+
+# Process-wide cache of fetched StockData + scores, bounded by estimated byte size
+stock_cache = get_cache("stock_data", max_bytes=int(os.getenv("STOCK_CACHE_MB", "64")) * 1024 * 1024, ttl=300)
+
+SOURCE_SNAPSHOT = "snapshot"
+SOURCE_CACHE = "cache"
+SOURCE_LIVE = "live"
+
+
+def _stale_fallback(ticker):
+    """Expired cache entry, else an out-of-date snapshot: (stock, short, med, source, as_of) or None."""
+    hit = stock_cache.get_stale(ticker)
+    if hit:
+        (stock, short_res, med_res), stored_at = hit
+        return stock, short_res, med_res, SOURCE_CACHE, datetime.datetime.fromtimestamp(stored_at, MARKET_TZ)
+    snap = get_snapshot_store().get(ticker, allow_stale=True)
+    if snap:
+        stock, short_res, med_res, created = snap
+        return stock, short_res, med_res, SOURCE_SNAPSHOT, created
+    return None
+
+
+def score_ticker(ticker, deadline=None):
+    """
+    Short / medium-term scores for one ticker, shared by the Streamlit page and the HTTP API.
+
+    Precomputed snapshot first, then the process cache, then a live fetch bounded by
+    TICKER_TIMEOUT and the caller's deadline. If the fetch fails or times out, older cached
+    or snapshot data is returned instead with "stale": True.
+    Returns {"ticker", "stock", "price", "short", "medium", "source", "as_of", "stale", "stale_reason"},
+    or {"error", "reason", "ticker", "suggestions"} with reason "not_found" / "timeout" / "fetch_failed" / "no_data".
+    """
+    # Reject typos / delisted codes locally before any network call
+    index = get_ticker_index()
+    code, suggestions = index.validate(ticker)
+    if code is None:
+        return {"error": f"銘柄が見つかりません: {ticker}", "reason": "not_found", "ticker": ticker, "suggestions": suggestions}
+    ticker = f"{code}.T"
+    deadline = Deadline.within(deadline, TICKER_TIMEOUT)
+
+    snap = get_snapshot_store().get(ticker)
+    cached = None if snap else stock_cache.get(ticker)
+    as_of = None
+    stale_reason = None
+    if snap:
+        stock, short_res, med_res, as_of = snap
+        source = SOURCE_SNAPSHOT
+    elif cached:
+        # Recently fetched by any session (bounded LRU, see logic/memory.py)
+        stock, short_res, med_res = cached
+        source = SOURCE_CACHE
+    else:
+        stock = StockData(ticker)
+        source = SOURCE_LIVE
+        try:
+            stock.fetch_data(deadline=deadline)
+        except TimeoutError:
+            stale_reason = "タイムアウト"
+            error = {"error": f"データ取得がタイムアウトしました: {ticker}", "reason": "timeout"}
+        except Exception as e:
+            stale_reason = "取得エラー"
+            error = {"error": f"Error fetching data: {e}", "reason": "fetch_failed"}
+
+        if stale_reason:
+            fallback = _stale_fallback(ticker)
+            if not fallback:
+                return {**error, "ticker": ticker, "suggestions": []}
+            stock, short_res, med_res, source, as_of = fallback
+
+    price = stock.get_current_price()
+    if price is None:
+        return {"error": "No price data found.", "reason": "no_data", "ticker": ticker, "suggestions": []}
+
+    # Sector-relative fundamentals: one lookup in the precomputed sector table
+    index_rec = index.get(ticker)
+    sector = index_rec["sector"] if index_rec else None
+    sector_stats = get_sector_stats()
+    scorer = Scorer(stock, sector=sector, sector_stats=sector_stats)
+
+    if source == SOURCE_LIVE:
+        # Benchmarks are fetched here, within the deadline; scoring and the chart reuse them
+        stock.calculate_beta_profile(deadline=deadline)
+        short_res = scorer.evaluate_short_term()
+        med_res = scorer.evaluate_medium_term()
+        # Keep the table current with freshly fetched fundamentals
+        sector_stats.update(ticker, sector, med_res)
+        stock_cache.put(ticker, (stock.compact(), short_res, med_res))
+    else:
+        med_res = scorer.evaluate_sector_relative(med_res)
+
+    return {
+        "ticker": ticker,
+        "stock": stock,
+        "price": price,
+        "short": short_res,
+        "medium": med_res,
+        "source": source,
+        "as_of": as_of,
+        "stale": stale_reason is not None,
+        "stale_reason": stale_reason,
+    }
+
+
+def score_intraday(ticker, interval="5m", deadline=None):
+    """
+    Short-term score on intraday bars (RSI / beta / volume surge over the last bars of the
+    1m or 5m ring buffer, see logic/intraday.py).
+    Returns {"ticker", "stock", "short", "interval", "bars", "as_of"} or {"error", "reason", "ticker"}.
+    """
+    code, _ = get_ticker_index().validate(ticker)
+    if code is None:
+        return {"error": f"銘柄が見つかりません: {ticker}", "reason": "not_found", "ticker": ticker}
+    ticker = f"{code}.T"
+    deadline = Deadline.within(deadline, TICKER_TIMEOUT)
+
+    try:
+        stock = get_intraday_store(interval).stock(ticker, deadline=deadline)
+    except TimeoutError:
+        return {"error": f"日中データの取得がタイムアウトしました: {ticker}", "reason": "timeout", "ticker": ticker}
+    except Exception as e:
+        return {"error": f"Error fetching intraday data: {e}", "reason": "fetch_failed", "ticker": ticker}
+    if stock is None:
+        return {"error": "No intraday data found.", "reason": "no_data", "ticker": ticker}
+
+    return {
+        "ticker": ticker,
+        "stock": stock,
+        "short": Scorer(stock, bar_unit="本").evaluate_short_term(),
+        "interval": interval,
+        "bars": len(stock.hist),
+        "as_of": stock.hist.index[-1].to_pydatetime(),
+    }
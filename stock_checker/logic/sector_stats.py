@@ -0,0 +1,182 @@
+import bisect
+import json
+import os
+import threading
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SECTOR_STATS_PATH = os.path.join(DATA_DIR, "sector_stats.json")
+
+METRICS = ("roe", "per", "equity_ratio", "revenue_growth")
+LOWER_IS_BETTER = {"per"}
+MIN_PEERS = 5 # Fewer values than this in a sector and no relative score is given
+
+
+def _clean(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if value != value: # NaN
+        return None
+    return value
+
+
+class SectorStats:
+    """
+    Per-sector distribution of ROE, PER, equity ratio and revenue growth.
+
+    Each (sector, metric) keeps a sorted list of peer values, so medians / percentiles
+    and the percentile rank of a new value are bisect lookups. Per-ticker values are kept
+    too, so refreshing one company's fundamentals replaces its old values instead of
+    rebuilding the table.
+
+    Lists are never mutated once published: update() edits a copy and swaps it in under
+    the lock, so lock-free readers always see one consistent sorted list.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tickers = {} # ticker -> {"sector": ..., metric: value}
+        self._values = {} # (sector, metric) -> sorted list
+
+    @classmethod
+    def build(cls, records):
+        """One batch pass over records of {"ticker", "sector", "roe", "per", "equity_ratio", "revenue_growth"}."""
+        table = cls()
+        for rec in records:
+            sector = rec.get("sector")
+            if not rec.get("ticker") or not sector:
+                continue
+            table.tickers[rec["ticker"]] = {"sector": sector, **{m: _clean(rec.get(m)) for m in METRICS}}
+
+        for values in table.tickers.values():
+            for m in METRICS:
+                if values[m] is not None:
+                    table._values.setdefault((values["sector"], m), []).append(values[m])
+        for lst in table._values.values():
+            lst.sort()
+        return table
+
+    def update(self, ticker, sector, metrics):
+        """Incrementally replaces one ticker's values (O(peers) per metric, copy-on-write)."""
+        if not sector:
+            return
+        new = {"sector": sector, **{m: _clean(metrics.get(m)) for m in METRICS}}
+        with self._lock:
+            old = self.tickers.get(ticker)
+            if old == new:
+                return
+            changed = {}
+            if old:
+                for m in METRICS:
+                    if old[m] is not None:
+                        key = (old["sector"], m)
+                        lst = changed.setdefault(key, list(self._values[key]))
+                        del lst[bisect.bisect_left(lst, old[m])]
+            for m in METRICS:
+                if new[m] is not None:
+                    key = (sector, m)
+                    if key not in changed:
+                        changed[key] = list(self._values.get(key, []))
+                    bisect.insort(changed[key], new[m])
+            self._values.update(changed)
+            self.tickers[ticker] = new
+
+    def quantile(self, sector, metric, q):
+        lst = self._values.get((sector, metric))
+        if not lst:
+            return None
+        pos = q * (len(lst) - 1)
+        lo = int(pos)
+        hi = min(lo + 1, len(lst) - 1)
+        return lst[lo] + (lst[hi] - lst[lo]) * (pos - lo)
+
+    def summary(self, sector):
+        """Peer count, median and 25/75 percentiles of every metric in the sector."""
+        out = {}
+        for m in METRICS:
+            lst = self._values.get((sector, m), [])
+            out[m] = {
+                "count": len(lst),
+                "median": self.quantile(sector, m, 0.5),
+                "p25": self.quantile(sector, m, 0.25),
+                "p75": self.quantile(sector, m, 0.75),
+            }
+        return out
+
+    def percentile(self, sector, metric, value):
+        """Share of sector peers below value (0-1), or None without enough peers."""
+        value = _clean(value)
+        lst = self._values.get((sector, metric))
+        if value is None or not lst or len(lst) < MIN_PEERS:
+            return None
+        lo = bisect.bisect_left(lst, value)
+        hi = bisect.bisect_right(lst, value)
+        return (lo + hi) / 2 / len(lst)
+
+    def relative_scores(self, sector, metrics):
+        """
+        Sector-relative score per metric (0-100, higher is better; PER inverted) and their mean.
+        Returns {"scores": {metric: score}, "score": mean or None}.
+        """
+        scores = {}
+        for m in METRICS:
+            pct = self.percentile(sector, m, metrics.get(m))
+            if pct is None:
+                continue
+            if m in LOWER_IS_BETTER:
+                pct = 1 - pct
+            scores[m] = round(pct * 100)
+        return {
+            "scores": scores,
+            "score": round(sum(scores.values()) / len(scores)) if scores else None,
+        }
+
+    # --- Persistence ---
+
+    def save(self, path=SECTOR_STATS_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            data = dict(self.tickers)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=SECTOR_STATS_PATH):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        return cls.build({"ticker": t, **v} for t, v in data.items())
+
+
+def records_from_snapshot(snapshot_tickers, ticker_index):
+    """Fundamentals of every snapshot entry joined with the sector from the ticker index."""
+    for ticker, entry in snapshot_tickers.items():
+        rec = ticker_index.get(ticker)
+        if not rec or not rec.get("sector"):
+            continue
+        med = entry.get("medium", {})
+        yield {"ticker": ticker, "sector": rec["sector"], **{m: med.get(m) for m in METRICS}}
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_sector_stats():
+    """Process-wide table, loaded once from data/sector_stats.json."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = SectorStats.load()
+        return _table
+
+
+def set_sector_stats(table):
+    global _table
+    with _table_lock:
+        _table = table
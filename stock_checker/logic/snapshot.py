@@ -0,0 +1,317 @@
+import datetime
+import json
+import os
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from logic.stock_data import StockData, INFO_KEYS
+from logic.scorer import Scorer
+from logic.ticker_index import get_ticker_index
+from logic.sector_stats import SectorStats, records_from_snapshot, set_sector_stats, SECTOR_STATS_PATH
+from logic.track_record import build_scorecard
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+WATCHLIST_REGISTRY = os.path.join(DATA_DIR, "watchlists.json")
+
+SNAPSHOT_VERSION = 1 # Bump when the entry layout changes; older files are ignored
+SNAPSHOTS_KEPT = 4
+SNAPSHOT_MAX_AGE = 18 * 3600 # seconds; pre-market run covers the trading day
+
+MARKET_TZ = ZoneInfo("Asia/Tokyo")
+# Before the 9:00 open and after the 15:30 close (JST), overridable with SNAPSHOT_TIMES="08:30,15:45"
+DEFAULT_SCHEDULE = ("08:30", "15:45")
+
+HIST_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Watchlist registry: tickers not registered again within the TTL are dropped
+WATCHLIST_TTL = float(os.getenv("WATCHLIST_TTL_DAYS", "30")) * 86400
+WATCHLIST_MAX = 1000 # Most recently registered tickers kept
+WATCHLIST_TOUCH_INTERVAL = 86400 # Re-registering a known ticker rewrites the file at most daily
+
+_watchlist_lock = threading.Lock()
+
+
+def _to_json(value):
+    """json.dump default= hook for numpy scalars."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=_to_json)
+    os.replace(tmp, path)
+
+
+def hist_to_dict(hist):
+    cols = [c for c in HIST_COLUMNS if c in hist.columns]
+    return {
+        "index": [ts.isoformat() for ts in hist.index],
+        **{c: hist[c].tolist() for c in cols},
+    }
+
+
+def hist_from_dict(data):
+    index = pd.to_datetime(data["index"])
+    return pd.DataFrame({c: data[c] for c in HIST_COLUMNS if c in data}, index=index)
+
+
+# --- Universe ---
+
+def _read_registry(path, now):
+    """{ticker: last registered (epoch seconds)}; the old plain-list format counts as registered now."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if isinstance(data, list):
+        return {t: now for t in data}
+    return data
+
+
+def register_watchlist_tickers(tickers, path=WATCHLIST_REGISTRY, now=None):
+    """
+    Adds (or refreshes) tickers from a session's watchlist in the shared universe used by the
+    scheduler. Entries not refreshed within WATCHLIST_TTL are pruned, and at most
+    WATCHLIST_MAX of the most recent are kept.
+    """
+    now = now or time.time()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _watchlist_lock:
+        registry = _read_registry(path, now)
+        if all(t in registry and now - registry[t] < WATCHLIST_TOUCH_INTERVAL for t in tickers):
+            return
+        registry.update({t: now for t in tickers})
+        recent = sorted((t for t, seen in registry.items() if now - seen <= WATCHLIST_TTL),
+                        key=registry.get, reverse=True)[:WATCHLIST_MAX]
+        _write_json(path, {t: registry[t] for t in sorted(recent)})
+
+
+def load_watchlist_tickers(path=WATCHLIST_REGISTRY, now=None):
+    now = now or time.time()
+    registry = _read_registry(path, now)
+    return sorted(t for t, seen in registry.items() if now - seen <= WATCHLIST_TTL)
+
+
+def snapshot_universe():
+    """
+    Union of all registered watchlists and the SNAPSHOT_UNIVERSE env var (comma separated codes).
+    SNAPSHOT_UNIVERSE=index uses every code in the local ticker index (full sector peer table).
+    """
+    configured = [t.strip() for t in os.getenv("SNAPSHOT_UNIVERSE", "").split(",") if t.strip()]
+    if configured == ["index"]:
+        configured = list(get_ticker_index().records)
+    tickers = set(load_watchlist_tickers())
+    for t in configured:
+        tickers.add(t if t.endswith(".T") else f"{t}.T")
+    return sorted(tickers)
+
+
+# --- Build / Load ---
+
+def build_snapshot_entry(stock):
+    """
+    Scores and chart data for one fetched StockData.
+    The full beta profile is computed here so every benchmark (not only the one scoring
+    uses) lands in the shared benchmark dict and the snapshot; reading it back needs no fetch.
+    """
+    stock.calculate_beta_profile()
+    scorer = Scorer(stock)
+    return {
+        "info": {k: stock.info.get(k) for k in INFO_KEYS} if stock.info else {},
+        "hist": hist_to_dict(stock.hist),
+        "short": scorer.evaluate_short_term(),
+        "medium": scorer.evaluate_medium_term(),
+    }
+
+
+def build_snapshot(tickers, snapshot_dir=SNAPSHOT_DIR, stock_factory=StockData, sector_stats_path=SECTOR_STATS_PATH):
+    """
+    Fetches and scores every ticker and writes a versioned snapshot file.
+    Benchmark histories are fetched once and shared by all tickers.
+    The sector aggregate table is rebuilt from the same pass.
+    Returns the path of the written snapshot.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    created = datetime.datetime.now(MARKET_TZ)
+    benchmarks = {}
+    entries = {}
+    errors = {}
+
+    for ticker in tickers:
+        stock = stock_factory(ticker)
+        stock.benchmark_hist = benchmarks # Shared across tickers: one fetch per benchmark
+        try:
+            stock.fetch_data()
+            if stock.hist is None or stock.hist.empty:
+                errors[ticker] = "No price data found."
+                continue
+            entries[ticker] = build_snapshot_entry(stock)
+        except Exception as e:
+            errors[ticker] = str(e)
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": created.isoformat(),
+        "tickers": entries,
+        "benchmarks": {symbol: hist_to_dict(h) for symbol, h in benchmarks.items() if h is not None and not h.empty},
+        "errors": errors,
+    }
+
+    path = os.path.join(snapshot_dir, f"snapshot_{created:%Y%m%d_%H%M%S}.json")
+    _write_json(path, snapshot)
+    _write_json(os.path.join(snapshot_dir, "latest.json"), {"version": SNAPSHOT_VERSION, "path": os.path.basename(path)})
+
+    # Sector medians / percentiles from the same fundamentals (no extra fetches)
+    table = SectorStats.build(records_from_snapshot(entries, get_ticker_index()))
+    if table.tickers:
+        table.save(sector_stats_path)
+        set_sector_stats(table)
+
+    # Keep only the most recent files
+    old = sorted(f for f in os.listdir(snapshot_dir) if f.startswith("snapshot_") and f.endswith(".json"))
+    for name in old[:-SNAPSHOTS_KEPT]:
+        os.remove(os.path.join(snapshot_dir, name))
+    return path
+
+
+class SnapshotStore:
+    """Reads the latest snapshot, re-parsing only when a new one has been written."""
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+        self.snapshot_dir = snapshot_dir
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._path = None
+        self._data = None
+        self._benchmarks = {}
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.snapshot_dir, "latest.json"), "r", encoding="utf-8") as f:
+                pointer = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if pointer.get("version") != SNAPSHOT_VERSION:
+            return None
+
+        path = os.path.join(self.snapshot_dir, pointer["path"])
+        with self._lock:
+            if path != self._path:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        self._data = json.load(f)
+                except (OSError, ValueError):
+                    return None
+                self._path = path
+                self._benchmarks = {}
+            return self._data
+
+    def created_at(self):
+        data = self._load()
+        return datetime.datetime.fromisoformat(data["created_at"]) if data else None
+
+    def get(self, ticker, allow_stale=False):
+        """
+        Returns (StockData, short_res, med_res, created_at) rebuilt from the snapshot,
+        or None when the ticker is missing or the snapshot is too old (unless allow_stale).
+        """
+        data = self._load()
+        if not data or ticker not in data["tickers"]:
+            return None
+
+        created = datetime.datetime.fromisoformat(data["created_at"])
+        if not allow_stale and (datetime.datetime.now(MARKET_TZ) - created).total_seconds() > self.max_age:
+            return None
+
+        with self._lock:
+            if not self._benchmarks:
+                self._benchmarks = {s: hist_from_dict(h) for s, h in data["benchmarks"].items()}
+            benchmarks = self._benchmarks
+
+        entry = data["tickers"][ticker]
+        # Own copy: a later fetch on this StockData must not write into the store's dict
+        stock = StockData.from_snapshot(ticker, hist_from_dict(entry["hist"]), entry["info"], dict(benchmarks))
+        return stock, entry["short"], entry["medium"], created
+
+
+_store = SnapshotStore()
+
+
+def get_snapshot_store():
+    return _store
+
+
+# --- Scheduler ---
+
+def _schedule_times():
+    raw = os.getenv("SNAPSHOT_TIMES")
+    times = [t.strip() for t in raw.split(",")] if raw else DEFAULT_SCHEDULE
+    return [datetime.time(*map(int, t.split(":"))) for t in times if t]
+
+
+def next_run(now=None, times=None):
+    """Next scheduled run (JST, weekdays only) after now."""
+    now = now or datetime.datetime.now(MARKET_TZ)
+    times = sorted(times or _schedule_times())
+    day = now.date()
+    while True:
+        if day.weekday() < 5:
+            for t in times:
+                candidate = datetime.datetime.combine(day, t, tzinfo=MARKET_TZ)
+                if candidate > now:
+                    return candidate
+        day += datetime.timedelta(days=1)
+
+
+class SnapshotScheduler(threading.Thread):
+    """Daemon thread that rebuilds the snapshot (and the AI pick scorecard) before the open and after the close."""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="snapshot-scheduler")
+
+    def run(self):
+        while True:
+            wait = (next_run() - datetime.datetime.now(MARKET_TZ)).total_seconds()
+            time.sleep(max(wait, 1))
+            try:
+                tickers = snapshot_universe()
+                if tickers:
+                    build_snapshot(tickers)
+            except Exception as e:
+                print(f"Snapshot build failed: {e}")
+            try:
+                # New closes: re-evaluate the AI pick track record
+                build_scorecard()
+            except Exception as e:
+                print(f"Scorecard build failed: {e}")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Starts the scheduler once per process (disable with SNAPSHOT_SCHEDULER=0)."""
+    global _scheduler
+    if os.getenv("SNAPSHOT_SCHEDULER", "1") == "0":
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SnapshotScheduler()
+            _scheduler.start()
+
+
+if __name__ == "__main__":
+    # Manual / cron run: python -m logic.snapshot
+    tickers = snapshot_universe()
+    print(f"Building snapshot for {len(tickers)} tickers...")
+    print(build_snapshot(tickers))
@@ -1,20 +1,53 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from logic.beta import rolling_beta, DEFAULT_BENCHMARKS, DEFAULT_WINDOWS
+from logic import indicators
+from logic.deadline import Deadline, FETCH_TIMEOUT
+from logic.http_pool import get_session
+
+# .info keys used by this class; everything else in the (large) info dict can be dropped
+INFO_KEYS = (
+    "longName", "shortName", "returnOnEquity", "trailingPE", "priceToBook",
+    "totalAssets", "totalStockholderEquity", "revenueGrowth", "marketCap",
+)
 
 class StockData:
     def __init__(self, ticker):
         self.ticker_symbol = ticker
-        self.ticker = yf.Ticker(ticker)
+        self.ticker = yf.Ticker(ticker, session=get_session())
         self.hist = None
         self.info = None
-
-    def fetch_data(self):
-        """Fetch historical data and basic info."""
+        self.benchmark_hist = {}
+        self._beta_profiles = {}
+        self._indicators = None # (hist the arrays were computed from, arrays)
+
+    @classmethod
+    def from_snapshot(cls, ticker, hist, info, benchmark_hist=None):
+        """Rebuild from precomputed snapshot data without any network call."""
+        stock = cls(ticker)
+        stock.hist = hist
+        stock.info = info
+        stock.benchmark_hist = benchmark_hist if benchmark_hist is not None else {}
+        return stock
+
+    def fetch_data(self, deadline=None):
+        """
+        Fetch historical data and basic info.
+        Each call is bounded by FETCH_TIMEOUT and the caller's deadline (raises TimeoutError).
+        """
         # fix: auto_adjust=True to handle splits/dividends, though for simple close price check it might be fine.
         # Getting 1 year of data for Beta calculation
-        self.hist = self.ticker.history(period="1y")
-        self.info = self.ticker.info
+        step = Deadline.within(deadline, FETCH_TIMEOUT)
+        self.hist = step.call(self.ticker.history, period="1y", timeout=step.remaining())
+        step = Deadline.within(deadline, FETCH_TIMEOUT)
+        self.info = step.call(lambda: self.ticker.info)
+
+    def compact(self):
+        """Trim .info to the keys actually used (before keeping the object in a cache)."""
+        if self.info:
+            self.info = {k: self.info.get(k) for k in INFO_KEYS}
+        return self
 
     def get_current_price(self):
         if self.hist is not None and not self.hist.empty:
@@ -29,63 +62,117 @@ class StockData:
 
     # --- Short-term Strategy Metrics ---
 
-    def calculate_beta(self, benchmark_ticker="^N225"):
-        """Calculate Beta relative to a benchmark (default: Nikkei 225) using last 20 days."""
+    def fetch_benchmark_history(self, benchmark_ticker, period="1y", deadline=None):
+        """
+        Fetch (and keep per instance) the history of a benchmark index.
+        A failed or timed-out fetch is remembered as None, so later beta calls do not wait on it again.
+        """
+        if benchmark_ticker not in self.benchmark_hist:
+            step = Deadline.within(deadline, FETCH_TIMEOUT)
+            try:
+                self.benchmark_hist[benchmark_ticker] = step.call(
+                    yf.Ticker(benchmark_ticker, session=get_session()).history, period=period, timeout=step.remaining()
+                )
+            except Exception:
+                self.benchmark_hist[benchmark_ticker] = None
+        return self.benchmark_hist[benchmark_ticker]
+
+    def calculate_beta_profile(self, benchmarks=None, windows=DEFAULT_WINDOWS, deadline=None):
+        """
+        Rolling beta / correlation / R^2 series for several windows and benchmarks.
+        Computed once per instance; see logic.beta.rolling_beta for the column layout.
+        Benchmarks that cannot be fetched within the deadline are left out.
+        """
         if self.hist is None or self.hist.empty:
             return None
-        
-        # We need benchmark data aligned with stock data
-        benchmark = yf.Ticker(benchmark_ticker)
-        # Fetch slightly more than 20 days to ensure overlap
-        bench_hist = benchmark.history(period="3mo")
 
-        # Calculate daily returns
+        benchmarks = benchmarks or DEFAULT_BENCHMARKS
+        key = (tuple(sorted(benchmarks.items())), tuple(windows))
+        if key in self._beta_profiles:
+            return self._beta_profiles[key]
+
         stock_returns = self.hist['Close'].pct_change().dropna()
-        bench_returns = bench_hist['Close'].pct_change().dropna()
-
-        # Align metrics
-        df = pd.DataFrame({'stock': stock_returns, 'benchmark': bench_returns}).dropna()
-        
-        # Use last 20 days of overlapping data
-        df_last20 = df.tail(20)
-        
-        if len(df_last20) < 10: # Not enough data
+        bench_returns = {}
+        for name, symbol in benchmarks.items():
+            bench_hist = self.fetch_benchmark_history(symbol, deadline=deadline)
+            if bench_hist is not None and not bench_hist.empty:
+                bench_returns[name] = bench_hist['Close'].pct_change().dropna()
+
+        profile = rolling_beta(stock_returns, bench_returns, windows=windows)
+        self._beta_profiles[key] = profile
+        return profile
+
+    def calculate_beta(self, benchmark_ticker="^N225", window=20):
+        """
+        Calculate Beta relative to a benchmark (default: Nikkei 225) using the last `window` days.
+        Read from the default profile when it covers the benchmark and window, so the same
+        series is not computed and cached twice under another label.
+        """
+        name = next((n for n, symbol in DEFAULT_BENCHMARKS.items() if symbol == benchmark_ticker), None)
+        if name is not None and window in DEFAULT_WINDOWS:
+            profile = self.calculate_beta_profile()
+        else:
+            name = benchmark_ticker
+            profile = self.calculate_beta_profile({name: benchmark_ticker}, windows=(window,))
+        if profile is None or profile.empty or name not in profile.columns.get_level_values(0):
             return None
 
-        # Covariance / Variance
-        covariance = df_last20['stock'].cov(df_last20['benchmark'])
-        variance = df_last20['benchmark'].var()
-        
-        if variance == 0:
+        beta = profile[(name, window, "beta")].iloc[-1]
+        if pd.isna(beta):
             return None
-            
-        return covariance / variance
+        return float(beta)
 
-    def calculate_rsi(self, window=14):
+    def calculate_indicators(self):
+        """
+        Every technical indicator series in one pass (see logic.indicators.compute_indicators).
+        Recomputed only when hist changes.
+        """
+        if self.hist is None or self.hist.empty:
+            return None
+
+        hist = self.hist
+        if self._indicators is None or self._indicators[0] is not hist:
+            # Missing prices carry the last close; a missing volume only blanks the windows containing it
+            prices = hist[[c for c in ('Close', 'High', 'Low') if c in hist]].ffill()
+            arrays = indicators.compute_indicators(
+                prices['Close'].to_numpy(),
+                high=prices['High'].to_numpy() if 'High' in prices else None,
+                low=prices['Low'].to_numpy() if 'Low' in prices else None,
+                volume=hist['Volume'].to_numpy() if 'Volume' in hist else None,
+            )
+            self._indicators = (hist, arrays)
+        return self._indicators[1]
+
+    def latest_indicator(self, name):
+        """Last value of one indicator series, or None if it is missing / not yet defined."""
+        arrays = self.calculate_indicators()
+        if not arrays or name not in arrays:
+            return None
+        value = arrays[name][-1]
+        if np.isnan(value):
+            return None
+        return float(value)
+
+    def calculate_rsi(self, window=14, method="sma"):
         """Calculate RSI (14 days)."""
         if self.hist is None or len(self.hist) < window + 1:
             return None
 
-        delta = self.hist['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.iloc[-1]
+        if window == 14 and method == "sma":
+            return self.latest_indicator("rsi")
+        value = indicators.rsi(self.hist['Close'].ffill().to_numpy(), window, method)[-1]
+        return None if np.isnan(value) else float(value)
 
     def check_volume_surge(self):
         """Check if recent volume is 1.5x of 5-day average."""
         if self.hist is None or len(self.hist) < 6:
             return None
 
-        recent_volume = self.hist['Volume'].iloc[-1]
-        avg_volume_5d = self.hist['Volume'].iloc[-6:-1].mean()
-
-        if avg_volume_5d == 0:
+        ratio = self.calculate_indicators()["volume_ratio"][-1]
+        if not np.isfinite(ratio): # 5-day average of 0
             return False
 
-        return recent_volume >= (avg_volume_5d * 1.5)
+        return bool(ratio >= 1.5)
 
     # --- Medium-term Strategy Metrics ---
 
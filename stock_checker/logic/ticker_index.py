@@ -0,0 +1,178 @@
+import bisect
+import csv
+import os
+import re
+import threading
+import unicodedata
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+INDEX_PATH = os.path.join(DATA_DIR, "tse_tickers.csv")
+
+# JPX "東証上場銘柄一覧" (data_j.xls); convert with: python -m logic.ticker_index <data_j.xls> [readings.csv]
+# Build-time only: reading .xls needs xlrd (pip install xlrd), the app itself does not.
+# The JPX list has no readings; kana / romaji come from an optional CSV with columns
+# code,kana,romaji (e.g. exported from a data vendor). Without it they are left empty,
+# except that names written only in kana or Latin letters are their own reading.
+JPX_LIST_URL = "https://www.jpx.co.jp/markets/statistics-equities/misc/tvdivq0000001vg2-att/data_j.xls"
+
+FIELDS = ("code", "name", "kana", "romaji", "sector", "market")
+CODE_PATTERN = re.compile(r'^[0-9][0-9A-Z]{3}$') # 4 characters, alphanumeric codes since 2024
+
+
+def normalize_code(text):
+    """'７２０３', '7203.t' -> '7203'."""
+    code = unicodedata.normalize("NFKC", str(text)).strip().upper()
+    if code.endswith(".T"):
+        code = code[:-2]
+    return code
+
+
+def normalize_key(text):
+    """Search key: NFKC, lower case, hiragana folded to katakana, spaces removed."""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+    return re.sub(r'\s+', '', text)
+
+
+class TickerIndex:
+    """
+    Listed TSE codes with company name (kanji, plus kana / romaji where the index has
+    readings, see build_index_csv), sector and market segment.
+
+    Prefix search runs on one sorted array of (key, code) pairs with bisect, which gives
+    trie-style prefix lookups in O(log n + k) without per-node objects.
+    """
+
+    def __init__(self, records=()):
+        self.records = {}
+        keys = []
+        for rec in records:
+            code = normalize_code(rec.get("code", ""))
+            if not CODE_PATTERN.match(code):
+                continue
+            rec = {f: (rec.get(f) or "").strip() for f in FIELDS}
+            rec["code"] = code
+            self.records[code] = rec
+            keys.append((code.lower(), code))
+            for field in ("name", "kana", "romaji"):
+                if rec[field]:
+                    keys.append((normalize_key(rec[field]), code))
+
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._codes = [c for _, c in keys]
+
+    @classmethod
+    def from_csv(cls, path=INDEX_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(csv.DictReader(f))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, code):
+        return normalize_code(code) in self.records
+
+    def get(self, code):
+        return self.records.get(normalize_code(code))
+
+    def name(self, code):
+        rec = self.get(code)
+        return rec["name"] if rec else None
+
+    def search(self, query, limit=10):
+        """Records whose code or name (or kana / romaji reading, if present) starts with query (codes first, no duplicates)."""
+        key = normalize_key(query)
+        if not key:
+            return []
+
+        results = []
+        seen = set()
+        start = bisect.bisect_left(self._keys, key)
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            code = self._codes[i]
+            if code not in seen:
+                seen.add(code)
+                results.append(self.records[code])
+
+        results.sort(key=lambda r: (not r["code"].lower().startswith(key), r["code"]))
+        return results[:limit]
+
+    def validate(self, text):
+        """
+        Resolves user input to a code without touching the network.
+        Returns (code, None) if valid, or (None, suggestions) when it is not a listed code.
+        An exact code or a name with a single prefix match is accepted.
+        With an empty index every well-formed code is accepted (index not installed).
+        """
+        code = normalize_code(text)
+        if not self.records:
+            return (code, None) if CODE_PATTERN.match(code) else (None, [])
+        if code in self.records:
+            return code, None
+
+        matches = self.search(text, limit=10)
+        if len(matches) == 1:
+            return matches[0]["code"], None
+        return None, matches
+
+
+# Plain strings (no regex escapes) so pandas' Arrow-backed str.match accepts them
+KANA_NAME = "^[ぁ-ゟ゠-ヿｦ-ﾟ ・ー]+$"
+LATIN_NAME = "^[A-Za-z0-9 .,&'-]+$"
+
+
+def build_index_csv(source, out_path=INDEX_PATH, readings=None):
+    """
+    Converts the JPX listed company file (xls, needs xlrd) to the index CSV.
+    readings: optional CSV (code,kana,romaji) merged in by code. The JPX file has no
+    readings, so without it kana / romaji are only filled for names that are already
+    written in kana or Latin letters.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(source, dtype=str)
+    df = df.rename(columns={"コード": "code", "銘柄名": "name", "33業種区分": "sector", "市場・商品区分": "market"})
+    # ETFs / REITs etc. have no sector ("-"); only equities are indexed
+    df = df[df["sector"].notna() & (df["sector"] != "-")]
+    for col in FIELDS:
+        if col not in df.columns:
+            df[col] = ""
+
+    if readings is not None:
+        extra = pd.read_csv(readings, dtype=str).set_index("code")
+        for col in ("kana", "romaji"):
+            if col in extra.columns:
+                df[col] = df["code"].map(extra[col]).fillna("")
+    names = df["name"].fillna("")
+    df.loc[(df["kana"] == "") & names.str.match(KANA_NAME), "kana"] = names
+    df.loc[(df["romaji"] == "") & names.str.match(LATIN_NAME), "romaji"] = names
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    df[list(FIELDS)].to_csv(out_path, index=False, encoding="utf-8")
+    return len(df)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ticker_index():
+    """Process-wide index, loaded once; empty if data/tse_tickers.csv is not installed."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = TickerIndex.from_csv()
+            except OSError:
+                _index = TickerIndex()
+        return _index
+
+
+if __name__ == "__main__":
+    import sys
+    source = sys.argv[1] if len(sys.argv) > 1 else JPX_LIST_URL
+    readings = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"{build_index_csv(source, readings=readings)} tickers written to {INDEX_PATH}")
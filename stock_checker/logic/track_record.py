@@ -0,0 +1,204 @@
+import datetime
+import json
+import os
+import threading
+import uuid
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from logic.http_pool import get_session
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+PICKS_PATH = os.path.join(DATA_DIR, "picks.jsonl")
+SCORECARD_PATH = os.path.join(DATA_DIR, "scorecard.json")
+
+HORIZONS = (1, 5, 20, 60) # Trading days after the entry close
+BENCHMARK = "^N225"
+MARKET_TZ = ZoneInfo("Asia/Tokyo")
+MARKET_CLOSE = datetime.time(15, 30)
+PRICE_LOOKBACK_DAYS = 7 # Extra history before the first pick
+CLOSE_FILL_LIMIT = 2 # Trading days a missing close (e.g. a short halt) is carried forward
+
+_picks_lock = threading.Lock()
+
+
+# --- Store ---
+
+def record_picks(items, model, job_id=None, price_lookup=None, path=PICKS_PATH, now=None):
+    """
+    Appends parsed AI picks (AIResearcher result items) to the JSON Lines store.
+    price_lookup(ticker) -> current price is optional; a failed lookup stores None
+    (the evaluator works from closing prices either way).
+    Returns the written records.
+    """
+    now = now or datetime.datetime.now(MARKET_TZ)
+    records = []
+    for item in items:
+        ticker = f"{item['ticker']}.T"
+        price = None
+        if price_lookup:
+            try:
+                price = price_lookup(ticker)
+                price = float(price) if price is not None else None
+            except Exception:
+                price = None
+        records.append({
+            "id": uuid.uuid4().hex[:12],
+            "ticker": ticker,
+            "name": item.get("name"),
+            "strategy": item.get("strategy", "不明"),
+            "model": item.get("model") or model, # Sub-queries may fall back to different models
+            "picked_at": now.isoformat(),
+            "price": price,
+            "confidence": item.get("confidence"),
+            "job_id": job_id,
+        })
+
+    if records:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _picks_lock, open(path, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return records
+
+
+def load_picks(path=PICKS_PATH):
+    """All recorded picks as a DataFrame (picked_at as tz-aware timestamps); empty if none."""
+    rows = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue # Torn last line of an interrupted write
+    except OSError:
+        pass
+    picks = pd.DataFrame(rows, columns=["id", "ticker", "name", "strategy", "model", "picked_at", "price", "confidence", "job_id"])
+    picks["picked_at"] = pd.to_datetime(picks["picked_at"], utc=True).dt.tz_convert(MARKET_TZ)
+    return picks
+
+
+# --- Evaluation ---
+
+def fetch_closes(tickers, start, benchmark=BENCHMARK):
+    """Daily closes (dates x tickers, benchmark included) in one yfinance download."""
+    symbols = sorted(set(tickers) | {benchmark})
+    data = yf.download(symbols, start=start, interval="1d", auto_adjust=True, progress=False, threads=True,
+                       session=get_session())
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+    index = pd.DatetimeIndex(closes.index)
+    if index.tz is not None:
+        index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    closes.index = index.normalize()
+    return closes
+
+
+def evaluate(picks, closes, horizons=HORIZONS, benchmark=BENCHMARK):
+    """
+    Forward and excess returns of every pick at once.
+
+    Entry is the first close at or after the pick (a pick after 15:30 enters on the next
+    trading day's close); the h-day return runs to the close h trading days later.
+    Returns picks with entry_date, entry_close and ret_{h}d / excess_{h}d / hit_{h}d columns
+    (NaN where the ticker has no data or the horizon has not elapsed yet).
+    A missing close is carried forward for at most CLOSE_FILL_LIMIT trading days, so a
+    delisted or long-halted ticker has no exit price (NaN, left out of the scorecard means)
+    instead of a flat, stale one.
+    """
+    out = picks.copy()
+    closes = closes.sort_index().ffill(limit=CLOSE_FILL_LIMIT)
+    dates = closes.index.values.astype("datetime64[ns]")
+    values = closes.to_numpy(dtype=float)
+    n_dates = len(dates)
+
+    local = out["picked_at"].dt.tz_convert(MARKET_TZ)
+    after_close = (local.dt.hour * 60 + local.dt.minute).to_numpy() >= MARKET_CLOSE.hour * 60 + MARKET_CLOSE.minute
+    entry_day = local.dt.tz_localize(None).dt.normalize().to_numpy().astype("datetime64[ns]")
+    entry_day = entry_day + after_close.astype(int) * np.timedelta64(1, "D")
+
+    pos = np.searchsorted(dates, entry_day, side="left")
+    col = closes.columns.get_indexer(out["ticker"])
+    bcol = closes.columns.get_loc(benchmark) if benchmark in closes.columns else -1
+    valid = (pos < n_dates) & (col >= 0) & (bcol >= 0)
+
+    pos_c = np.minimum(pos, n_dates - 1)
+    col_c = np.maximum(col, 0)
+    entry = np.where(valid, values[pos_c, col_c], np.nan)
+    bench_entry = np.where(valid, values[pos_c, bcol], np.nan)
+    out["entry_date"] = np.where(valid, dates[pos_c], np.datetime64("NaT"))
+    out["entry_close"] = entry
+
+    for h in horizons:
+        exit_pos = pos + h
+        ok = valid & (exit_pos < n_dates)
+        exit_c = np.minimum(exit_pos, n_dates - 1)
+        ret = np.where(ok, values[exit_c, col_c] / entry - 1, np.nan)
+        bench_ret = np.where(ok, values[exit_c, bcol] / bench_entry - 1, np.nan)
+        excess = ret - bench_ret
+        out[f"ret_{h}d"] = ret
+        out[f"excess_{h}d"] = excess
+        out[f"hit_{h}d"] = np.where(np.isnan(excess), np.nan, excess > 0)
+    return out
+
+
+def scorecard(evaluated, by, horizons=HORIZONS):
+    """Pick count and mean return / excess return / hit rate (excess > 0) per group."""
+    if evaluated.empty:
+        return pd.DataFrame()
+    cols = [f"{m}_{h}d" for h in horizons for m in ("ret", "excess", "hit")]
+    grouped = evaluated.groupby(by)
+    table = grouped[cols].mean()
+    table.insert(0, "picks", grouped.size())
+    return table.reset_index()
+
+
+# --- Persisted scorecard ---
+
+def build_scorecard(picks_path=PICKS_PATH, scorecard_path=SCORECARD_PATH, closes=None, now=None):
+    """
+    Evaluates every recorded pick and writes the per-model / per-strategy scorecard,
+    so the UI and API can show it without fetching prices.
+    closes (dates x tickers) can be passed in; otherwise they are downloaded in one call.
+    """
+    picks = load_picks(picks_path)
+    now = now or datetime.datetime.now(MARKET_TZ)
+    if picks.empty:
+        card = {"updated_at": now.isoformat(), "picks": 0, "evaluated": 0, "by_model": [], "by_strategy": []}
+    else:
+        if closes is None:
+            start = (picks["picked_at"].min() - pd.Timedelta(days=PRICE_LOOKBACK_DAYS)).date()
+            closes = fetch_closes(picks["ticker"].unique(), start)
+        evaluated = evaluate(picks, closes)
+        card = {
+            "updated_at": now.isoformat(),
+            "picks": len(picks),
+            "evaluated": int(evaluated["entry_close"].notna().sum()),
+            "by_model": _records(scorecard(evaluated, "model")),
+            "by_strategy": _records(scorecard(evaluated, "strategy")),
+        }
+
+    os.makedirs(os.path.dirname(scorecard_path), exist_ok=True)
+    tmp = scorecard_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(card, f, ensure_ascii=False)
+    os.replace(tmp, scorecard_path)
+    return card
+
+
+def _records(table):
+    """DataFrame -> JSON-safe records (NaN -> None)."""
+    return json.loads(table.to_json(orient="records", force_ascii=False))
+
+
+def load_scorecard(path=SCORECARD_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,20 @@
+import pytest
+from unittest.mock import MagicMock
+
+from logic import ai_researcher
+from logic.stock_data import StockData
+
+
+@pytest.fixture
+def mock_stock_data():
+    stock = StockData("7203.T")
+    stock.ticker = MagicMock()
+    return stock
+
+
+@pytest.fixture
+def clear_context_caches():
+    """Drop Gemini context caches left by other tests (module-level, shared per key)."""
+    ai_researcher._context_caches.clear()
+    yield
+    ai_researcher._context_caches.clear()
@@ -0,0 +1,35 @@
+"""Shared test data builders (no network)."""
+import numpy as np
+import pandas as pd
+
+from logic.stock_data import StockData
+
+
+def random_walk(rng, index, vol, start=100.0):
+    """Close series compounding normal daily returns with the given volatility."""
+    return pd.Series(start * np.cumprod(1 + rng.normal(0, vol, len(index))), index=index)
+
+
+def random_walks(rng, tickers, index, vol=0.02):
+    return {t: random_walk(rng, index, vol) for t in tickers}
+
+
+def bank_sector_records(n=10):
+    """Bank sector peers with ROE 2%..11% and PER 5..14."""
+    return [
+        {"ticker": f"{8300 + i}.T", "sector": "銀行業", "roe": 0.02 + 0.01 * i, "per": 5 + i, "equity_ratio": 0.05, "revenue_growth": 0.01 * i}
+        for i in range(n)
+    ]
+
+
+def stock_factory(hist, info):
+    """StockData factory whose fetches return hist (for the stock and every benchmark) and info."""
+    def factory(ticker):
+        stock = StockData(ticker)
+        def fetch(deadline=None):
+            stock.hist = hist
+            stock.info = dict(info)
+        stock.fetch_data = fetch
+        stock.fetch_benchmark_history = lambda symbol, period="1y", deadline=None: stock.benchmark_hist.setdefault(symbol, hist)
+        return stock
+    return factory
@@ -0,0 +1,40 @@
+"""Local stand-in for google.genai.Client used by tests (no network)."""
+import time
+from types import SimpleNamespace
+
+
+class FakeModels:
+    def __init__(self, responses, delay=0.0):
+        # responses: {model: text or Exception}, "*" matches any model
+        self.responses = responses
+        self.delay = delay # Simulated generation time (seconds)
+        self.calls = []
+
+    def generate_content(self, model, contents, config=None):
+        self.calls.append({"model": model, "contents": contents, "config": config})
+        time.sleep(self.delay)
+        result = self.responses.get(model, self.responses.get("*"))
+        if result is None:
+            raise Exception(f"404 models/{model} is not found")
+        if isinstance(result, Exception):
+            raise result
+        return SimpleNamespace(text=result)
+
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+
+    def create(self, model, config=None):
+        if self.fail:
+            raise Exception("400 Cached content is too small")
+        name = f"cachedContents/{model}-{len(self.created)}"
+        self.created.append({"model": model, "config": config, "name": name})
+        return SimpleNamespace(name=name)
+
+
+class FakeClient:
+    def __init__(self, responses, cache_fail=False, delay=0.0):
+        self.models = FakeModels(responses, delay=delay)
+        self.caches = FakeCaches(fail=cache_fail)
@@ -0,0 +1,340 @@
+"""
+Concurrent-session load harness for app.py.
+
+Drives N simulated sessions (scanner lookups, portfolio scans, an AI research job and
+its result tabs) with streamlit.testing.v1.AppTest against replayed yfinance data and the
+fake Gemini client, and reports p50/p95/p99 script-run latency, throughput and memory for each N.
+
+    python tests/load_harness.py --sessions 1 5 10 20 --iterations 3
+    python tests/load_harness.py --record 7203.T 8035.T ^N225 1306.T   # capture live data (network)
+
+All committed data is synthetic: tests/recordings holds generated price series in the
+--record format (not captured from Yahoo; replace them with --record to measure against
+real data), symbols without a file get a deterministic random walk, and the Gemini
+response is the fixed AI_REPORT string served by the fake client. Each level runs in its
+own process, so its peak RSS is not inflated by earlier levels, and all files the app
+writes (jobs, watchlist registry, picks) go to a temporary data directory.
+
+Running sessions concurrently needs concurrent_apptest(), which patches AppTest internals
+and is verified against Streamlit APPTEST_VERIFIED_VERSION only.
+"""
+import argparse
+import functools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+APP_PATH = os.path.join(APP_DIR, "app.py")
+RECORDINGS_DIR = os.path.join(HERE, "recordings")
+
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, HERE)
+os.environ.setdefault("SNAPSHOT_SCHEDULER", "0")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from logic.snapshot import hist_to_dict, hist_from_dict  # noqa: E402
+from logic.memory import process_rss  # noqa: E402
+from fake_genai import FakeClient  # noqa: E402
+
+DEFAULT_TICKERS = ["7203.T", "8035.T", "6758.T", "9984.T", "8306.T"]
+# Synthetic Gemini response (Markdown report format), not a captured one
+AI_REPORT = "\n".join(
+    f"### ■ 銘柄：テスト銘柄{i}（{t[:4]}） 【{'短期' if i % 2 else '中期'}】\n**【事実ベースの材料】**\n* 発表内容：テスト"
+    for i, t in enumerate(DEFAULT_TICKERS[:3])
+)
+
+
+# --- Recorded data ---
+
+def _recording_path(symbol):
+    return os.path.join(RECORDINGS_DIR, f"{symbol.replace('^', '_')}.json")
+
+
+def record(symbols):
+    """Saves live yfinance history / info for replay (needs network)."""
+    import yfinance as yf
+    from logic.http_pool import get_session
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    for symbol in symbols:
+        t = yf.Ticker(symbol, session=get_session())
+        hist = t.history(period="1y")
+        info = {} if symbol.startswith("^") else t.info
+        with open(_recording_path(symbol), "w", encoding="utf-8") as f:
+            json.dump({"hist": hist_to_dict(hist), "info": info}, f, ensure_ascii=False, default=str)
+        print(f"recorded {symbol}: {len(hist)} bars")
+
+
+def _synthetic(symbol):
+    """Deterministic one-year random walk for symbols without a recording."""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    index = pd.bdate_range(end="2024-06-28", periods=245, tz="Asia/Tokyo")
+    close = 1000 * np.cumprod(1 + rng.normal(0, 0.015, len(index)))
+    hist = pd.DataFrame({
+        "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.integers(1e5, 1e6, len(index)).astype(float),
+    }, index=index)
+    info = {
+        "longName": f"Synthetic {symbol}", "returnOnEquity": 0.11, "trailingPE": 14.0,
+        "totalAssets": 1e12, "totalStockholderEquity": 4.5e11, "revenueGrowth": 0.06,
+    }
+    return hist, info
+
+
+_replay_cache = {}
+_replay_lock = threading.Lock()
+replayed = set() # Symbols served from a recording (the rest are synthetic)
+
+
+def _load(symbol):
+    with _replay_lock:
+        if symbol not in _replay_cache:
+            try:
+                with open(_recording_path(symbol), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                _replay_cache[symbol] = (hist_from_dict(data["hist"]), data["info"])
+                replayed.add(symbol)
+            except OSError:
+                _replay_cache[symbol] = _synthetic(symbol)
+        return _replay_cache[symbol]
+
+
+class ReplayTicker:
+    """Stands in for yf.Ticker with recorded (or synthetic) data and a simulated network delay."""
+    latency = 0.0
+
+    def __init__(self, symbol, session=None):
+        self.ticker = symbol
+        self._hist, self._info = _load(symbol)
+
+    def history(self, period="1y", **kwargs):
+        time.sleep(self.latency)
+        return self._hist.copy()
+
+    @property
+    def info(self):
+        time.sleep(self.latency)
+        return dict(self._info)
+
+
+# --- Sessions ---
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+AI_JOB_TIMEOUT = 60 # seconds to wait for the fake research job
+
+
+def run_session(session_no, iterations, timings, errors):
+    """One simulated user: scanner lookups, a portfolio scan and an AI research job with its result tabs."""
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+
+    def timed(action):
+        started = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - started)
+        if at.exception:
+            errors.append(str(at.exception[0].value))
+
+    timed(at.run)
+    for i in range(iterations):
+        ticker = DEFAULT_TICKERS[(session_no + i) % len(DEFAULT_TICKERS)][:4]
+
+        # Scanner lookup
+        field = next(w for w in at.text_input if w.label.startswith("銘柄コード or 社名入力"))
+        field.set_value(ticker)
+        timed(_button(at, "詳細分析を実行").click().run)
+
+        # Portfolio scan
+        at.session_state["portfolio"] = [{"ticker": t, "entry": 1000.0} for t in DEFAULT_TICKERS[:3]]
+        timed(_button(at, "ポートフォリオ一括スキャン").click().run)
+
+        # AI research through the job queue and the fake Gemini client, then the result tabs
+        timed(_button(at, "🚀 AIリサーチ開始").click().run)
+        if "ai_job_id" in at.session_state and not _wait_for_job(at.session_state["ai_job_id"]):
+            errors.append("AI research job did not finish")
+            continue
+        timed(at.run) # Result tabs (the job may already have been picked up by the click run)
+        if "ai_results" not in at.session_state or not at.session_state["ai_results"].get("items"):
+            errors.append("AI research result not shown")
+
+
+def _wait_for_job(job_id):
+    from logic.jobs import get_job_queue
+    deadline = time.monotonic() + AI_JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        job = get_job_queue().get(job_id)
+        if job and job["status"] not in ("queued", "running"):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run_level(n_sessions, iterations):
+    timings, errors = [], []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        futures = [pool.submit(run_session, i, iterations, timings, errors) for i in range(n_sessions)]
+        for f in futures:
+            try:
+                f.result()
+            except Exception as e:
+                errors.append(repr(e))
+    wall = time.perf_counter() - started
+
+    t = np.array(timings) * 1000
+    return {
+        "sessions": n_sessions,
+        "runs": len(t),
+        "p50_ms": float(np.percentile(t, 50)) if len(t) else None,
+        "p95_ms": float(np.percentile(t, 95)) if len(t) else None,
+        "p99_ms": float(np.percentile(t, 99)) if len(t) else None,
+        "throughput_rps": len(t) / wall if wall else None,
+        "rss_mb": (process_rss() or 0) / 2**20,
+        # The level has the process to itself (see main), so this is the level's own peak
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # KiB on Linux
+        "replayed": sorted(replayed),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def isolated_data_dir(data_dir):
+    """
+    Points every file the app writes at data_dir: job queue, watchlist registry, AI picks
+    (and the snapshot / scorecard it reads). Returns the patches to enter.
+    """
+    from logic import jobs, snapshot, track_record
+    jobs._queue = jobs.JobQueue(job_dir=os.path.join(data_dir, "jobs"))
+    return [
+        patch.object(snapshot, "_store", snapshot.SnapshotStore(snapshot_dir=os.path.join(data_dir, "snapshots"))),
+        patch.object(snapshot, "register_watchlist_tickers", functools.partial(
+            snapshot.register_watchlist_tickers, path=os.path.join(data_dir, "watchlists.json"))),
+        patch.object(track_record, "record_picks", functools.partial(
+            track_record.record_picks, path=os.path.join(data_dir, "picks.jsonl"))),
+        patch.object(track_record, "load_scorecard", functools.partial(
+            track_record.load_scorecard, path=os.path.join(data_dir, "scorecard.json"))),
+    ]
+
+
+APPTEST_VERIFIED_VERSION = "1.66" # Streamlit major.minor the AppTest patches below were checked against
+
+
+def concurrent_apptest():
+    """
+    AppTest is written for one run at a time: each run sets the global Runtime instance and
+    patches config.get_option ("global.appTest"), and undoes both when it ends, pulling them
+    away from sessions still running in other threads. Apply the config override once for the
+    whole process and keep the last Runtime alive instead. Returns the patches to enter.
+
+    These are Streamlit internals, so the patches are applied only on APPTEST_VERIFIED_VERSION;
+    on other versions nothing is patched and concurrent levels may report AppTest errors.
+    """
+    import contextlib
+    import streamlit
+    if ".".join(streamlit.__version__.split(".")[:2]) != APPTEST_VERIFIED_VERSION:
+        print(f"warning: AppTest concurrency patches are verified on Streamlit {APPTEST_VERIFIED_VERSION} only "
+              f"(found {streamlit.__version__}); running without them", file=sys.stderr)
+        return []
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.util import build_mock_config_get_option
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        if not last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last[0]
+
+    return [
+        patch.object(config, "get_option", build_mock_config_get_option({"global.appTest": True})),
+        patch.object(app_test, "patch_config_options", lambda overrides: contextlib.nullcontext()),
+        patch.object(Runtime, "instance", classmethod(instance)),
+        patch.object(Runtime, "exists", classmethod(lambda cls: cls._instance is not None or bool(last))),
+    ]
+
+
+def run_in_process(args):
+    """Runs the levels in this process (the child side of main)."""
+    ReplayTicker.latency = args.latency
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="load_harness_")
+    patches = isolated_data_dir(data_dir) + concurrent_apptest() + [
+        patch("yfinance.Ticker", ReplayTicker),
+        patch("logic.ai_researcher.genai.Client", lambda **kw: FakeClient({"*": AI_REPORT})),
+        patch.dict(os.environ, {"GEMINI_API_KEY": "replay"}),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        if not args.cold:
+            run_level(1, 1) # Warm the process caches, as a long-running server would have them
+        for n in args.sessions:
+            print(json.dumps(run_level(n, args.iterations), ensure_ascii=False), flush=True)
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--iterations", type=int, default=2, help="action rounds per session")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per yfinance call")
+    parser.add_argument("--cold", action="store_true", help="measure each level without warming the caches first")
+    parser.add_argument("--data-dir", help="directory for files the app writes (default: a new temporary one)")
+    parser.add_argument("--record", nargs="*", metavar="SYMBOL", help="record live data for symbols and exit")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    parser.add_argument("--in-process", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.record is not None:
+        record(args.record or DEFAULT_TICKERS + ["^N225", "1306.T"])
+        return []
+    if args.in_process:
+        run_in_process(args)
+        return []
+
+    # One child process per level: ru_maxrss is a lifetime peak, so levels must not share a process
+    results = []
+    for n in args.sessions:
+        cmd = [sys.executable, os.path.abspath(__file__), "--in-process", "--sessions", str(n),
+               "--iterations", str(args.iterations), "--latency", str(args.latency)]
+        if args.cold:
+            cmd.append("--cold")
+        if args.data_dir:
+            cmd += ["--data-dir", os.path.join(args.data_dir, f"level_{n}")]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=APP_DIR)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f"level {n} failed:\n{proc.stderr[-2000:]}")
+        res = json.loads(lines[-1])
+        results.append(res)
+        if args.json:
+            print(json.dumps(res, ensure_ascii=False))
+        else:
+            print(
+                f"N={res['sessions']:>3}  runs={res['runs']:>4}  p50={res['p50_ms']:.0f}ms  p95={res['p95_ms']:.0f}ms  "
+                f"p99={res['p99_ms']:.0f}ms  {res['throughput_rps']:.1f} runs/s  "
+                f"RSS={res['rss_mb']:.0f}MB (peak {res['peak_rss_mb']:.0f}MB)  errors={res['errors']}"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from fake_genai import FakeClient
+from logic.ai_researcher import AIResearcher, build_sub_queries, merge_results
+from logic.model_health import ModelHealthTracker
+
+SONY = "### ■ 銘柄：ソニー（6758） 【短期】"
+
+pytestmark = pytest.mark.usefixtures("clear_context_caches")
+
+
+def test_parse_structured_response():
+    researcher = AIResearcher.__new__(AIResearcher)
+    text = """```json
+    {"items": [
+        {"ticker": "7203", "name": "トヨタ自動車", "strategy": "中期", "facts": ["営業利益20%増"], "risks": ["円高"], "confidence": 80},
+        {"ticker": "7203.T", "name": "重複", "strategy": "短期", "facts": [], "risks": [], "confidence": 10},
+        {"ticker": "abc", "name": "不正", "strategy": "短期", "facts": [], "risks": [], "confidence": 10},
+        {"ticker": "8035", "name": "東京エレクトロン", "strategy": "short", "facts": [], "risks": [], "confidence": 150}
+    ]}
+    ```"""
+    result = researcher._parse_structured(text)
+    assert [i['ticker'] for i in result['items']] == ["7203", "8035"]
+    assert result['items'][1]['strategy'] == "短期"
+    assert result['items'][1]['confidence'] == 100
+    # Rendered text stays parseable by the Markdown parser
+    assert researcher._parse_response(result['full_report'])['items'][0]['strategy'] == "中期"
+
+    assert researcher._parse_structured("### ■ 銘柄：トヨタ（7203） 【短期】") is None
+
+def test_analyze_with_gemini_uses_cached_context():
+    client = FakeClient({"gemini-2.5-flash": "### ■ 銘柄：トヨタ自動車（7203） 【中期】"})
+    researcher = AIResearcher("test-key", client=client)
+
+    for _ in range(2):
+        result = researcher.analyze_with_gemini(selected_model="gemini-2.5-flash", focus_sectors=["半導体"])
+        assert result['items'][0]['ticker'] == "7203"
+
+    # Static instruction registered once, requests carry only the dynamic part
+    assert len(client.caches.created) == 1
+    assert "# Role" in client.caches.created[0]['config'].system_instruction
+    call = client.models.calls[-1]
+    assert call['config'].cached_content == client.caches.created[0]['name']
+    assert "# Role" not in call['contents']
+    assert "注目セクター: 半導体" in call['contents']
+
+def test_analyze_with_gemini_without_cache_support():
+    client = FakeClient({"*": SONY}, cache_fail=True)
+    result = AIResearcher("test-key", client=client).analyze_with_gemini()
+
+    assert result['items'][0]['ticker'] == "6758"
+    config = client.models.calls[0]['config']
+    assert config.cached_content is None
+    assert "# Role" in config.system_instruction
+
+def test_decomposed_research_runs_sub_queries_concurrently():
+    queries = build_sub_queries("# Task\n\n銘柄を選定", focus_sectors=["半導体", "銀行"], per_sector=True)
+    assert [q["label"] for q in queries] == ["短期/半導体", "短期/銀行", "中期/半導体", "中期/銀行"]
+    assert "「銀行」セクター" in queries[1]["prompt"] and "【短期】の銘柄のみを2つ" in queries[1]["prompt"]
+
+    # Every sub-query returns the same two tickers; the untagged one takes the query's strategy
+    client = FakeClient({"*": "### ■ 銘柄：ソニー（6758）\n### ■ 銘柄：トヨタ自動車（7203） 【中期】"}, delay=0.5)
+    started = time.monotonic()
+    result = AIResearcher("test-key", client=client).analyze_with_gemini(decompose=True)
+    elapsed = time.monotonic() - started
+
+    assert len(client.models.calls) == 2
+    assert elapsed < 0.9 # About one sub-query, not the sum
+    assert [(i["ticker"], i["strategy"]) for i in result["items"]] == [("6758", "短期"), ("7203", "中期")]
+    assert result["full_report"].count("---") == 1 and "warning" not in result
+    assert len(client.caches.created) == 1 # Shared static context created once
+
+def test_merged_research_keeps_picks_per_strategy_and_models():
+    # Two sectors round 3 picks up to 2 each; the merge trims back to 3 per strategy
+    results = [
+        {"full_report": "a", "model": "m1", "items": [{"ticker": t, "strategy": "短期"} for t in ("1001", "1002")]},
+        {"full_report": "b", "model": "m2", "items": [{"ticker": t, "strategy": "短期"} for t in ("1003", "1004")]},
+        {"full_report": "c", "model": "m1", "items": [{"ticker": "1005", "strategy": "中期"}]},
+    ]
+    merged = merge_results(results)
+    assert [i["ticker"] for i in merged["items"]] == ["1001", "1002", "1003", "1005"]
+    assert merged["model"] == "m1, m2"
+
+    # The answering model comes back with the result instead of being stored on the researcher
+    client = FakeClient({"gemini-3-pro-preview": Exception("404 NOT_FOUND"), "*": SONY})
+    researcher = AIResearcher("test-key", client=client, health=ModelHealthTracker())
+    result = researcher.analyze_with_gemini(selected_model="gemini-2.5-flash", decompose=True)
+    assert result["model"] == "gemini-2.5-flash" and result["items"][0]["model"] == "gemini-2.5-flash"
+    assert not hasattr(researcher, "model_name")
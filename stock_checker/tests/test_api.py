@@ -0,0 +1,86 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from starlette.testclient import TestClient
+
+import api
+
+
+def fake_score(calls):
+    def score(ticker, deadline=None):
+        with calls["lock"]:
+            calls["n"] += 1
+        time.sleep(0.2) # Long enough for the duplicate request to arrive while in flight
+        code = api.normalize_code(ticker)
+        if code == "0000":
+            return {"error": "銘柄が見つかりません: 0000", "reason": "not_found", "ticker": ticker, "suggestions": []}
+        stock = MagicMock()
+        stock.get_company_name.return_value = f"Company {code}"
+        return {
+            "ticker": f"{code}.T", "stock": stock, "price": np.float64(1234.5), "source": "live", "as_of": None,
+            "stale": code == "8035", "stale_reason": "タイムアウト" if code == "8035" else None,
+            "short": {"score": 70, "rsi": np.float64("nan"), "volume_surge": np.bool_(True), "details": []},
+            "medium": {"score": 50, "details": []},
+        }
+    return score
+
+
+def test_api_batch_merges_identical_requests():
+    calls = {"n": 0, "lock": threading.Lock()}
+    with patch("api.score_ticker", fake_score(calls)):
+        client = TestClient(api.app)
+
+        res = client.post("/api/score", json={"tickers": ["7203", "7203.T", "８０３５"]})
+        assert res.status_code == 200
+        results = res.json()["results"]
+        assert [r["ticker"] for r in results] == ["7203.T", "7203.T", "8035.T"]
+        assert calls["n"] == 2 # 7203 fetched once for both spellings
+        assert results[0]["price"] == 1234.5 and results[0]["short"]["rsi"] is None
+        assert results[0]["short"]["volume_surge"] is True
+        assert results[0]["stale_reason"] is None and results[2]["stale_reason"] == "タイムアウト"
+
+        assert client.get("/api/score/0000").status_code == 404
+        assert client.get("/api/score", params={"tickers": ",".join(["7203"] * 51)}).status_code == 400
+        assert client.get("/api/health").json()["merged"] >= 1
+
+
+def test_api_latest_ai_result():
+    job = {"id": "abc123abc123", "updated_at": 1700000000.0, "params": {"model": "m"},
+           "result": {"full_report": "report", "items": [{"ticker": "7203", "strategy": "短期"}]}}
+    with patch("api.load_latest_job", return_value=job):
+        body = TestClient(api.app).get("/api/ai/latest").json()
+    assert body["items"][0]["ticker"] == "7203" and body["finished_at"].startswith("2023-11-14")
+
+    assert body["stale"] is False and body["stale_reason"] is None
+
+    with patch("api.load_latest_job", return_value=None):
+        assert TestClient(api.app).get("/api/ai/latest").status_code == 404
+
+
+def test_stale_ai_job_is_flagged(tmp_path):
+    from logic.jobs import JobQueue, load_latest_job
+
+    queue = JobQueue(job_dir=str(tmp_path))
+    fresh = queue.submit("ai_research", lambda progress, job_id: {"full_report": "new", "items": []})
+    stale = queue.submit("ai_research", lambda progress, job_id: {
+        "full_report": "old", "items": [], "stale": True, "stale_since": 1700000000.0, "warning": "時間内に応答がありませんでした"})
+    queue._executor.shutdown(wait=True)
+
+    job = queue.get(stale)
+    assert job["status"] == "done" and job["stale"] and job["stale_reason"] == "時間内に応答がありませんでした"
+    assert load_latest_job("ai_research", job_dir=str(tmp_path), include_stale=False)["id"] == fresh
+
+    with patch("api.load_latest_job", return_value=job):
+        body = TestClient(api.app).get("/api/ai/latest").json()
+    assert body["stale"] is True and body["stale_reason"] == "時間内に応答がありませんでした"
+    assert body["stale_since"] == 1700000000.0
+
+
+def test_api_scorecard():
+    card = {"updated_at": "2024-01-02T16:00:00+09:00", "picks": 1, "evaluated": 1, "by_model": [], "by_strategy": []}
+    with patch("api.load_scorecard", return_value=card):
+        assert TestClient(api.app).get("/api/ai/scorecard").json() == card
+    with patch("api.load_scorecard", return_value=None):
+        assert TestClient(api.app).get("/api/ai/scorecard").status_code == 404
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from factories import random_walk
+from logic.beta import rolling_beta
+
+
+def test_rolling_beta_matches_pandas():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(start="2023-01-01", periods=120)
+    bench = pd.Series(rng.normal(0, 0.01, 120), index=dates)
+    stock = 1.5 * bench + pd.Series(rng.normal(0, 0.005, 120), index=dates)
+    topix = pd.Series(rng.normal(0, 0.01, 120), index=dates).iloc[5:] # Missing first days
+
+    profile = rolling_beta(stock, {"N225": bench, "TOPIX": topix}, windows=(20, 60))
+
+    expected = stock.tail(20).cov(bench.tail(20)) / bench.tail(20).var()
+    assert profile[("N225", 20, "beta")].iloc[-1] == pytest.approx(expected)
+    expected_corr = stock.tail(60).corr(topix.tail(60))
+    assert profile[("TOPIX", 60, "corr")].iloc[-1] == pytest.approx(expected_corr)
+    assert profile[("N225", 60, "r2")].iloc[-1] > 0.5
+    # Not enough overlapping data at the start
+    assert np.isnan(profile[("N225", 20, "beta")].iloc[3])
+    # Partial windows are reported through the observation count
+    assert profile[("N225", 60, "n")].iloc[39] == 40 and profile[("N225", 60, "n")].iloc[-1] == 60
+    assert profile[("TOPIX", 20, "n")].iloc[9] == 5
+
+def test_calculate_beta_uses_profile(mock_stock_data):
+    rng = np.random.default_rng(1)
+    dates = pd.date_range(start="2023-01-01", periods=60)
+    bench_close = random_walk(rng, dates, 0.01)
+    stock_close = 100 * (1 + 2 * bench_close.pct_change().fillna(0)).cumprod()
+    mock_stock_data.hist = pd.DataFrame({'Close': stock_close})
+    mock_stock_data.benchmark_hist["^N225"] = pd.DataFrame({'Close': bench_close})
+    mock_stock_data.benchmark_hist["1306.T"] = None # TOPIX proxy unavailable
+
+    assert mock_stock_data.calculate_beta() == pytest.approx(2.0)
+    assert mock_stock_data.calculate_beta(window=60) == pytest.approx(2.0)
+    # Both read the default profile instead of caching a second one for ^N225
+    assert len(mock_stock_data._beta_profiles) == 1
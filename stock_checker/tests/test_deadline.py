@@ -0,0 +1,41 @@
+import time
+
+import pandas as pd
+from unittest.mock import patch
+
+from fake_genai import FakeClient
+from logic import scoring
+from logic.ai_researcher import AIResearcher
+from logic.deadline import Deadline
+from logic.memory import LRUCache
+from logic.stock_data import StockData
+
+
+class HungTicker:
+    def __init__(self, symbol, session=None):
+        pass
+    def history(self, **kwargs):
+        time.sleep(2)
+
+
+def test_deadline_returns_stale_score_on_timeout():
+    # Expired cache entry (ttl=0) is served, marked stale, when the live fetch times out
+    cache = LRUCache("test", 10**8, ttl=0)
+    stock = StockData.from_snapshot("7203.T", pd.DataFrame({'Close': [100.0, 101.0]}), {"longName": "Toyota"})
+    cache.put("7203.T", (stock, {"score": 40}, {"score": 50, "details": []}))
+    started = time.monotonic()
+    with patch("logic.scoring.stock_cache", cache), patch("logic.stock_data.yf.Ticker", HungTicker):
+        res = scoring.score_ticker("7203", deadline=Deadline(0.3))
+        assert res["stale"] and res["stale_reason"] == "タイムアウト"
+        assert res["short"]["score"] == 40 and res["source"] == "cache"
+        assert scoring.score_ticker("8035", deadline=Deadline(0.2))["reason"] == "timeout"
+    assert time.monotonic() - started < 1.5
+
+def test_deadline_returns_last_research_when_model_is_slow():
+    # A model slower than the budget: the last finished research comes back as stale
+    previous = {"id": "abc123abc123", "updated_at": 1.0, "result": {"full_report": "old", "items": [{"ticker": "7203"}]}}
+    client = FakeClient({"*": "### ■ 銘柄：ソニー（6758） 【短期】"}, delay=1.0, cache_fail=True)
+    with patch("logic.ai_researcher.load_latest_job", return_value=previous):
+        result = AIResearcher("test-key", client=client).analyze_with_gemini(deadline=Deadline(0.3))
+    assert result["stale"] and result["items"][0]["ticker"] == "7203"
+    assert len(client.models.calls) == 1
@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from logic.http_pool import HAS_CURL_CFFI, PooledSession
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive
+    def do_GET(self):
+        time.sleep(0.1)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_pooled_session_reuses_connections_and_limits_per_host(local_url):
+    session = PooledSession(max_per_host=2)
+    # Sequential requests on one thread share one connection
+    for _ in range(3):
+        assert session.get(local_url).status_code == 200
+    if HAS_CURL_CFFI:
+        assert session.stats()[0]["new_connections"] == 1
+
+    # Six concurrent requests: never more than two in flight, the rest wait for a slot
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        assert all(r.status_code == 200 for r in pool.map(lambda _: session.get(local_url), range(6)))
+    row = session.stats()[0]
+    assert row["host"] == "127.0.0.1" and row["requests"] == 9
+    assert row["peak"] == 2 and row["in_use"] == 0
+    assert row["waited"] >= 3 and row["saturation"] > 0
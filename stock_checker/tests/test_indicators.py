@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from factories import random_walk
+from logic import indicators
+from logic.stock_data import StockData
+
+
+def test_indicator_kernels_match_pandas():
+    rng = np.random.default_rng(1)
+    close = random_walk(rng, pd.RangeIndex(120), 0.02, start=1000.0)
+    high, low = close * 1.01, close * 0.99
+    volume = pd.Series(rng.integers(1000, 5000, 120).astype(float))
+
+    out = indicators.compute_indicators(close.to_numpy(), high.to_numpy(), low.to_numpy(), volume.to_numpy())
+
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    np.testing.assert_allclose(out["rsi"][14:], (100 - 100 / (1 + gain / loss))[14:])
+
+    # Wilder: seeded with the first 14-day mean, then avg = (avg * 13 + x) / 14
+    g, l = delta.clip(lower=0).to_numpy()[1:], (-delta.clip(upper=0)).to_numpy()[1:]
+    ag, al = g[:14].mean(), l[:14].mean()
+    expected = [100 - 100 / (1 + ag / al)]
+    for x, y in zip(g[14:], l[14:]):
+        ag, al = (ag * 13 + x) / 14, (al * 13 + y) / 14
+        expected.append(100 - 100 / (1 + ag / al))
+    np.testing.assert_allclose(out["rsi_wilder"][14:], expected)
+
+    np.testing.assert_allclose(out["sma_25"][24:], close.rolling(25).mean()[24:])
+    np.testing.assert_allclose(out["bb_upper"][19:], (close.rolling(20).mean() + 2 * close.rolling(20).std(ddof=0))[19:])
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    np.testing.assert_allclose(out["macd"], macd)
+    np.testing.assert_allclose(out["volume_ratio"][5:], (volume / volume.rolling(5).mean().shift(1))[5:])
+    assert out["atr"][12] != out["atr"][12] and out["atr"][13] > 0 # NaN until the first full window
+
+    # Ticker x time matrix gives the same rows as single-ticker calls
+    matrix = np.vstack([close.to_numpy(), close.to_numpy()[::-1]])
+    rows = indicators.rsi(matrix, 14, "wilder")
+    np.testing.assert_allclose(rows[1], indicators.rsi(close.to_numpy()[::-1], 14, "wilder"))
+
+def test_indicators_recover_after_nan_gap():
+    rng = np.random.default_rng(4)
+    close = random_walk(rng, pd.RangeIndex(120), 0.01, start=1000.0)
+    volume = pd.Series(np.full(120, 1000.0))
+    volume.iloc[-1] = 5000.0 # 5x surge on the last bar
+    close.iloc[60] = np.nan
+    volume.iloc[-50] = np.nan
+
+    # Only the windows containing the gap are NaN, as with pandas rolling()
+    ratio = indicators.volume_ratio(volume.to_numpy())
+    np.testing.assert_allclose(ratio, volume / volume.rolling(5).mean().shift(1))
+    np.testing.assert_allclose(indicators.sma(close.to_numpy(), 25), close.rolling(25).mean())
+
+    stock = StockData.from_snapshot("7203.T", pd.DataFrame({'Close': close, 'Volume': volume}), {})
+    assert stock.check_volume_surge() is True
+    for name in ("sma_25", "bb_upper", "macd", "rsi_wilder"):
+        assert stock.latest_indicator(name) is not None
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+from factories import random_walk
+from logic.intraday import BarRing, IntradayStore
+from logic.scoring import score_intraday
+
+
+def test_intraday_ring_buffer_and_incremental_refresh():
+    ring = BarRing(capacity=4)
+    ring.extend([1, 2, 3], np.tile([1.0, 2.0, 3.0], (5, 1)))
+    ring.extend([3, 4, 5, 6], np.tile([30.0, 4.0, 5.0, 6.0], (5, 1))) # 3 is re-sent (forming bar)
+    frame = ring.to_frame()
+    assert list(frame['Close']) == [30.0, 4.0, 5.0, 6.0] and ring.count == 4
+    assert ring.nbytes == 4 * 6 * 8
+
+    rng = np.random.default_rng(3)
+    index = pd.date_range("2024-06-03 09:00", periods=400, freq="5min", tz="Asia/Tokyo")
+    def bars():
+        close = random_walk(rng, index, 0.002, start=1000.0)
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                             'Volume': np.full(len(index), 1000.0)}, index=index)
+    data = {s: bars() for s in ("7203.T", "^N225", "1306.T")}
+    calls = []
+
+    class FakeTicker:
+        def __init__(self, symbol, session=None):
+            self.symbol = symbol
+        def history(self, period=None, start=None, interval=None, timeout=None):
+            calls.append((self.symbol, period, start))
+            hist = data[self.symbol]
+            return hist if start is None else hist[hist.index >= start]
+
+    now = [0.0]
+    store = IntradayStore("5m", capacity=300, clock=lambda: now[0])
+    with patch("logic.intraday.yf.Ticker", FakeTicker), \
+         patch("logic.scoring.get_intraday_store", return_value=store):
+        res = score_intraday("7203")
+        assert res["bars"] == 300 and res["short"]["beta"] is not None
+        assert any("60本ベータ" in d for d in res["short"]["details"])
+        size = store.stats()["bytes"]
+
+        # Within the bar interval: no download at all
+        score_intraday("7203")
+        assert len(calls) == 3
+
+        # Next bar: only bars from the newest stored one are requested, memory unchanged
+        now[0] += 300
+        data["7203.T"].loc[index[-1] + pd.Timedelta("5min")] = [1.0, 1.0, 1.0, 1.0, 9000.0]
+        res = score_intraday("7203")
+        assert calls[3][0] == "7203.T" and calls[3][2] is not None
+        assert res["short"]["volume_surge"] and store.stats()["bytes"] == size
+
+    # Only recently viewed tickers are polled, within the buffer cap
+    assert store.poll_tickers() == ["^N225", "1306.T", "7203.T"]
+    now[0] += 3600
+    assert store.poll_tickers() == ["^N225", "1306.T"]
+
+def test_intraday_first_fetch_is_shared():
+    index = pd.date_range("2024-06-03 09:00", periods=50, freq="5min", tz="Asia/Tokyo")
+    hist = pd.DataFrame({f: np.full(50, 100.0) for f in ("Open", "High", "Low", "Close", "Volume")}, index=index)
+    calls = []
+
+    class SlowTicker:
+        def __init__(self, symbol, session=None):
+            pass
+        def history(self, **kwargs):
+            calls.append(kwargs)
+            time.sleep(0.3)
+            return hist
+
+    store = IntradayStore("5m", capacity=100)
+    with patch("logic.intraday.yf.Ticker", SlowTicker):
+        first = threading.Thread(target=store.refresh, args=("7203.T",))
+        first.start()
+        time.sleep(0.05)
+        # A second session arriving mid-download waits for it instead of seeing no data
+        assert store.refresh("7203.T") == 0
+        assert store.frame("7203.T") is not None and len(calls) == 1
+        first.join()
@@ -0,0 +1,33 @@
+import time
+
+from logic.jobs import JobQueue
+
+
+def wait_until(predicate, tries=100):
+    for _ in range(tries):
+        if predicate():
+            return
+        time.sleep(0.01)
+
+
+def test_job_queue_runs_and_persists(tmp_path):
+    queue = JobQueue(job_dir=str(tmp_path))
+
+    def task(progress, job_id):
+        progress("step 1")
+        return {"full_report": "ok", "items": [], "job_id": job_id}
+
+    job_id = queue.submit("ai_research", task, params={"model": "gemini-2.5-flash"})
+    wait_until(lambda: queue.get(job_id)['status'] == "done")
+    assert queue.get(job_id)['result'] == {"full_report": "ok", "items": [], "job_id": job_id}
+    # Finished jobs are dropped from memory and read back from their file
+    wait_until(lambda: job_id not in queue._jobs)
+    assert job_id not in queue._jobs and queue.get(job_id)['progress'] == "完了"
+
+    # Another process (fresh queue) reads the finished job from disk
+    assert JobQueue(job_dir=str(tmp_path)).get(job_id)['status'] == "done"
+    assert queue.get("../../etc/passwd") is None
+
+    failed = queue.submit("ai_research", lambda progress, job_id: {"error": "quota"})
+    wait_until(lambda: queue.get(failed)['status'] not in ("queued", "running"))
+    assert queue.get(failed)['status'] == "error"
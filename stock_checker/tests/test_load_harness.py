@@ -0,0 +1,10 @@
+from load_harness import main
+
+def test_load_harness_smoke(tmp_path):
+    """2 concurrent sessions with replayed data (including an AI research job) run without script exceptions."""
+    results = main(["--sessions", "2", "--iterations", "1", "--json", "--data-dir", str(tmp_path)])
+    assert results[0]['errors'] == 0, results[0]['first_error']
+    assert results[0]['runs'] == 10
+    assert results[0]['p95_ms'] >= results[0]['p50_ms']
+    assert "7203.T" in results[0]['replayed']
+    assert (tmp_path / "level_2" / "jobs").is_dir()
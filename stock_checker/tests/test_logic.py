@@ -2,17 +2,8 @@ import pytest
 import pandas as pd
 import numpy as np
 from unittest.mock import MagicMock, patch
-from logic.stock_data import StockData
 from logic.scorer import Scorer
 
-# --- Mock Data ---
-
-@pytest.fixture
-def mock_stock_data():
-    stock = StockData("7203.T")
-    stock.ticker = MagicMock()
-    return stock
-
 def test_check_volume_surge(mock_stock_data):
     # Mock history data
     dates = pd.date_range(start="2023-01-01", periods=10)
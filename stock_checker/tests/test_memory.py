@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from logic.memory import LRUCache, estimate_size
+
+
+def test_lru_cache_evicts_by_size():
+    frame = pd.DataFrame({'Close': np.arange(1000, dtype=float)})
+    size = estimate_size(frame)
+    assert size >= 8000
+
+    cache = LRUCache("test", max_bytes=int(size * 2.5))
+    cache.put("a", frame)
+    cache.put("b", frame.copy())
+    assert cache.get("a") is frame # "a" becomes most recently used
+    cache.put("c", frame.copy())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is frame and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats['items'] == 2 and stats['evictions'] == 1
+    assert stats['bytes'] <= stats['max_bytes']
+
+    cache.put("huge", pd.DataFrame({'x': np.zeros(10000)}))
+    assert cache.get("huge") is None and len(cache) == 2
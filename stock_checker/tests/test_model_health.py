@@ -0,0 +1,71 @@
+from fake_genai import FakeClient
+from logic import ai_researcher
+from logic.ai_researcher import AIResearcher
+from logic.model_health import ModelHealthTracker, get_model_health
+
+SONY = "### ■ 銘柄：ソニー（6758） 【短期】"
+
+
+def test_model_health_skips_failing_models(clear_context_caches):
+    now = [1000.0]
+    health = ModelHealthTracker(clock=lambda: now[0])
+    client = FakeClient({
+        "gemini-3-pro-preview": Exception("404 NOT_FOUND"),
+        "gemini-2.5-flash": Exception("429 RESOURCE_EXHAUSTED: quota exceeded"),
+        "*": SONY,
+    })
+    researcher = AIResearcher("test-key", client=client, health=health)
+
+    assert researcher.analyze_with_gemini()['items'][0]['ticker'] == "6758"
+    first_run = [c['model'] for c in client.models.calls]
+    assert first_run[:2] == ["gemini-3-pro-preview", "gemini-2.5-flash"]
+
+    # Second run goes straight to the healthy model
+    client.models.calls.clear()
+    researcher.analyze_with_gemini()
+    assert [c['model'] for c in client.models.calls] == [first_run[-1]]
+
+    # Quota cool-down expires, 404 cool-down does not
+    now[0] += 120
+    assert health.is_available("gemini-2.5-flash")
+    assert not health.is_available("gemini-3-pro-preview")
+    assert health.rank(["gemini-3-pro-preview", "gemini-2.5-flash"]) == ["gemini-2.5-flash"]
+
+def test_model_health_is_per_key_and_ignores_auth_and_cache_misses(clear_context_caches):
+    assert get_model_health("key-a") is get_model_health("key-a")
+    assert get_model_health("key-a") is not get_model_health("key-b")
+
+    # A bad key never cools models down, however often it fails
+    health = ModelHealthTracker()
+    for _ in range(5):
+        assert health.record_failure("gemini-2.5-flash", Exception("403 PERMISSION_DENIED: API key not valid")) == "auth"
+    assert health.is_available("gemini-2.5-flash") and not health.snapshot()
+
+    # An expired cached context is resent without the cache instead of failing the model
+    client = FakeClient({"*": SONY})
+    generate = client.models.generate_content
+    def expire_cache(model, contents, config=None):
+        if config.cached_content:
+            client.models.calls.append({"model": model, "contents": contents, "config": config})
+            raise Exception("404 NOT_FOUND: CachedContent not found (or permission denied)")
+        return generate(model, contents, config)
+    client.models.generate_content = expire_cache
+
+    researcher = AIResearcher("test-key", client=client, health=ModelHealthTracker())
+    result = researcher.analyze_with_gemini(selected_model="gemini-2.5-flash")
+    assert result["items"][0]["ticker"] == "6758"
+    assert [c["config"].cached_content is None for c in client.models.calls] == [False, True]
+    assert researcher.health.snapshot()[0]["last_error"] is None
+    assert not ai_researcher._context_caches # Recreated on the next call
+
+def test_concurrent_quota_errors_back_off_once():
+    now = [1000.0]
+    health = ModelHealthTracker(clock=lambda: now[0])
+    for _ in range(4): # Parallel sub-queries hitting the same quota
+        health.record_failure("gemini-2.5-flash", Exception("429 RESOURCE_EXHAUSTED"))
+    assert health.snapshot()[0]["cooldown_remaining"] == 60
+
+    # A quota error after the cool-down has ended doubles it
+    now[0] += 61
+    health.record_failure("gemini-2.5-flash", Exception("429 RESOURCE_EXHAUSTED"))
+    assert health.snapshot()[0]["cooldown_remaining"] == 120
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from factories import random_walk, random_walks
+from logic.risk import PortfolioRisk, benchmark_close, portfolio_risk
+from logic.stock_data import StockData
+
+TICKERS = ["7203.T", "8035.T", "6758.T"]
+
+
+def test_portfolio_risk_aligns_pairs_separately():
+    rng = np.random.default_rng(2)
+    dates = pd.date_range(start="2023-01-01", periods=80)
+    bench = random_walk(rng, dates, 0.01)
+    closes = random_walks(rng, TICKERS, dates)
+
+    risk = PortfolioRisk(closes, benchmark_close=bench, window=30)
+    returns = pd.DataFrame(closes).pct_change().dropna().tail(30)
+    pd.testing.assert_frame_equal(risk.covariance(), returns.cov(), check_names=False)
+
+    summary = risk.summary()
+    assert summary['observations'] == 30
+    assert summary['effective_n'] == pytest.approx(3.0)
+    assert summary['var_historical'] > 0
+    assert summary['var_parametric'] > 0
+    assert summary['beta'] is not None
+
+    # A recent listing with 10 bars only shortens its own pairs
+    short = {**closes, "9999.T": closes["6758.T"].iloc[-10:]}
+    risk = PortfolioRisk(short, benchmark_close=bench, window=30)
+    cov = risk.covariance()
+    pd.testing.assert_frame_equal(cov.loc[list(closes), list(closes)], returns.cov(), check_names=False)
+    assert cov.loc["9999.T", "7203.T"] == pytest.approx(returns["7203.T"].tail(9).cov(returns["6758.T"].tail(9)))
+    assert risk.summary()['observations'] == 30
+
+def test_portfolio_risk_incremental_update_matches_full_recompute():
+    rng = np.random.default_rng(5)
+    dates = pd.date_range(start="2023-01-01", periods=80)
+    bench = random_walk(rng, dates, 0.01)
+    closes = random_walks(rng, TICKERS, dates)
+    closes["8035.T"].iloc[62:64] = np.nan # Short gap: carried forward
+    closes["6758.T"].iloc[66:72] = np.nan # Long gap: absent for part of it
+    closes["9999.T"] = closes["7203.T"].iloc[55:] * 1.5 # Listed during the window
+
+    previous = PortfolioRisk({t: c[:dates[59]] for t, c in closes.items()}, benchmark_close=bench[:dates[59]], window=30)
+    risk = portfolio_risk(closes, benchmark_close=bench, previous=previous, window=30)
+    full = PortfolioRisk(closes, benchmark_close=bench, window=30)
+    assert risk is previous
+
+    expected = pd.DataFrame(closes).ffill(limit=3).pct_change().dropna(how="all").tail(30).cov(min_periods=2)
+    pd.testing.assert_frame_equal(risk.covariance(), expected, check_names=False)
+    pd.testing.assert_frame_equal(risk.covariance(), full.covariance())
+    assert risk.summary() == pytest.approx(full.summary())
+
+    # The same bar again is ignored
+    risk.update({t: c.iloc[-1] for t, c in closes.items()}, benchmark_close=bench.iloc[-1], date=dates[-1])
+    pd.testing.assert_frame_equal(risk.covariance(), full.covariance())
+
+def test_portfolio_risk_repairs_non_psd_covariance():
+    rng = np.random.default_rng(6)
+    dates = pd.date_range(start="2023-01-01", periods=31)
+    moves = [random_walk(rng, dates[i * 10:i * 10 + 11], 0.02) for i in range(3)]
+    # a~b and b~c move together, a~c opposite, each pair on its own stretch: not positive semi-definite
+    closes = {
+        "a": pd.concat([moves[0], 1e4 / moves[2].iloc[1:]]),
+        "b": pd.concat([moves[0], moves[1].iloc[1:] * moves[0].iloc[-1] / moves[1].iloc[0]]),
+        "c": pd.concat([moves[1], moves[2].iloc[1:] * moves[1].iloc[-1] / moves[2].iloc[0]]),
+    }
+    closes["a"] = closes["a"][~closes["a"].index.isin(dates[11:21])]
+    closes["c"] = closes["c"][closes["c"].index >= dates[10]]
+    risk = PortfolioRisk(closes, window=40)
+    assert np.linalg.eigvalsh(risk.covariance().fillna(0).to_numpy()).min() < 0
+
+    summary = risk.summary()
+    assert summary["covariance_repaired"] and summary["volatility"] > 0 and summary["var_parametric"] > 0
+
+def test_portfolio_risk_without_benchmark():
+    class DownTicker:
+        def __init__(self, symbol, session=None):
+            pass
+        def history(self, **kwargs):
+            raise ConnectionError("benchmark unavailable")
+
+    dates = pd.date_range(start="2023-01-01", periods=40)
+    rng = np.random.default_rng(3)
+    stocks = [
+        StockData.from_snapshot(t, pd.DataFrame({'Close': close}), {})
+        for t, close in random_walks(rng, ["7203.T", "8035.T"], dates).items()
+    ]
+    with patch("logic.stock_data.yf.Ticker", DownTicker):
+        assert stocks[0].fetch_benchmark_history("^N225") is None
+
+    # A failed fetch is stored as None; risk is computed without beta instead of crashing
+    assert benchmark_close(stocks, "^N225") is None
+    risk = PortfolioRisk({s.ticker_symbol: s.hist['Close'] for s in stocks}, benchmark_close=None)
+    summary = risk.summary()
+    assert summary['beta'] is None and summary['var_historical'] > 0
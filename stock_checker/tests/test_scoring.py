@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+from factories import bank_sector_records, stock_factory
+from logic import scoring
+from logic.memory import LRUCache
+from logic.sector_stats import SectorStats
+from logic.ticker_index import TickerIndex
+
+
+def test_cached_score_applies_sector_relative_once():
+    table = SectorStats.build(bank_sector_records())
+    index = TickerIndex([{"code": "8316", "name": "三井住友FG", "sector": "銀行業", "market": "プライム"}])
+    close = np.linspace(100, 130, 80)
+    hist = pd.DataFrame({'Close': close, 'Volume': [1000] * 80}, index=pd.date_range("2024-01-01", periods=80))
+
+    with patch("logic.scoring.stock_cache", LRUCache("test", 10**8, ttl=300)), \
+         patch("logic.scoring.get_snapshot_store") as store, \
+         patch("logic.scoring.get_sector_stats", return_value=table), \
+         patch("logic.scoring.get_ticker_index", return_value=index), \
+         patch("logic.scoring.StockData", side_effect=stock_factory(hist, {"returnOnEquity": 0.12, "trailingPE": 8.0})):
+        store.return_value.get.return_value = None
+        live = scoring.score_ticker("8316")
+        cached = scoring.score_ticker("8316")
+
+    assert (live["source"], cached["source"]) == ("live", "cache")
+    # The cache hit is rescored against the table (which now includes 8316 itself), not stacked on top
+    assert cached["medium"]["score"] == live["medium"]["score"]
+    assert cached["medium"]["details"][:-1] == live["medium"]["details"][:-1]
+    assert sum(d.startswith("業種内評価") for d in cached["medium"]["details"]) == 1
@@ -0,0 +1,30 @@
+import pytest
+from unittest.mock import MagicMock
+
+from factories import bank_sector_records
+from logic.scorer import Scorer
+from logic.sector_stats import SectorStats
+
+
+def test_sector_stats_relative_scoring(mock_stock_data):
+    table = SectorStats.build(bank_sector_records())
+    assert table.summary("銀行業")["per"]["median"] == pytest.approx(9.5)
+
+    # ROE 12% tops the bank sector; PER 14 ties the most expensive peer
+    relative = table.relative_scores("銀行業", {"roe": 0.12, "per": 14.0})
+    assert relative["scores"] == {"roe": 100, "per": 5}
+    assert table.relative_scores("電気機器", {"roe": 0.12})["score"] is None
+
+    # Incremental refresh replaces the old values without touching lists a reader already holds
+    held = table._values[("銀行業", "roe")]
+    held_copy = list(held)
+    table.update("8300.T", "銀行業", {"roe": 0.50, "per": 100.0})
+    assert held == held_copy
+    assert table._values[("銀行業", "roe")] is not held
+    assert table.summary("銀行業")["roe"]["count"] == 10
+    assert table.percentile("銀行業", "roe", 0.12) == pytest.approx(0.9)
+
+    mock_stock_data.get_fundamentals = MagicMock(return_value={"roe": 0.12, "per": 14.0, "revenue_growth": 0.08})
+    result = Scorer(mock_stock_data, sector="銀行業", sector_stats=table).evaluate_medium_term()
+    assert result["sector_scores"]["per"] == 15 # One peer now more expensive
+    assert any("業種内評価" in d for d in result["details"])
@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from factories import stock_factory
+from logic.snapshot import (
+    MARKET_TZ, WATCHLIST_TTL, SnapshotStore, build_snapshot, load_watchlist_tickers, next_run,
+    register_watchlist_tickers,
+)
+
+
+def test_snapshot_build_and_read(tmp_path):
+    dates = pd.date_range(start="2023-01-01", periods=30, tz="Asia/Tokyo")
+    close = np.linspace(100, 130, 30)
+    hist = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': [1000]*30}, index=dates)
+    factory = stock_factory(hist, {"longName": "Toyota", "returnOnEquity": 0.12, "trailingPE": 10.0})
+
+    build_snapshot(["7203.T"], snapshot_dir=str(tmp_path), stock_factory=factory)
+    store = SnapshotStore(snapshot_dir=str(tmp_path))
+    stock, short_res, med_res, created = store.get("7203.T")
+
+    # Every benchmark of the beta profile is in the snapshot, so reading it back fetches nothing
+    with patch("logic.stock_data.yf.Ticker", side_effect=AssertionError("network")):
+        assert stock.calculate_beta_profile() is not None
+    assert set(stock.benchmark_hist) == {"^N225", "1306.T"}
+    stock.benchmark_hist["^TOPX"] = None
+    assert "^TOPX" not in store.get("7203.T")[0].benchmark_hist
+
+    assert stock.get_company_name() == "Toyota"
+    assert stock.get_current_price() == pytest.approx(130)
+    assert med_res['roe'] == 0.12
+    assert short_res['beta'] == pytest.approx(1.0)
+    assert SnapshotStore(snapshot_dir=str(tmp_path)).get("8035.T") is None
+
+    # Friday after close -> Monday pre-market
+    friday = datetime.datetime(2024, 6, 7, 16, 0, tzinfo=MARKET_TZ)
+    assert next_run(friday, times=[datetime.time(8, 30), datetime.time(15, 45)]) == datetime.datetime(2024, 6, 10, 8, 30, tzinfo=MARKET_TZ)
+
+def test_watchlist_registry_prunes_old_tickers(tmp_path):
+    path = str(tmp_path / "watchlists.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('["7203.T"]') # Old list format
+
+    register_watchlist_tickers(["8035.T"], path=path, now=1000.0)
+    assert load_watchlist_tickers(path, now=1000.0) == ["7203.T", "8035.T"]
+    register_watchlist_tickers(["6758.T"], path=path, now=1000.0 + WATCHLIST_TTL)
+    assert load_watchlist_tickers(path, now=1001.0 + WATCHLIST_TTL) == ["6758.T"]
@@ -0,0 +1,50 @@
+import pandas as pd
+from unittest.mock import patch
+
+from logic.ticker_index import TickerIndex, build_index_csv
+
+
+def test_ticker_index_search_and_validate():
+    index = TickerIndex([
+        {"code": "7203", "name": "トヨタ自動車", "kana": "とよたじどうしゃ", "romaji": "Toyota Motor", "sector": "輸送用機器", "market": "プライム"},
+        {"code": "7201", "name": "日産自動車", "kana": "ニッサンジドウシャ", "romaji": "Nissan Motor", "sector": "輸送用機器", "market": "プライム"},
+        {"code": "8035", "name": "東京エレクトロン", "kana": "トウキョウエレクトロン", "romaji": "Tokyo Electron", "sector": "電気機器", "market": "プライム"},
+        {"code": "130A", "name": "Veritas In Silico", "sector": "医薬品", "market": "グロース"},
+    ])
+
+    assert [r['code'] for r in index.search("720")] == ["7201", "7203"]
+    assert index.search("トヨタ")[0]['code'] == "7203"
+    assert index.search("toyota")[0]['code'] == "7203"
+    assert index.search("ﾄｳｷｮｳ")[0]['code'] == "8035" # Half-width kana
+    assert "７２０３.T" in index
+    assert index.name("130a.T") == "Veritas In Silico"
+
+    assert index.validate("8035") == ("8035", None)
+    assert index.validate("東京エレ") == ("8035", None)
+    code, suggestions = index.validate("9999")
+    assert code is None and suggestions == []
+    code, suggestions = index.validate("72")
+    assert code is None and len(suggestions) == 2
+
+    # Without an installed index only the code format is checked
+    assert TickerIndex().validate("9999") == ("9999", None)
+    assert TickerIndex().validate("abc")[0] is None
+
+def test_build_index_merges_readings(tmp_path):
+    jpx = pd.DataFrame({
+        "コード": ["7203", "6758", "130A", "1306"],
+        "銘柄名": ["トヨタ自動車", "ソニーグループ", "Veritas In Silico", "ＴＯＰＩＸ連動型上場投信"],
+        "33業種区分": ["輸送用機器", "電気機器", "医薬品", "-"],
+        "市場・商品区分": ["プライム", "プライム", "グロース", "ETF"],
+    })
+    readings = tmp_path / "readings.csv"
+    readings.write_text("code,kana,romaji\n7203,トヨタジドウシャ,Toyota Motor\n", encoding="utf-8")
+    out = str(tmp_path / "tse_tickers.csv")
+    with patch("pandas.read_excel", return_value=jpx):
+        assert build_index_csv("data_j.xls", out_path=out, readings=str(readings)) == 3
+
+    index = TickerIndex.from_csv(out)
+    assert index.search("toyota")[0]["code"] == "7203"
+    assert index.search("とよた")[0]["code"] == "7203"
+    assert index.get("6758")["kana"] == "ソニーグループ" # Kana-only name is its own reading
+    assert index.get("130A")["romaji"] == "Veritas In Silico"
@@ -0,0 +1,46 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from logic.track_record import MARKET_TZ, build_scorecard, evaluate, load_picks, load_scorecard, record_picks
+
+
+def test_track_record_forward_returns(tmp_path):
+    dates = pd.bdate_range("2024-01-01", periods=80)
+    closes = pd.DataFrame({
+        "7203.T": 100 * 1.01 ** np.arange(80), # +1% a day
+        "6758.T": np.full(80, 50.0),
+        "8306.T": np.where(np.arange(80) < 10, 1000.0, np.nan), # Delisted after 10 days
+        "^N225": np.full(80, 30000.0),
+    }, index=dates)
+
+    picks_path = tmp_path / "picks.jsonl"
+    items = [{"ticker": "7203", "name": "トヨタ", "strategy": "短期"}, {"ticker": "6758", "name": "ソニー", "strategy": "中期"}]
+    morning = datetime.datetime(2024, 1, 2, 10, 0, tzinfo=MARKET_TZ)
+    record_picks(items, "model-a", job_id="abc123abc123", price_lookup=lambda t: 101.0, path=str(picks_path), now=morning)
+    record_picks(items[:1], "model-b", path=str(picks_path), now=morning.replace(hour=16)) # After the close
+    record_picks([{"ticker": "9999", "strategy": "短期"}], "model-b", path=str(picks_path), now=morning)
+
+    picks = load_picks(str(picks_path))
+    assert len(picks) == 4 and picks["price"].iloc[0] == 101.0 and picks["job_id"].iloc[0] == "abc123abc123"
+
+    ev = evaluate(picks, closes)
+    assert ev["entry_date"].iloc[0] == pd.Timestamp("2024-01-02")
+    assert ev["entry_date"].iloc[2] == pd.Timestamp("2024-01-03") # Next day's close
+    assert ev["ret_5d"].iloc[0] == pytest.approx(1.01 ** 5 - 1)
+    assert ev["excess_20d"].iloc[1] == pytest.approx(0.0) and ev["hit_20d"].iloc[1] == 0
+    assert np.isnan(ev["ret_1d"].iloc[3]) # Unknown ticker
+    assert not np.isnan(ev["ret_60d"].iloc[0])
+
+    # No stale exit price for a delisted ticker: carried forward only CLOSE_FILL_LIMIT days
+    delisted = load_picks(str(picks_path)).iloc[:1].assign(ticker="8306.T")
+    ev_delisted = evaluate(delisted, closes)
+    assert ev_delisted["ret_5d"].iloc[0] == pytest.approx(0.0)
+    assert np.isnan(ev_delisted["ret_20d"].iloc[0]) and np.isnan(ev_delisted["hit_20d"].iloc[0])
+
+    card = build_scorecard(str(picks_path), str(tmp_path / "scorecard.json"), closes=closes)
+    assert card["picks"] == 4 and card["evaluated"] == 3
+    by_model = {r["model"]: r for r in load_scorecard(str(tmp_path / "scorecard.json"))["by_model"]}
+    assert by_model["model-a"]["picks"] == 2 and by_model["model-b"]["hit_5d"] == 1.0
@@ -71,207 +71,456 @@ game_html = """
     <canvas id="gameCanvas"></canvas>
 
     <script>
-        const canvas = document.getElementById('gameCanvas');
-        const ctx = canvas.getContext('2d');
+        // Worker 起動に失敗した場合は新しい Canvas に差し替えるため let
+        let canvas = document.getElementById('gameCanvas');
         const scoreElement = document.getElementById('score');
 
         canvas.width = 600;
         canvas.height = 400;
 
-        // ゲーム定数
-        const BALL_RADIUS = 8;
-        const PADDLE_HEIGHT = 10;
-        const PADDLE_WIDTH = 75;
-        const BRICK_ROW_COUNT = 5;
-        const BRICK_COLUMN_COUNT = 7;
-        const BRICK_WIDTH = 75;
-        const BRICK_HEIGHT = 20;
-        const BRICK_PADDING = 10;
-        const BRICK_OFFSET_TOP = 30;
-        const BRICK_OFFSET_LEFT = 30;
-
-        // 色の設定 (ネオンカラー)
-        const COLORS = ['#ff00ff', '#00ffff', '#ffff00', '#00ff00', '#ff0000'];
-
-        let x = canvas.width / 2;
-        let y = canvas.height - 30;
-        let dx = 3;
-        let dy = -3;
-        let paddleX = (canvas.width - PADDLE_WIDTH) / 2;
-        let score = 0;
-        let particles = [];
-
-        // ブロックの初期化
-        const bricks = [];
-        for (let c = 0; c < BRICK_COLUMN_COUNT; c++) {
-            bricks[c] = [];
-            for (let r = 0; r < BRICK_ROW_COUNT; r++) {
-                bricks[c][r] = { x: 0, y: 0, status: 1, color: COLORS[r] };
-            }
-        }
+        // 描画エンジンの選択: "auto" は Worker + OffscreenCanvas が使えればそちら、"main" は常にメインスレッド
+        const ENGINE_MODE = "__ENGINE_MODE__";
 
-        // パーティクルクラス
-        class Particle {
-            constructor(x, y, color) {
-                this.x = x;
-                this.y = y;
-                this.color = color;
-                this.size = Math.random() * 3 + 1;
-                this.speedX = (Math.random() - 0.5) * 8;
-                this.speedY = (Math.random() - 0.5) * 8;
-                this.life = 1.0;
+        // ゲームエンジン本体 (物理と描画)。
+        // メインスレッドでも Web Worker 内でも同じコードが動くよう、DOM に依存する処理
+        // (レイヤー生成・スコア表示・終了処理・フレーム要求) は hooks 経由で受け取る
+        function createEngine(canvas, hooks) {
+            const ctx = canvas.getContext('2d');
+            if (!ctx) {
+                throw new Error('2D context is not available');
             }
-            update() {
-                this.x += this.speedX;
-                this.y += this.speedY;
-                this.life -= 0.02;
+
+            // ゲーム定数
+            const BALL_RADIUS = 8;
+            const PADDLE_HEIGHT = 10;
+            const PADDLE_WIDTH = 75;
+            const BRICK_ROW_COUNT = 5;
+            const BRICK_COLUMN_COUNT = 7;
+            const BRICK_WIDTH = 75;
+            const BRICK_HEIGHT = 20;
+            const BRICK_PADDING = 10;
+            const BRICK_OFFSET_TOP = 30;
+            const BRICK_OFFSET_LEFT = 30;
+
+            // 色の設定 (ネオンカラー)
+            const COLORS = ['#ff00ff', '#00ffff', '#ffff00', '#00ff00', '#ff0000'];
+
+            // 固定タイムステップ (リフレッシュレートに依存しない物理更新)
+            const STEP_MS = 1000 / 120; // 1ステップ = 1/120秒
+            const STEP = STEP_MS / 1000;
+            const MAX_FRAME_MS = 250; // タブ復帰時などに大量のステップを消化しない
+
+            // 速度は px/秒 (従来の 3px/フレーム @60Hz 相当)
+            const BALL_SPEED = 180;
+            const PADDLE_BOUNCE_SPEED = 480;
+
+            let x = canvas.width / 2;
+            let y = canvas.height - 30;
+            let dx = BALL_SPEED;
+            let dy = -BALL_SPEED;
+            let paddleX = (canvas.width - PADDLE_WIDTH) / 2;
+            let score = 0;
+
+            // ブロックの初期化 (位置は固定なので最初に計算しておく)
+            const CELL_WIDTH = BRICK_WIDTH + BRICK_PADDING;
+            const CELL_HEIGHT = BRICK_HEIGHT + BRICK_PADDING;
+            const bricks = [];
+            for (let c = 0; c < BRICK_COLUMN_COUNT; c++) {
+                bricks[c] = [];
+                for (let r = 0; r < BRICK_ROW_COUNT; r++) {
+                    bricks[c][r] = {
+                        x: (c * CELL_WIDTH) + BRICK_OFFSET_LEFT,
+                        y: (r * CELL_HEIGHT) + BRICK_OFFSET_TOP,
+                        status: 1,
+                        color: COLORS[r % COLORS.length],
+                        colorIndex: r % COLORS.length
+                    };
+                }
             }
-            draw() {
-                ctx.save();
-                ctx.globalAlpha = this.life;
-                ctx.fillStyle = this.color;
-                ctx.shadowBlur = 10;
-                ctx.shadowColor = this.color;
-                ctx.beginPath();
-                ctx.arc(this.x, this.y, this.size, 0, Math.PI * 2);
-                ctx.fill();
-                ctx.restore();
+
+            // 静的レイヤー (オフスクリーンCanvasにキャッシュ)
+            // グリッドは一度だけ、ブロックは破壊された時だけ描き直し、毎フレームは合成のみ行う
+            function createLayer() {
+                return hooks.createLayer(canvas.width, canvas.height);
             }
-        }
 
-        function mouseMoveHandler(e) {
-            const rect = canvas.getBoundingClientRect();
-            const relativeX = e.clientX - rect.left;
-            if (relativeX > 0 && relativeX < canvas.width) {
-                paddleX = relativeX - PADDLE_WIDTH / 2;
+            const gridLayer = createLayer();
+            const brickLayer = createLayer();
+            let bricksDirty = true;
+
+            function renderGridLayer() {
+                const g = gridLayer.getContext('2d');
+                g.strokeStyle = '#1a1a1a';
+                g.lineWidth = 1;
+                g.beginPath();
+                for (let i = 0; i < canvas.width; i += 40) {
+                    g.moveTo(i, 0); g.lineTo(i, canvas.height);
+                }
+                for (let i = 0; i < canvas.height; i += 40) {
+                    g.moveTo(0, i); g.lineTo(canvas.width, i);
+                }
+                g.stroke();
             }
-        }
-        document.addEventListener("mousemove", mouseMoveHandler, false);
 
-        function collisionDetection() {
-            for (let c = 0; c < BRICK_COLUMN_COUNT; c++) {
-                for (let r = 0; r < BRICK_ROW_COUNT; r++) {
-                    const b = bricks[c][r];
-                    if (b.status === 1) {
-                        if (x > b.x && x < b.x + BRICK_WIDTH && y > b.y && y < b.y + BRICK_HEIGHT) {
-                            dy = -dy;
-                            b.status = 0;
-                            score++;
-                            scoreElement.innerText = score;
-                            createParticles(b.x + BRICK_WIDTH/2, b.y + BRICK_HEIGHT/2, b.color);
-                            
-                            if (score === BRICK_ROW_COUNT * BRICK_COLUMN_COUNT) {
-                                alert("YOU WIN, CONGRATS!");
-                                document.location.reload();
-                            }
+            function renderBrickLayer() {
+                const b = brickLayer.getContext('2d');
+                b.clearRect(0, 0, brickLayer.width, brickLayer.height);
+                b.shadowBlur = 10;
+                for (let c = 0; c < BRICK_COLUMN_COUNT; c++) {
+                    for (let r = 0; r < BRICK_ROW_COUNT; r++) {
+                        const brick = bricks[c][r];
+                        if (brick.status === 1) {
+                            b.fillStyle = brick.color;
+                            b.shadowColor = brick.color;
+                            b.fillRect(brick.x, brick.y, BRICK_WIDTH, BRICK_HEIGHT);
                         }
                     }
                 }
+                bricksDirty = false;
             }
-        }
 
-        function createParticles(x, y, color) {
-            for (let i = 0; i < 15; i++) {
-                particles.push(new Particle(x, y, color));
+            renderGridLayer();
+
+            // パーティクルプール (固定長の型付き配列。フレーム中の新規割り当てなし)
+            const MAX_PARTICLES = 600;
+            const PARTICLES_PER_HIT = 15;
+            const ALPHA_BUCKETS = 5; // 同じ色・近い透明度のパーティクルを1パスでまとめて描画
+            const pX = new Float32Array(MAX_PARTICLES);
+            const pY = new Float32Array(MAX_PARTICLES);
+            const pSpeedX = new Float32Array(MAX_PARTICLES);
+            const pSpeedY = new Float32Array(MAX_PARTICLES);
+            const pSize = new Float32Array(MAX_PARTICLES);
+            const pLife = new Float32Array(MAX_PARTICLES);
+            const pColor = new Uint8Array(MAX_PARTICLES);
+            let particleCount = 0;
+
+            // グリッドインデックスによる衝突判定
+            // 判定は従来通りボール中心の点がブロック内にあるか (point-in-rect)。ブロックは重ならないので、
+            // 中心点が入り得るのは中心点を含むセルのブロックだけ (ブロック数に依存しない)
+            function collisionDetection() {
+                const c = Math.floor((x - BRICK_OFFSET_LEFT) / CELL_WIDTH);
+                const r = Math.floor((y - BRICK_OFFSET_TOP) / CELL_HEIGHT);
+                if (c < 0 || c >= BRICK_COLUMN_COUNT || r < 0 || r >= BRICK_ROW_COUNT) return true;
+
+                const b = bricks[c][r];
+                if (b.status !== 1) return true;
+                if (!(x > b.x && x < b.x + BRICK_WIDTH && y > b.y && y < b.y + BRICK_HEIGHT)) return true;
+
+                dy = -dy;
+                b.status = 0;
+                bricksDirty = true;
+                score++;
+                hooks.onScore(score);
+                createParticles(b.x + BRICK_WIDTH/2, b.y + BRICK_HEIGHT/2, b.colorIndex);
+
+                if (score === BRICK_ROW_COUNT * BRICK_COLUMN_COUNT) {
+                    hooks.onEnd("YOU WIN, CONGRATS!");
+                    return false;
+                }
+                return true;
             }
-        }
 
-        function drawBall() {
-            ctx.beginPath();
-            ctx.arc(x, y, BALL_RADIUS, 0, Math.PI * 2);
-            ctx.fillStyle = "#ffffff";
-            ctx.shadowBlur = 15;
-            ctx.shadowColor = "#00f2fe";
-            ctx.fill();
-            ctx.closePath();
-        }
+            function createParticles(x, y, colorIndex) {
+                // プールが満杯の場合は追加しない (連鎖時も上限を超えない)
+                for (let i = 0; i < PARTICLES_PER_HIT && particleCount < MAX_PARTICLES; i++) {
+                    const n = particleCount++;
+                    pX[n] = x;
+                    pY[n] = y;
+                    pSpeedX[n] = (Math.random() - 0.5) * 480; // px/秒
+                    pSpeedY[n] = (Math.random() - 0.5) * 480;
+                    pSize[n] = Math.random() * 3 + 1;
+                    pLife[n] = 1.0;
+                    pColor[n] = colorIndex;
+                }
+            }
 
-        function drawPaddle() {
-            ctx.beginPath();
-            ctx.rect(paddleX, canvas.height - PADDLE_HEIGHT - 5, PADDLE_WIDTH, PADDLE_HEIGHT);
-            ctx.fillStyle = "#00f2fe";
-            ctx.shadowBlur = 15;
-            ctx.shadowColor = "#00f2fe";
-            ctx.fill();
-            ctx.closePath();
-        }
+            function updateParticles(dt) {
+                let i = 0;
+                while (i < particleCount) {
+                    pX[i] += pSpeedX[i] * dt;
+                    pY[i] += pSpeedY[i] * dt;
+                    pLife[i] -= 1.2 * dt; // 約0.8秒で消える
+                    if (pLife[i] > 0) {
+                        i++;
+                        continue;
+                    }
+                    // 寿命切れ: 末尾の要素と入れ替えて削除 (順序は不問)
+                    const last = --particleCount;
+                    pX[i] = pX[last];
+                    pY[i] = pY[last];
+                    pSpeedX[i] = pSpeedX[last];
+                    pSpeedY[i] = pSpeedY[last];
+                    pSize[i] = pSize[last];
+                    pLife[i] = pLife[last];
+                    pColor[i] = pColor[last];
+                }
+            }
 
-        function drawBricks() {
-            for (let c = 0; c < BRICK_COLUMN_COUNT; c++) {
-                for (let r = 0; r < BRICK_ROW_COUNT; r++) {
-                    if (bricks[c][r].status === 1) {
-                        const brickX = (c * (BRICK_WIDTH + BRICK_PADDING)) + BRICK_OFFSET_LEFT;
-                        const brickY = (r * (BRICK_HEIGHT + BRICK_PADDING)) + BRICK_OFFSET_TOP;
-                        bricks[c][r].x = brickX;
-                        bricks[c][r].y = brickY;
-                        
+            function drawParticles() {
+                if (particleCount === 0) return;
+                ctx.save();
+                ctx.shadowBlur = 10;
+                for (let c = 0; c < COLORS.length; c++) {
+                    ctx.fillStyle = COLORS[c];
+                    ctx.shadowColor = COLORS[c];
+                    for (let a = 0; a < ALPHA_BUCKETS; a++) {
+                        const lo = a / ALPHA_BUCKETS;
+                        const hi = (a + 1) / ALPHA_BUCKETS;
+                        let any = false;
                         ctx.beginPath();
-                        ctx.rect(brickX, brickY, BRICK_WIDTH, BRICK_HEIGHT);
-                        ctx.fillStyle = bricks[c][r].color;
-                        ctx.shadowBlur = 10;
-                        ctx.shadowColor = bricks[c][r].color;
-                        ctx.fill();
-                        ctx.closePath();
+                        for (let i = 0; i < particleCount; i++) {
+                            if (pColor[i] !== c || pLife[i] <= lo || pLife[i] > hi) continue;
+                            ctx.moveTo(pX[i] + pSize[i], pY[i]);
+                            ctx.arc(pX[i], pY[i], pSize[i], 0, Math.PI * 2);
+                            any = true;
+                        }
+                        if (any) {
+                            ctx.globalAlpha = hi;
+                            ctx.fill();
+                        }
                     }
                 }
+                ctx.restore();
             }
-        }
 
-        function draw() {
-            ctx.clearRect(0, 0, canvas.width, canvas.height);
+            function drawBall() {
+                ctx.beginPath();
+                ctx.arc(x, y, BALL_RADIUS, 0, Math.PI * 2);
+                ctx.fillStyle = "#ffffff";
+                ctx.shadowBlur = 15;
+                ctx.shadowColor = "#00f2fe";
+                ctx.fill();
+                ctx.closePath();
+            }
+
+            function drawPaddle() {
+                ctx.beginPath();
+                ctx.rect(paddleX, canvas.height - PADDLE_HEIGHT - 5, PADDLE_WIDTH, PADDLE_HEIGHT);
+                ctx.fillStyle = "#00f2fe";
+                ctx.shadowBlur = 15;
+                ctx.shadowColor = "#00f2fe";
+                ctx.fill();
+                ctx.closePath();
+            }
+
+            function drawStaticLayers() {
+                if (bricksDirty) {
+                    renderBrickLayer();
+                }
+                // 前フレームの shadowBlur がレイヤー全体に掛からないようリセットしてから合成
+                ctx.shadowBlur = 0;
+                ctx.drawImage(gridLayer, 0, 0);
+                ctx.drawImage(brickLayer, 0, 0);
+            }
+
+            // 物理を1ステップ (STEP秒) 進める。ゲーム終了時は false
+            function step() {
+                if (!collisionDetection()) return false;
+                updateParticles(STEP);
+
+                const nx = x + dx * STEP;
+                const ny = y + dy * STEP;
+                if (nx > canvas.width - BALL_RADIUS || nx < BALL_RADIUS) {
+                    dx = -dx;
+                }
+                if (ny < BALL_RADIUS) {
+                    dy = -dy;
+                } else if (ny > canvas.height - BALL_RADIUS - 5) {
+                    if (x > paddleX && x < paddleX + PADDLE_WIDTH) {
+                        dy = -dy;
+                        // 跳ね返り角を変化させる
+                        dx = PADDLE_BOUNCE_SPEED * ((x - (paddleX + PADDLE_WIDTH / 2)) / PADDLE_WIDTH);
+                    } else {
+                        hooks.onEnd("GAME OVER");
+                        return false;
+                    }
+                }
+
+                x += dx * STEP;
+                y += dy * STEP;
+                return true;
+            }
+
+            function render() {
+                ctx.clearRect(0, 0, canvas.width, canvas.height);
             
-            // 背景のグリッド描画 (クールな演出)
-            ctx.strokeStyle = '#1a1a1a';
-            ctx.lineWidth = 1;
-            for(let i=0; i<canvas.width; i+=40) {
-                ctx.beginPath(); ctx.moveTo(i, 0); ctx.lineTo(i, canvas.height); ctx.stroke();
+                // 背景のグリッドとブロック (キャッシュ済みレイヤーを合成)
+                drawStaticLayers();
+                drawBall();
+                drawPaddle();
+                drawParticles();
             }
-            for(let i=0; i<canvas.height; i+=40) {
-                ctx.beginPath(); ctx.moveTo(0, i); ctx.lineTo(canvas.width, i); ctx.stroke();
+
+            let lastTime = null;
+            let accumulator = 0;
+
+            // 経過時間をためて固定ステップで消化し、描画は1フレーム1回
+            function frame(now) {
+                if (lastTime === null) lastTime = now;
+                accumulator += Math.min(now - lastTime, MAX_FRAME_MS);
+                lastTime = now;
+
+                while (accumulator >= STEP_MS) {
+                    if (!step()) return;
+                    accumulator -= STEP_MS;
+                }
+
+                render();
+                hooks.requestFrame(frame);
             }
 
-            drawBricks();
-            drawBall();
-            drawPaddle();
-            collisionDetection();
+            hooks.requestFrame(frame);
 
-            // パーティクルの更新と描画
-            particles = particles.filter(p => p.life > 0);
-            particles.forEach(p => {
-                p.update();
-                p.draw();
+            return {
+                setPaddleX(relativeX) {
+                    if (relativeX > 0 && relativeX < canvas.width) {
+                        paddleX = relativeX - PADDLE_WIDTH / 2;
+                    }
+                }
+            };
+        }
+
+        function endGame(message) {
+            alert(message);
+            document.location.reload();
+        }
+
+        // フォールバック: 従来通りメインスレッドで実行
+        function startMainThread() {
+            const engine = createEngine(canvas, {
+                createLayer: (width, height) => {
+                    const layer = document.createElement('canvas');
+                    layer.width = width;
+                    layer.height = height;
+                    return layer;
+                },
+                onScore: (score) => { scoreElement.innerText = score; },
+                onEnd: endGame,
+                requestFrame: (callback) => requestAnimationFrame(callback)
             });
+            return (relativeX) => engine.setPaddleX(relativeX);
+        }
 
-            if (x + dx > canvas.width - BALL_RADIUS || x + dx < BALL_RADIUS) {
-                dx = -dx;
-            }
-            if (y + dy < BALL_RADIUS) {
-                dy = -dy;
-            } else if (y + dy > canvas.height - BALL_RADIUS - 5) {
-                if (x > paddleX && x < paddleX + PADDLE_WIDTH) {
-                    dy = -dy;
-                    // 跳ね返り角を変化させる
-                    dx = 8 * ((x - (paddleX + PADDLE_WIDTH / 2)) / PADDLE_WIDTH);
-                } else {
-                    alert("GAME OVER");
-                    document.location.reload();
+        // Worker モード: Canvas の制御を OffscreenCanvas として Worker に渡し、
+        // メインスレッドからは入力イベントだけを送る (Streamlit 側の処理で描画が止まらない)
+        const WORKER_READY_TIMEOUT_MS = 3000;
+        let setPointer = () => {};
+
+        function startWorker() {
+            const workerSource = createEngine.toString() + `
+                let engine = null;
+                self.onmessage = (e) => {
+                    const msg = e.data;
+                    if (msg.type === 'init') {
+                        try {
+                            engine = createEngine(msg.canvas, {
+                                createLayer: (width, height) => new OffscreenCanvas(width, height),
+                                onScore: (score) => self.postMessage({ type: 'score', score: score }),
+                                onEnd: (message) => self.postMessage({ type: 'end', message: message }),
+                                requestFrame: self.requestAnimationFrame
+                                    ? (callback) => self.requestAnimationFrame(callback)
+                                    : (callback) => setTimeout(() => callback(performance.now()), 1000 / 60)
+                            });
+                            self.postMessage({ type: 'ready' });
+                        } catch (err) {
+                            self.postMessage({ type: 'error', message: String(err) });
+                        }
+                    } else if (msg.type === 'pointer' && engine) {
+                        engine.setPaddleX(msg.x);
+                    }
+                };
+            `;
+            const worker = new Worker(URL.createObjectURL(new Blob([workerSource], { type: 'text/javascript' })));
+            let failed = false;
+            let readyTimer = null;
+
+            // Canvas の転送後に起きた失敗 (CSP によるスクリプト読み込み拒否、getContext の失敗、
+            // エンジン内の例外、応答なし) は、Worker を止めて新しい Canvas でメインスレッドに切り替える。
+            // 転送済みの Canvas はメインスレッドから描画できないため作り直す
+            function fallBack() {
+                if (failed) {
                     return;
                 }
+                failed = true;
+                clearTimeout(readyTimer);
+                worker.terminate();
+                const fresh = document.createElement('canvas');
+                fresh.id = canvas.id;
+                fresh.width = canvas.width;
+                fresh.height = canvas.height;
+                canvas.replaceWith(fresh);
+                canvas = fresh;
+                setPointer = startMainThread();
             }
 
-            x += dx;
-            y += dy;
-            requestAnimationFrame(draw);
+            worker.onmessage = (e) => {
+                if (e.data.type === 'ready') {
+                    clearTimeout(readyTimer);
+                } else if (e.data.type === 'error') {
+                    fallBack();
+                } else if (e.data.type === 'score') {
+                    scoreElement.innerText = e.data.score;
+                } else if (e.data.type === 'end') {
+                    endGame(e.data.message);
+                }
+            };
+            worker.onerror = (e) => {
+                e.preventDefault();
+                fallBack();
+            };
+            worker.onmessageerror = fallBack;
+
+            setPointer = (relativeX) => {
+                if (!failed) {
+                    worker.postMessage({ type: 'pointer', x: relativeX });
+                }
+            };
+            try {
+                const offscreen = canvas.transferControlToOffscreen();
+                worker.postMessage({ type: 'init', canvas: offscreen }, [offscreen]);
+                readyTimer = setTimeout(fallBack, WORKER_READY_TIMEOUT_MS);
+            } catch (err) {
+                fallBack();
+            }
+        }
+
+        const workerAvailable = ENGINE_MODE !== "main"
+            && typeof Worker !== 'undefined'
+            && typeof OffscreenCanvas !== 'undefined'
+            && typeof canvas.transferControlToOffscreen === 'function';
+
+        if (workerAvailable) {
+            try {
+                // Worker の生成自体に失敗した場合 (Canvas の転送前) はここで例外になる
+                startWorker();
+            } catch (e) {
+                setPointer = startMainThread();
+            }
+        } else {
+            setPointer = startMainThread();
         }
 
-        draw();
+        function mouseMoveHandler(e) {
+            const rect = canvas.getBoundingClientRect();
+            setPointer(e.clientX - rect.left);
+        }
+        document.addEventListener("mousemove", mouseMoveHandler, false);
     </script>
 </body>
 </html>
 """
 
+# 描画エンジンの選択 (Worker が使えないブラウザでは自動的にメインスレッドで動作)
+engine_label = st.radio(
+    "描画エンジン",
+    ["自動 (Web Worker + OffscreenCanvas)", "メインスレッド"],
+    horizontal=True,
+    label_visibility="collapsed"
+)
+engine_mode = "main" if engine_label == "メインスレッド" else "auto"
+
 # ゲームを埋め込む
-components.html(game_html, height=450, scrolling=False)
+components.html(game_html.replace("__ENGINE_MODE__", engine_mode), height=450, scrolling=False)
 
 st.markdown("""
     <div style="text-align: center; color: #666; margin-top: 10px;">